@@ -0,0 +1,223 @@
+"""
+Admission control for HemoScan AI
+Bounded concurrency, queue deadlines and priority load shedding per route class
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from flask import jsonify
+from config import Config
+from metrics import metrics
+
+
+class AdmissionRejected(Exception):
+    """The request was shed by admission control"""
+
+    def __init__(self, route_class, reason):
+        super().__init__(f'{route_class} request shed ({reason})')
+        self.route_class = route_class
+        self.reason = reason
+
+
+def _resolve(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class _Gate:
+    """Concurrency limit with a bounded, deadline-limited wait queue
+
+    Threads wait on a condition variable; asyncio tasks wait on futures, so a
+    queued async request holds no thread. Both share the same counters.
+    """
+
+    def __init__(self, limit, max_queue, queue_timeout):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+        self._async_waiters = deque()  # (loop, future) of queued asyncio tasks, oldest first
+
+    def _enter(self, allow_queue):
+        """Take a free slot (True), refuse to queue (the reason), or None to queue (lock held)"""
+        if self.active < self.limit:
+            self.active += 1
+            return True
+        if not allow_queue:
+            return 'priority'
+        if self.waiting >= self.max_queue:
+            return 'queue_full'
+        return None
+
+    def _wake(self):
+        """Let one queued thread and one queued task recheck for a free slot (lock held)"""
+        self._cond.notify()
+        if self._async_waiters:
+            loop, waiter = self._async_waiters.popleft()
+            loop.call_soon_threadsafe(_resolve, waiter)
+
+    def acquire(self, allow_queue=True):
+        """True when admitted; otherwise the reason the request was shed"""
+        with self._cond:
+            admitted = self._enter(allow_queue)
+            if admitted is not None:
+                return admitted
+
+            self.waiting += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return 'queue_timeout'
+                    self._cond.wait(remaining)
+                self.active += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    async def acquire_async(self, allow_queue=True):
+        """acquire() for the event loop"""
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            admitted = self._enter(allow_queue)
+            if admitted is not None:
+                return admitted
+            self.waiting += 1
+
+        deadline = loop.time() + self.queue_timeout
+        waiter = None
+        try:
+            while True:
+                with self._cond:
+                    if self.active < self.limit:
+                        self.active += 1
+                        return True
+                    waiter = loop.create_future()
+                    self._async_waiters.append((loop, waiter))
+                try:
+                    await asyncio.wait_for(waiter, deadline - loop.time())
+                except asyncio.TimeoutError:
+                    return 'queue_timeout'
+        finally:
+            with self._cond:
+                self.waiting -= 1
+                if (loop, waiter) in self._async_waiters:
+                    self._async_waiters.remove((loop, waiter))
+                elif waiter is not None and waiter.done() and not waiter.cancelled():
+                    # Woken but leaving (timed out or cancelled): pass the wake-up on
+                    self._wake()
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._wake()
+
+
+class AdmissionController:
+    """Route classes in priority order (first = most important)
+
+    Each class has its own concurrency limit and queue. A lower-priority
+    class may not queue while any higher-priority class has requests
+    waiting: it is shed immediately, so /predict keeps the capacity when
+    the server is saturated and admin polling backs off first.
+    """
+
+    def __init__(self, classes, retry_after=1):
+        self.order = [name for name, _ in classes]
+        self.gates = {name: _Gate(**settings) for name, settings in classes}
+        self.retry_after = retry_after
+        for name, gate in self.gates.items():
+            metrics.register_gauge(f'admission.{name}.active', lambda g=gate: g.active)
+            metrics.register_gauge(f'admission.{name}.waiting', lambda g=gate: g.waiting)
+
+    def _higher_priority_waiting(self, route_class):
+        for name in self.order:
+            if name == route_class:
+                return False
+            if self.gates[name].waiting:
+                return True
+        return False
+
+    def _admitted(self, route_class, admitted):
+        if admitted is not True:
+            metrics.increment(f'admission.{route_class}.shed')
+            metrics.increment(f'admission.{route_class}.shed.{admitted}')
+            raise AdmissionRejected(route_class, admitted)
+        metrics.increment(f'admission.{route_class}.admitted')
+
+    def acquire(self, route_class):
+        """Take one of the route class's slots (may wait in its queue); raises AdmissionRejected when shed"""
+        allow_queue = not self._higher_priority_waiting(route_class)
+        self._admitted(route_class, self.gates[route_class].acquire(allow_queue))
+
+    async def acquire_async(self, route_class):
+        """acquire() for the async server: a queued request waits on the event loop, not on a thread"""
+        allow_queue = not self._higher_priority_waiting(route_class)
+        self._admitted(route_class, await self.gates[route_class].acquire_async(allow_queue))
+
+    def cap_concurrency(self, max_active):
+        """Lower every class's limit to max_active (the async server's executor size)"""
+        for gate in self.gates.values():
+            gate.limit = min(gate.limit, max_active)
+
+    def release(self, route_class):
+        self.gates[route_class].release()
+
+    @contextmanager
+    def slot(self, route_class):
+        """Hold one of the route class's slots for the block; raises AdmissionRejected when shed"""
+        self.acquire(route_class)
+        try:
+            yield
+        finally:
+            self.release(route_class)
+
+    def busy_response(self):
+        """503 with Retry-After for a shed request"""
+        response = jsonify({'error': 'Server is busy, please retry shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(self.retry_after)
+        return response
+
+    def limit(self, route_class):
+        """Decorator applying the route class's admission policy to a view
+
+        Place it below authentication decorators so rejected credentials
+        never take a slot.
+        """
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                try:
+                    with self.slot(route_class):
+                        return fn(*args, **kwargs)
+                except AdmissionRejected:
+                    return self.busy_response()
+            return wrapper
+        return decorator
+
+
+admission = AdmissionController([
+    ('predict', {
+        'limit': Config.ADMISSION_PREDICT_CONCURRENCY,
+        'max_queue': Config.ADMISSION_PREDICT_QUEUE,
+        'queue_timeout': Config.ADMISSION_QUEUE_TIMEOUT_MS / 1000.0
+    }),
+    ('auth', {
+        'limit': Config.ADMISSION_AUTH_CONCURRENCY,
+        'max_queue': Config.ADMISSION_AUTH_QUEUE,
+        'queue_timeout': Config.ADMISSION_QUEUE_TIMEOUT_MS / 1000.0
+    }),
+    ('admin', {
+        'limit': Config.ADMISSION_ADMIN_CONCURRENCY,
+        'max_queue': Config.ADMISSION_ADMIN_QUEUE,
+        'queue_timeout': Config.ADMISSION_QUEUE_TIMEOUT_MS / 1000.0
+    })
+], retry_after=Config.ADMISSION_RETRY_AFTER)
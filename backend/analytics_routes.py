@@ -0,0 +1,163 @@
+"""
+Admin analytics routes for HemoScan AI
+Group-by, percentile and histogram queries over the columnar screening archive,
+plus filtered search over the compact SQLite screening index
+"""
+
+from flask import Blueprint, request, jsonify
+from auth_routes import admin_required
+from archive import ColumnarArchive, CATEGORY_LABELS, GROUP_BY_KEYS, NUMERIC_COLUMNS
+from screening_index import search_screenings
+from scoring import SYMPTOMS, DIET_MAP, RISK_LEVELS
+from config import Config
+from datetime import date
+import sqlite3
+
+analytics_bp = Blueprint('analytics', __name__)
+
+screening_archive = ColumnarArchive(Config.ARCHIVE_DIR)
+
+
+def _query_scope():
+    """Date range and categorical filters shared by all analytics queries
+
+    ?start=YYYY-MM-DD&end=YYYY-MM-DD&risk_level=High&gender=Female&diet=poor&dizziness=1
+    """
+    start = request.args.get('start')
+    end = request.args.get('end')
+    filters = {}
+    for name, labels in CATEGORY_LABELS.items():
+        value = request.args.get(name)
+        if value is not None:
+            lookup = {label.lower(): code for code, label in enumerate(labels)}
+            if value.lower() not in lookup:
+                raise ValueError(f"Invalid {name}: {value}")
+            filters[name] = lookup[value.lower()]
+    for symptom in SYMPTOMS:
+        value = request.args.get(symptom)
+        if value is not None:
+            filters[symptom] = 1 if value.lower() in ['1', 'true', 'yes'] else 0
+    return {
+        'start': date.fromisoformat(start) if start else None,
+        'end': date.fromisoformat(end) if end else None,
+        'filters': filters
+    }
+
+
+def _numeric_column(name):
+    column = request.args.get(name)
+    if column not in NUMERIC_COLUMNS:
+        raise ValueError(f"{name} must be one of: {', '.join(NUMERIC_COLUMNS)}")
+    return column
+
+
+@analytics_bp.route('/admin/analytics/groupby', methods=['GET'])
+@admin_required
+def analytics_group_by():
+    """Aggregate a metric per group, e.g. ?by=age_group&metric=hemoglobin&agg=mean"""
+    try:
+        by = request.args.get('by', 'risk_level')
+        if by not in GROUP_BY_KEYS:
+            return jsonify({'error': f"by must be one of: {', '.join(GROUP_BY_KEYS)}"}), 400
+        agg = request.args.get('agg', 'count')
+        metric = _numeric_column('metric') if agg != 'count' else None
+
+        groups = screening_archive.group_by(by, metric, agg, **_query_scope())
+        return jsonify({'by': by, 'metric': metric, 'agg': agg, 'groups': groups}), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@analytics_bp.route('/admin/analytics/percentiles', methods=['GET'])
+@admin_required
+def analytics_percentiles():
+    """Percentiles of a numeric column, e.g. ?column=hemoglobin&q=5,50,95"""
+    try:
+        column = _numeric_column('column')
+        quantiles = [float(q) for q in request.args.get('q', '25,50,75,90,99').split(',')]
+        if any(q < 0 or q > 100 for q in quantiles):
+            return jsonify({'error': 'Percentiles must be between 0 and 100'}), 400
+
+        result = screening_archive.percentiles(column, quantiles, **_query_scope())
+        return jsonify({'column': column, **result}), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@analytics_bp.route('/admin/analytics/histogram', methods=['GET'])
+@admin_required
+def analytics_histogram():
+    """Histogram of a numeric column, e.g. ?column=age&bins=12&min=18&max=90"""
+    try:
+        column = _numeric_column('column')
+        bins = min(int(request.args.get('bins', 10)), 1000)
+        value_range = None
+        if 'min' in request.args and 'max' in request.args:
+            value_range = (float(request.args['min']), float(request.args['max']))
+
+        result = screening_archive.histogram(column, bins, value_range, **_query_scope())
+        return jsonify({'column': column, **result}), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@analytics_bp.route('/admin/screenings/search', methods=['GET'])
+@admin_required
+def search_screening_index():
+    """Filtered screening search over the compact index
+
+    ?risk_level=High,Moderate&gender=female&diet=poor&symptoms=dizziness,pale_skin
+    &min_age=18&max_age=45&since=2024-05-01&until=2024-06-01&limit=50&cursor=<next_cursor>
+    """
+    try:
+        risk_levels = [r for r in request.args.get('risk_level', '').split(',') if r]
+        invalid = [r for r in risk_levels if r not in RISK_LEVELS]
+        if invalid:
+            return jsonify({'error': f"risk_level must be one of: {', '.join(RISK_LEVELS)}"}), 400
+        gender = request.args.get('gender')
+        if gender is not None and gender.lower() not in ['female', 'f', 'male', 'm']:
+            return jsonify({'error': f"Invalid gender: {gender}"}), 400
+        diet = request.args.get('diet')
+        if diet is not None and diet.lower() not in DIET_MAP:
+            return jsonify({'error': f"Invalid diet: {diet}"}), 400
+        symptoms = [s for s in request.args.get('symptoms', '').split(',') if s]
+        invalid = [s for s in symptoms if s not in SYMPTOMS]
+        if invalid:
+            return jsonify({'error': f"Unknown symptoms: {', '.join(invalid)}"}), 400
+
+        filters = {
+            'risk_levels': risk_levels,
+            'gender': gender,
+            'diet': diet.lower() if diet else None,
+            'symptoms': symptoms,
+            'min_age': request.args.get('min_age', type=int),
+            'max_age': request.args.get('max_age', type=int),
+            'since': request.args.get('since'),
+            'until': request.args.get('until')
+        }
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+        cursor = request.args.get('cursor')
+        if cursor:
+            ts, last_id = cursor.split(':')
+            cursor = (int(ts), int(last_id))
+
+        conn = sqlite3.connect('hemoscan.db')
+        try:
+            results, next_cursor = search_screenings(conn, filters, limit, cursor)
+        finally:
+            conn.close()
+        return jsonify({'results': results, 'count': len(results), 'next_cursor': next_cursor}), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
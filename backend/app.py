@@ -3,18 +3,48 @@ Flask REST API for HemoScan AI
 Anemia Risk Prediction Backend
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context, g
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
 from flask_bcrypt import Bcrypt
 from config import Config
 from database import Database
-from auth_routes import auth_bp
+from auth_routes import auth_bp, admin_required, admin_check_error
+from job_routes import jobs_bp, job_manager
+from analytics_routes import analytics_bp, screening_archive
+from screening_index import init_screening_index, insert_screening_index
+from traffic_capture import TrafficRecorder
+from screening_store import (
+    OutboxReplicator, init_outbox, enqueue_screening, pending_documents, pending_marker, merge_pending
+)
+from inference import BatchScheduler
+from drift import DriftMonitor
+from admission import admission, AdmissionRejected
+from metrics import metrics
+from http_cache import conditional_json
+from broadcast import Broadcaster, screening_event
+from shadow import ShadowEvaluator
+from hemoscan_runtime import Runtime
+from responses import (
+    FACTOR_LABELS, build_recommendation_table, recommendation_key, encode_prediction, json_response
+)
+from maintenance import MaintenanceScheduler, run_maintenance
+from idempotency import (
+    IdempotencyStore, IdempotencyKeyReused, IdempotencyInProgress, MAX_KEY_LENGTH, request_fingerprint
+)
+from scoring import (
+    FEATURE_COLUMNS, RURAL_HEMOGLOBIN_ESTIMATE, encode_gender, encode_diet,
+    SYMPTOMS, DIET_MAP, build_feature_vector, sweep_matrix, adjust_probabilities, risk_levels
+)
 import joblib
 import numpy as np
 import sqlite3
 from datetime import datetime
 import os
+import json
+import atexit
+import threading
+import time
 from bson import ObjectId
 
 app = Flask(__name__)
@@ -25,8 +55,41 @@ CORS(app)
 jwt = JWTManager(app)
 bcrypt = Bcrypt(app)
 
-# Register auth blueprint
+# Register auth, screening job and analytics blueprints
 app.register_blueprint(auth_bp)
+app.register_blueprint(jobs_bp)
+app.register_blueprint(analytics_bp)
+
+# Don't lose screenings still buffered for the archive on shutdown
+atexit.register(screening_archive.flush)
+
+# Optional anonymized capture of the replayable endpoints (see loadgen.py)
+traffic_recorder = TrafficRecorder(Config.TRAFFIC_CAPTURE_PATH) if Config.TRAFFIC_CAPTURE_PATH else None
+
+if traffic_recorder is not None:
+    @app.before_request
+    def start_capture_timer():
+        g.capture_started = time.perf_counter()
+    
+    @app.after_request
+    def capture_request(response):
+        try:
+            identity = None
+            if request.path == '/auth/login':
+                user = (response.get_json(silent=True) or {}).get('user') or {}
+                identity = user.get('id') or (request.get_json(silent=True) or {}).get('email')
+            else:
+                try:
+                    identity = get_jwt_identity()
+                except Exception:
+                    pass  # unauthenticated request
+            traffic_recorder.record(
+                request.method, request.path, request.get_json(silent=True), identity, response.status_code,
+                (time.perf_counter() - g.get('capture_started', time.perf_counter())) * 1000
+            )
+        except Exception as e:
+            print(f"Warning: Could not capture request: {e}")
+        return response
 
 # Initialize MongoDB
 Database.initialize()
@@ -35,18 +98,88 @@ Database.initialize()
 MODEL_PATH = 'models/model.pkl'
 SCALER_PATH = 'models/scaler.pkl'
 FEATURE_NAMES_PATH = 'models/feature_names.pkl'
+METADATA_PATH = 'models/model_metadata.json'
+DRIFT_REFERENCE_PATH = 'models/drift_reference.json'
+EXPLANATIONS_PATH = 'models/explanations.json'
+RUNTIME_EXPORT_PATH = 'models/model.npz'
 
 model = None
 scaler = None
+model_bundle = (None, None)
 feature_names = None
+model_metadata = {}
+inference_scheduler = None
+drift_monitor = None
+stat_broadcaster = Broadcaster(Config.STREAM_CLIENT_BUFFER, Config.STREAM_MAX_CLIENTS)
+idempotency_store = IdempotencyStore(Config.IDEMPOTENCY_MAX_ENTRIES, Config.IDEMPOTENCY_TTL_SECONDS)
+screening_replicator = OutboxReplicator(
+    Database.get_db,
+    batch_size=Config.REPLICATION_BATCH_SIZE,
+    interval_ms=Config.REPLICATION_INTERVAL_MS,
+    max_backoff=Config.REPLICATION_MAX_BACKOFF_SECONDS
+)
+explanations = None
+factor_tables = None
+recommendation_table = {}
+
+def predict_probabilities(feature_matrix):
+    """Scale a batch of raw feature rows and return the positive-class probabilities"""
+    # Read the pair once so a concurrent reload can't mix a new scaler with an old model
+    current_model, current_scaler = model_bundle
+    return current_model.predict_proba(current_scaler.transform(feature_matrix))[:, 1]
+
+# Candidate model scored on a sample of live traffic (enabled when SHADOW_MODEL_DIR holds a bundle)
+shadow_evaluator = ShadowEvaluator(
+    Config.SHADOW_MODEL_DIR,
+    sample_rate=Config.SHADOW_SAMPLE_RATE,
+    queue_size=Config.SHADOW_QUEUE_SIZE,
+    batch_size=Config.SHADOW_BATCH_SIZE
+)
 
 def load_model():
-    """Load the trained model and scaler"""
-    global model, scaler, feature_names
+    """Load the trained model and scaler (also used to hot-swap a newly published version)"""
+    global model, scaler, model_bundle, feature_names, model_metadata, inference_scheduler, drift_monitor
+    global explanations, factor_tables, recommendation_table
     try:
-        model = joblib.load(MODEL_PATH)
-        scaler = joblib.load(SCALER_PATH)
-        feature_names = joblib.load(FEATURE_NAMES_PATH)
+        if Config.INFERENCE_RUNTIME == 'numpy':
+            # NumPy-only export: same predictions without importing scikit-learn
+            runtime = Runtime.load(RUNTIME_EXPORT_PATH)
+            new_model, new_scaler = runtime.model, runtime.scaler
+            feature_names = runtime.feature_names
+        else:
+            new_model = joblib.load(MODEL_PATH)
+            new_scaler = joblib.load(SCALER_PATH)
+            feature_names = joblib.load(FEATURE_NAMES_PATH)
+        model_bundle = (new_model, new_scaler)
+        model, scaler = new_model, new_scaler
+        # Metadata is optional (models trained before it existed don't have it)
+        model_metadata = {}
+        if os.path.exists(METADATA_PATH):
+            with open(METADATA_PATH) as f:
+                model_metadata = json.load(f)
+        if os.path.exists(DRIFT_REFERENCE_PATH):
+            with open(DRIFT_REFERENCE_PATH) as f:
+                drift_monitor = DriftMonitor(json.load(f), feature_names)
+        # Training-time permutation importance and partial dependence (optional)
+        explanations, factor_tables = None, None
+        if os.path.exists(EXPLANATIONS_PATH):
+            with open(EXPLANATIONS_PATH) as f:
+                explanations = json.load(f)
+            factor_tables = build_factor_tables(explanations)
+        recommendation_table = build_recommendation_table(get_recommendations)
+        if Config.INFERENCE_BATCHING and inference_scheduler is None:
+            inference_scheduler = BatchScheduler(
+                predict_probabilities,
+                window_ms=Config.INFERENCE_BATCH_WINDOW_MS,
+                max_batch=Config.INFERENCE_MAX_BATCH
+            )
+            metrics.register_gauge('inference', inference_scheduler.stats)
+        if shadow_evaluator.bundle is None:
+            try:
+                if shadow_evaluator.load():
+                    print(f"Shadow candidate loaded from {Config.SHADOW_MODEL_DIR}")
+            except Exception as e:
+                print(f"Warning: Shadow candidate not loaded: {e}")
         print("Model loaded successfully!")
     except Exception as e:
         print(f"Error loading model: {e}")
@@ -72,13 +205,42 @@ def init_db():
     ''')
     
     conn.commit()
+    init_screening_index(conn)
+    init_outbox(conn)
     conn.close()
     print("Database initialized!")
 
+def build_factor_tables(explanations):
+    """Per-feature lookup arrays from the precomputed explanations"""
+    tables = {}
+    for feature, curve in explanations['partial_dependence'].items():
+        probability = np.array(curve['probability'])
+        tables[feature] = {
+            'values': np.array(curve['values']),
+            'probability': probability,
+            'mean': probability.mean(),
+            'range': probability.max() - probability.min(),
+            'importance': max(explanations['permutation_importance'][feature]['mean'], 0.0)
+        }
+    return tables
+
 def get_feature_importance(prediction_features):
     """Calculate feature importance for explainable AI"""
+    tables = factor_tables
+    if tables and any(t['importance'] > 0 for t in tables.values()):
+        # Precomputed at training time: permutation importance on the held-out split,
+        # weighted by how far this value moves the partial-dependence curve from its mean
+        importance = {}
+        for i, feature in enumerate(feature_names):
+            table = tables[feature]
+            effect = 0.0
+            if table['range'] > 0:
+                pd_value = np.interp(prediction_features[i], table['values'], table['probability'])
+                effect = abs(pd_value - table['mean']) / table['range']
+            importance[feature] = table['importance'] * (1 + effect)
+    
     # Check if model has feature_importances_ (Random Forest, Gradient Boosting)
-    if hasattr(model, 'feature_importances_'):
+    elif hasattr(model, 'feature_importances_'):
         # Use feature importances from tree-based models
         importances = model.feature_importances_
         
@@ -162,6 +324,136 @@ def get_recommendations(risk_level, probability, features):
     
     return recommendations
 
+def save_screening_local(screening, timestamp, user_id=None):
+    """Persist a screening to the local stores (SQLite and the analytics archive)
+    
+    With a user_id the MongoDB copy is queued in the outbox in the same
+    transaction and shipped by the replicator.
+    """
+    # Save to SQLite (keep existing functionality)
+    conn = sqlite3.connect('hemoscan.db')
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO screenings (age, gender, hemoglobin, diet, symptoms, risk_level, probability, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        screening['age'],
+        screening['gender'],
+        screening['hemoglobin'],
+        screening['diet'],
+        ','.join(screening['symptoms']),
+        screening['risk_level'],
+        screening['probability'],
+        datetime.now().isoformat()
+    ))
+    # Compact index row and outbox entry in the same transaction
+    insert_screening_index(cursor, cursor.lastrowid, screening, timestamp)
+    if user_id is not None:
+        enqueue_screening(cursor, user_id, screening, timestamp)
+    conn.commit()
+    conn.close()
+    if user_id is not None:
+        screening_replicator.notify()
+    
+    # Append to the columnar analytics archive
+    try:
+        screening_archive.append({**screening, 'timestamp': timestamp})
+    except Exception as e:
+        print(f"Warning: Could not archive screening: {e}")
+    
+    # Push the new row and its /stats deltas to connected admin dashboards
+    stat_broadcaster.publish('screening', screening_event(screening, timestamp))
+
+def save_screening(user_id, screening):
+    """Persist one screening: a single local commit, replicated to MongoDB in the background"""
+    timestamp = datetime.utcnow().isoformat()
+    save_screening_local(screening, timestamp, user_id)
+
+PREDICT_REQUIRED_FIELDS = ['age', 'gender', 'diet', 'symptoms', 'rural_mode']
+
+def missing_predict_field(data):
+    """First required /predict field absent from the request body, if any"""
+    for field in PREDICT_REQUIRED_FIELDS:
+        if not data or field not in data:
+            return field
+    return None
+
+def run_prediction(data):
+    """Score one validated /predict body
+    
+    Returns the response body and the screening record to persist. CPU-only
+    (no database I/O), so it can also run on an executor in the async server.
+    """
+    # Extract features
+    age = int(data['age'])
+    gender = encode_gender(data['gender'])
+    diet = encode_diet(data['diet'])
+    
+    # Handle hemoglobin (may be None in rural mode)
+    if data.get('rural_mode') and data.get('hemoglobin') is None:
+        # Estimate hemoglobin based on other factors (simplified)
+        hemoglobin = RURAL_HEMOGLOBIN_ESTIMATE
+    else:
+        hemoglobin = float(data.get('hemoglobin', RURAL_HEMOGLOBIN_ESTIMATE))
+    
+    # Prepare feature vector (symptom flags plus symptom count as engineered feature)
+    symptoms_list = data['symptoms']
+    feature_vector = np.array([
+        build_feature_vector(age, gender, hemoglobin, diet, symptoms_list)
+    ])
+    features = dict(zip(FEATURE_COLUMNS, feature_vector[0]))
+    
+    # Track live input distribution for drift monitoring
+    if drift_monitor is not None:
+        drift_monitor.update(feature_vector[0])
+    
+    # Predict (concurrent requests are coalesced into one batched model call)
+    model_start = time.perf_counter()
+    if inference_scheduler is not None:
+        probability = inference_scheduler.predict(feature_vector[0])
+    else:
+        probability = predict_probabilities(feature_vector)[0]
+    model_ms = (time.perf_counter() - model_start) * 1000
+    
+    # Enhanced risk level determination based on medical standards:
+    # adjust for hemoglobin (WHO thresholds) and symptom count
+    probability = float(adjust_probabilities([probability], feature_vector)[0])
+    risk_level = risk_levels([probability])[0]
+    
+    # Sampled copy for the candidate model (background thread, never blocks)
+    shadow_evaluator.offer(feature_vector[0], probability, model_ms)
+    
+    # Get feature importance
+    top_factors = get_feature_importance(feature_vector[0])
+    
+    # Recommendations were built and encoded once per combination at model load
+    recommendations = (recommendation_table.get(recommendation_key(risk_level, features))
+                       or get_recommendations(risk_level, probability, features))
+    
+    # Format top factors for frontend
+    formatted_factors = [
+        {'factor': FACTOR_LABELS.get(factor, factor), 'importance': round(importance, 2)}
+        for factor, importance in top_factors.items()
+    ]
+    
+    result = {
+        'risk_level': risk_level,
+        'risk_score': round(probability * 100, 2),
+        'probability': round(probability, 4),
+        'top_factors': formatted_factors,
+        'recommendations': recommendations
+    }
+    screening = {
+        'age': age,
+        'gender': data['gender'],
+        'hemoglobin': hemoglobin,
+        'diet': data['diet'],
+        'symptoms': symptoms_list,
+        'risk_level': risk_level,
+        'probability': float(probability)
+    }
+    return result, screening
+
 @app.route('/predict', methods=['POST'])
 @jwt_required()
 def predict():
@@ -172,303 +464,560 @@ def predict():
         data = request.json
         
         # Validate inputs
-        required_fields = ['age', 'gender', 'diet', 'symptoms', 'rural_mode']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing field: {field}'}), 400
-        
-        # Extract features
-        age = int(data['age'])
-        gender = 0 if data['gender'].lower() in ['female', 'f'] else 1
-        diet_map = {'poor': 0, 'moderate': 1, 'good': 2}
-        diet = diet_map.get(data['diet'].lower(), 1)
-        
-        # Handle hemoglobin (may be None in rural mode)
-        if data.get('rural_mode') and data.get('hemoglobin') is None:
-            # Estimate hemoglobin based on other factors (simplified)
-            hemoglobin = 12.0  # Default estimate
+        missing = missing_predict_field(data)
+        if missing:
+            return jsonify({'error': f'Missing field: {missing}'}), 400
+        
+        def score_and_save():
+            # Only the scoring holds an admission slot; duplicates waiting on an
+            # in-flight Idempotency-Key don't take one
+            with admission.slot('predict'):
+                result, screening = run_prediction(data)
+                # Persist the screening (SQLite, MongoDB and the analytics archive)
+                save_screening(user_id, screening)
+            return result, 200
+        
+        # Retries carrying the same Idempotency-Key replay the first response without saving again
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            result, _ = score_and_save()
+            return json_response(encode_prediction(result))
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'}), 400
+        
+        result, status, replayed = idempotency_store.run(
+            (user_id, key), request_fingerprint(data), score_and_save, Config.IDEMPOTENCY_WAIT_SECONDS
+        )
+        response = json_response(encode_prediction(result), status)
+        if replayed:
+            response.headers['Idempotent-Replayed'] = 'true'
+        return response
+        
+    except IdempotencyKeyReused as e:
+        return jsonify({'error': str(e)}), 422
+    except IdempotencyInProgress as e:
+        return jsonify({'error': str(e)}), 409
+    except AdmissionRejected:
+        return admission.busy_response()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+FLAG_VALUES = {'true': True, '1': True, 'false': False, '0': False}
+
+def parse_flag(value):
+    """Symptom flag given as a JSON boolean, 0/1 or the strings true/false/1/0"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in FLAG_VALUES:
+        return FLAG_VALUES[value.strip().lower()]
+    raise ValueError(f'Invalid symptom value {value!r}; use true/false or 1/0')
+
+def sweep_values(spec):
+    """Column index, display values and encoded values for one what-if sweep axis"""
+    feature = spec.get('feature')
+    if feature in ['age', 'hemoglobin']:
+        if 'values' in spec:
+            values = [float(v) for v in spec['values']]
         else:
-            hemoglobin = float(data.get('hemoglobin', 12.0))
-        
-        # Extract symptoms
-        symptoms_list = data['symptoms']
-        fatigue = 1 if 'fatigue' in symptoms_list else 0
-        dizziness = 1 if 'dizziness' in symptoms_list else 0
-        pale_skin = 1 if 'pale_skin' in symptoms_list else 0
-        weakness = 1 if 'weakness' in symptoms_list else 0
-        shortness_breath = 1 if 'shortness_breath' in symptoms_list else 0
-        
-        # Prepare feature vector
-        features = {
-            'age': age,
-            'gender': gender,
-            'hemoglobin': hemoglobin,
-            'diet': diet,
-            'fatigue': fatigue,
-            'dizziness': dizziness,
-            'pale_skin': pale_skin,
-            'weakness': weakness,
-            'shortness_breath': shortness_breath
-        }
-        
-        # Calculate symptom count for feature engineering
-        symptom_count = fatigue + dizziness + pale_skin + weakness + shortness_breath
-        
-        feature_vector = np.array([[
-            age, gender, hemoglobin, diet,
-            fatigue, dizziness, pale_skin, weakness, shortness_breath,
-            symptom_count  # Add symptom count as engineered feature
-        ]])
-        
-        # Scale features
-        feature_vector_scaled = scaler.transform(feature_vector)
-        
-        # Predict
-        probability = model.predict_proba(feature_vector_scaled)[0][1]
-        
-        # Enhanced risk level determination based on medical standards
-        # Consider hemoglobin levels and symptoms for more accurate classification
-        hb_threshold_female = 12.0
-        hb_threshold_male = 13.0
-        hb_threshold = hb_threshold_female if gender == 0 else hb_threshold_male
-        
-        # Adjust probability based on hemoglobin (most important factor)
-        if hemoglobin < hb_threshold:
-            # Anemic - increase risk probability
-            hb_adjustment = (hb_threshold - hemoglobin) / hb_threshold * 0.3
-            probability = min(1.0, probability + hb_adjustment)
-        elif hemoglobin >= hb_threshold + 1:
-            # Normal or high - decrease risk probability
-            hb_adjustment = (hemoglobin - hb_threshold) / 5.0 * 0.2
-            probability = max(0.0, probability - hb_adjustment)
-        
-        # Adjust based on symptom count
-        if symptom_count >= 4:
-            probability = min(1.0, probability + 0.15)  # Multiple symptoms increase risk
-        elif symptom_count == 0 and hemoglobin >= hb_threshold:
-            probability = max(0.0, probability - 0.1)  # No symptoms and normal Hb decrease risk
-        
-        # Determine risk level with improved thresholds
-        if probability < 0.25:
-            risk_level = 'Low'
-        elif probability < 0.65:
-            risk_level = 'Moderate'
+            steps = int(spec.get('steps', 10))
+            if steps < 2:
+                raise ValueError('steps must be at least 2')
+            values = np.linspace(float(spec['min']), float(spec['max']), steps).round(2).tolist()
+        return FEATURE_COLUMNS.index(feature), values, values
+    if feature == 'gender':
+        values = spec.get('values', ['female', 'male'])
+        return FEATURE_COLUMNS.index(feature), values, [encode_gender(v) for v in values]
+    if feature == 'diet':
+        values = spec.get('values', list(DIET_MAP))
+        return FEATURE_COLUMNS.index(feature), values, [encode_diet(v) for v in values]
+    if feature in SYMPTOMS:
+        values = [parse_flag(v) for v in spec.get('values', [False, True])]
+        return FEATURE_COLUMNS.index(feature), values, [int(v) for v in values]
+    raise ValueError(f"Cannot sweep '{feature}'; use age, hemoglobin, gender, diet or a symptom")
+
+def run_what_if(data):
+    """Risk curve (one sweep) or surface (two sweeps) around a base profile
+    
+    Scores the whole grid in one model call; nothing is persisted and the
+    drift monitor is not updated.
+    """
+    sweeps = data.get('sweep')
+    if isinstance(sweeps, dict):
+        sweeps = [sweeps]
+    if not sweeps or len(sweeps) > 2:
+        raise ValueError('sweep must list one or two features')
+    
+    if data.get('rural_mode') and data.get('hemoglobin') is None:
+        hemoglobin = RURAL_HEMOGLOBIN_ESTIMATE
+    else:
+        hemoglobin = float(data.get('hemoglobin', RURAL_HEMOGLOBIN_ESTIMATE))
+    base_row = build_feature_vector(int(data['age']), encode_gender(data['gender']), hemoglobin,
+                                    encode_diet(data['diet']), data['symptoms'])
+    
+    axes = [sweep_values(spec) for spec in sweeps]
+    if len({column for column, _, _ in axes}) < len(axes):
+        raise ValueError('Sweep features must be different')
+    shape = tuple(len(values) for _, values, _ in axes)
+    if 0 in shape or int(np.prod(shape)) > Config.WHATIF_MAX_POINTS:
+        raise ValueError(f'Sweep grid must have between 1 and {Config.WHATIF_MAX_POINTS} points')
+    
+    feature_matrix = sweep_matrix(base_row, [(column, encoded) for column, _, encoded in axes])
+    probabilities = adjust_probabilities(predict_probabilities(feature_matrix), feature_matrix)
+    base_probability = adjust_probabilities(predict_probabilities([base_row]), [base_row])[0]
+    
+    return {
+        'base': {
+            'risk_level': risk_levels([base_probability])[0],
+            'risk_score': round(float(base_probability) * 100, 2)
+        },
+        'axes': [
+            {'feature': spec['feature'], 'values': values}
+            for spec, (_, values, _) in zip(sweeps, axes)
+        ],
+        'risk_scores': (probabilities * 100).round(2).reshape(shape).tolist(),
+        'risk_levels': risk_levels(probabilities).reshape(shape).tolist()
+    }
+
+@app.route('/predict/what-if', methods=['POST'])
+@jwt_required()
+@admission.limit('predict')
+def predict_what_if():
+    """Side-effect-free sensitivity sweep, e.g. hemoglobin from 7 to 16 g/dL"""
+    try:
+        data = request.json
+        missing = missing_predict_field(data)
+        if missing:
+            return jsonify({'error': f'Missing field: {missing}'}), 400
+        return jsonify(run_what_if(data))
+    
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({'error': f'Invalid sweep: {e}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def compute_stats():
+    """Admin dashboard statistics from SQLite"""
+    # Get stats from SQLite (existing functionality)
+    conn = sqlite3.connect('hemoscan.db')
+    cursor = conn.cursor()
+    
+    # Total screenings
+    cursor.execute('SELECT COUNT(*) FROM screenings')
+    total_screenings = cursor.fetchone()[0]
+    
+    # Risk distribution
+    cursor.execute('''
+        SELECT risk_level, COUNT(*) as count
+        FROM screenings
+        GROUP BY risk_level
+    ''')
+    risk_dist = {row[0]: row[1] for row in cursor.fetchall()}
+    
+    # Age distribution (bins)
+    cursor.execute('SELECT age FROM screenings')
+    ages = [row[0] for row in cursor.fetchall()]
+    
+    # Recent predictions (last 10)
+    cursor.execute('''
+        SELECT age, gender, risk_level, probability, timestamp
+        FROM screenings
+        ORDER BY timestamp DESC
+        LIMIT 10
+    ''')
+    recent = []
+    for row in cursor.fetchall():
+        recent.append({
+            'age': row[0],
+            'gender': row[1],
+            'risk_level': row[2],
+            'probability': round(row[3] * 100, 2),
+            'timestamp': row[4]
+        })
+    
+    conn.close()
+    
+    # Age distribution bins
+    age_bins = {'18-30': 0, '31-45': 0, '46-60': 0, '61+': 0}
+    for age in ages:
+        if age <= 30:
+            age_bins['18-30'] += 1
+        elif age <= 45:
+            age_bins['31-45'] += 1
+        elif age <= 60:
+            age_bins['46-60'] += 1
         else:
-            risk_level = 'High'
-        
-        # Get feature importance
-        top_factors = get_feature_importance(feature_vector[0])
-        
-        # Get recommendations
-        recommendations = get_recommendations(risk_level, probability, features)
-        
-        # Save to SQLite (keep existing functionality)
-        conn = sqlite3.connect('hemoscan.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO screenings (age, gender, hemoglobin, diet, symptoms, risk_level, probability, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            age,
-            data['gender'],
-            hemoglobin,
-            data['diet'],
-            ','.join(symptoms_list),
-            risk_level,
-            float(probability),
-            datetime.now().isoformat()
-        ))
-        conn.commit()
-        conn.close()
-        
-        # Save to MongoDB with user association
+            age_bins['61+'] += 1
+    
+    return {
+        'total_screenings': total_screenings,
+        'risk_distribution': risk_dist,
+        'age_distribution': age_bins,
+        'recent_predictions': recent
+    }
+
+@app.route('/admin/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def admin_stream():
+    """Server-Sent Events feed of new screenings and /stats deltas (EventSource passes the token as ?jwt=)"""
+    # Not behind admin admission control: the connection stays open, but costs no queries
+    error = admin_check_error(get_jwt_identity())
+    if error:
+        return error
+    
+    subscriber = stat_broadcaster.subscribe()
+    if subscriber is None:
+        return jsonify({'error': 'Too many live dashboard connections'}), 503
+    
+    def events():
         try:
-            db = Database.get_db()
-            screenings_collection = db.screenings
-            
-            # Create indexes if they don't exist (for first screening)
-            try:
-                screenings_collection.create_index("user_id")
-                screenings_collection.create_index("timestamp")
-            except Exception:
-                pass  # Indexes already exist
-            
-            screening_doc = {
-                'user_id': ObjectId(user_id),
-                'age': age,
-                'gender': data['gender'],
-                'hemoglobin': hemoglobin,
-                'diet': data['diet'],
-                'symptoms': symptoms_list,
-                'risk_level': risk_level,
-                'probability': float(probability),
-                'timestamp': datetime.utcnow().isoformat()
-            }
-            screenings_collection.insert_one(screening_doc)
-        except Exception as e:
-            # Log error but don't fail the request (SQLite backup still works)
-            print(f"Warning: Could not save to MongoDB: {e}")
-        
-        # Format top factors for frontend
-        formatted_factors = []
-        factor_labels = {
-            'age': 'Age',
-            'gender': 'Gender',
-            'hemoglobin': 'Hemoglobin Level',
-            'diet': 'Diet Quality',
-            'fatigue': 'Fatigue',
-            'dizziness': 'Dizziness',
-            'pale_skin': 'Pale Skin',
-            'weakness': 'Weakness',
-            'shortness_breath': 'Shortness of Breath'
-        }
-        
-        for factor, importance in top_factors.items():
-            formatted_factors.append({
-                'factor': factor_labels.get(factor, factor),
-                'importance': round(importance, 2)
-            })
-        
-        return jsonify({
-            'risk_level': risk_level,
-            'risk_score': round(probability * 100, 2),
-            'probability': round(probability, 4),
-            'top_factors': formatted_factors,
-            'recommendations': recommendations
-        })
+            yield 'retry: 5000\n\n'
+            yield from subscriber.events(Config.STREAM_HEARTBEAT_SECONDS)
+        finally:
+            stat_broadcaster.unsubscribe(subscriber)
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # disable proxy buffering (nginx)
+    })
+
+def stats_validator():
+    """Cheap change marker for /stats: newest and oldest screening id plus model version"""
+    conn = sqlite3.connect('hemoscan.db')
+    # Separate subqueries so each is a single primary-key lookup
+    newest, oldest = conn.execute('''
+        SELECT (SELECT MAX(id) FROM screenings), (SELECT MIN(id) FROM screenings)
+    ''').fetchone()
+    conn.close()
+    return ('stats', newest, oldest, model_metadata.get('version'))
+
+@app.route('/stats', methods=['GET'])
+@admin_required
+def get_stats():
+    """Get statistics for admin dashboard"""
+    try:
+        return conditional_json(stats_validator(), compute_stats)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/stats', methods=['GET'])
+def format_screening(screening):
+    """API representation of a MongoDB screening document"""
+    return {
+        'id': str(screening['_id']),
+        'age': screening.get('age'),
+        'gender': screening.get('gender'),
+        'hemoglobin': screening.get('hemoglobin'),
+        'diet': screening.get('diet'),
+        'symptoms': screening.get('symptoms', []),
+        'risk_level': screening.get('risk_level'),
+        'risk_score': round(screening.get('probability', 0) * 100, 2),
+        'probability': screening.get('probability', 0),
+        'timestamp': screening.get('timestamp')
+    }
+
+def user_screenings_validator(user_id):
+    """Cheap change marker for a user's history: latest screening id and count (index-only)
+    plus the user's unreplicated outbox entries"""
+    db = Database.get_db()
+    query = {'user_id': ObjectId(user_id)}
+    latest = db.screenings.find_one(query, {'_id': 1}, sort=[('timestamp', -1)])
+    return (user_id, latest['_id'] if latest else None, db.screenings.count_documents(query),
+            *pending_marker(user_id))
+
+@app.route('/user/predictions', methods=['GET'])
 @jwt_required()
-def get_stats():
-    """Get statistics for admin dashboard"""
+def get_user_predictions():
+    """Get all predictions for the current user"""
     try:
-        # Check if user is admin
         user_id = get_jwt_identity()
         db = Database.get_db()
-        users_collection = db.users
-        user = users_collection.find_one({'_id': ObjectId(user_id)})
-        
-        if not user or user.get('role') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
-        # Get stats from SQLite (existing functionality)
-        conn = sqlite3.connect('hemoscan.db')
-        cursor = conn.cursor()
-        
-        # Total screenings
-        cursor.execute('SELECT COUNT(*) FROM screenings')
-        total_screenings = cursor.fetchone()[0]
-        
-        # Risk distribution
-        cursor.execute('''
-            SELECT risk_level, COUNT(*) as count
-            FROM screenings
-            GROUP BY risk_level
-        ''')
-        risk_dist = {row[0]: row[1] for row in cursor.fetchall()}
-        
-        # Age distribution (bins)
-        cursor.execute('SELECT age FROM screenings')
-        ages = [row[0] for row in cursor.fetchall()]
+        screenings_collection = db.screenings
         
-        # Recent predictions (last 10)
-        cursor.execute('''
-            SELECT age, gender, risk_level, probability, timestamp
-            FROM screenings
-            ORDER BY timestamp DESC
-            LIMIT 10
-        ''')
-        recent = []
-        for row in cursor.fetchall():
-            recent.append({
-                'age': row[0],
-                'gender': row[1],
-                'risk_level': row[2],
-                'probability': round(row[3] * 100, 2),
-                'timestamp': row[4]
-            })
+        def build():
+            # Get all screenings for this user, sorted by timestamp (newest first)
+            screenings = list(screenings_collection.find(
+                {'user_id': ObjectId(user_id)}
+            ).sort('timestamp', -1))
+            # MongoDB holds the user's history; this instance's outbox holds what it hasn't shipped yet
+            screenings = merge_pending(screenings, pending_documents(user_id))
+            
+            # Format results
+            results = [format_screening(screening) for screening in screenings]
+            return {
+                'predictions': results,
+                'total': len(results)
+            }
         
-        conn.close()
+        return conditional_json(('predictions',) + user_screenings_validator(user_id), build)
         
-        # Age distribution bins
-        age_bins = {'18-30': 0, '31-45': 0, '46-60': 0, '61+': 0}
-        for age in ages:
-            if age <= 30:
-                age_bins['18-30'] += 1
-            elif age <= 45:
-                age_bins['31-45'] += 1
-            elif age <= 60:
-                age_bins['46-60'] += 1
-            else:
-                age_bins['61+'] += 1
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/drift', methods=['GET'])
+@admin_required
+def get_drift():
+    """Input drift of live /predict features against the training distribution"""
+    try:
+        if drift_monitor is None:
+            return jsonify({'error': 'No drift reference saved with the model - retrain to enable'}), 404
         
-        return jsonify({
-            'total_screenings': total_screenings,
-            'risk_distribution': risk_dist,
-            'age_distribution': age_bins,
-            'recent_predictions': recent
-        })
+        report = drift_monitor.report()
+        report['model_version'] = model_metadata.get('version')
+        return jsonify(report), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/user/predictions', methods=['GET'])
+@app.route('/admin/drift/reset', methods=['POST'])
+@admin_required
+def reset_drift():
+    """Start a new drift observation window"""
+    if drift_monitor is None:
+        return jsonify({'error': 'No drift reference saved with the model - retrain to enable'}), 404
+    drift_monitor.reset()
+    return jsonify({'message': 'Drift counters reset'}), 200
+
+def user_summary_pipeline(user_id, buckets):
+    """Aggregation computing a user's screening summary"""
+    # One aggregation on the (user_id, timestamp) index: overall stats plus
+    # the risk-score series downsampled into at most `buckets` time buckets
+    return [
+        {'$match': {'user_id': ObjectId(user_id)}},
+        {'$sort': {'timestamp': 1}},
+        {'$facet': {
+            'stats': [
+                {'$group': {
+                    '_id': None,
+                    'count': {'$sum': 1},
+                    'hemoglobin_min': {'$min': '$hemoglobin'},
+                    'hemoglobin_mean': {'$avg': '$hemoglobin'},
+                    'hemoglobin_max': {'$max': '$hemoglobin'},
+                    'first_timestamp': {'$first': '$timestamp'},
+                    'latest_timestamp': {'$last': '$timestamp'},
+                    'latest_risk_level': {'$last': '$risk_level'},
+                    'latest_probability': {'$last': '$probability'}
+                }}
+            ],
+            'trend': [
+                # Equal-size buckets by position in the sorted series: bucket = floor(index * buckets / count)
+                {'$group': {
+                    '_id': None,
+                    'points': {'$push': {'timestamp': '$timestamp', 'probability': '$probability'}},
+                    'count': {'$sum': 1}
+                }},
+                {'$unwind': {'path': '$points', 'includeArrayIndex': 'index'}},
+                {'$group': {
+                    '_id': {'$floor': {'$divide': [{'$multiply': ['$index', buckets]}, '$count']}},
+                    'start': {'$min': '$points.timestamp'},
+                    'end': {'$max': '$points.timestamp'},
+                    'count': {'$sum': 1},
+                    'probability': {'$avg': '$points.probability'},
+                    'max_probability': {'$max': '$points.probability'}
+                }},
+                {'$sort': {'_id': 1}}
+            ]
+        }}
+    ]
+
+def format_user_summary(result):
+    """API representation of the user summary aggregation result"""
+    if not result['stats']:
+        return {'total': 0, 'latest': None, 'hemoglobin': None, 'trend': []}
+    
+    stats = result['stats'][0]
+    return {
+        'total': stats['count'],
+        'first_timestamp': stats['first_timestamp'],
+        'latest': {
+            'risk_level': stats['latest_risk_level'],
+            'risk_score': round((stats['latest_probability'] or 0) * 100, 2),
+            'timestamp': stats['latest_timestamp']
+        },
+        'hemoglobin': {
+            'min': stats['hemoglobin_min'],
+            'mean': round(stats['hemoglobin_mean'], 2) if stats['hemoglobin_mean'] is not None else None,
+            'max': stats['hemoglobin_max']
+        },
+        'trend': [
+            {
+                'start': bucket['start'],
+                'end': bucket['end'],
+                'count': bucket['count'],
+                'risk_score': round(bucket['probability'] * 100, 2),
+                'max_risk_score': round(bucket['max_probability'] * 100, 2)
+            }
+            for bucket in result['trend']
+        ]
+    }
+
+@app.route('/user/summary', methods=['GET'])
 @jwt_required()
-def get_user_predictions():
-    """Get all predictions for the current user"""
+def get_user_summary():
+    """Constant-size trend summary of the current user's screenings"""
     try:
         user_id = get_jwt_identity()
+        buckets = min(max(int(request.args.get('buckets', 20)), 1), 100)
         db = Database.get_db()
-        screenings_collection = db.screenings
         
-        # Get all screenings for this user, sorted by timestamp (newest first)
-        screenings = list(screenings_collection.find(
-            {'user_id': ObjectId(user_id)}
-        ).sort('timestamp', -1))
+        def build():
+            # The aggregation runs in MongoDB, so ship this user's pending screenings first
+            if pending_marker(user_id)[0]:
+                try:
+                    screening_replicator.replicate_once()
+                except Exception:
+                    pass  # summarize what MongoDB has; the replicator keeps retrying
+            pipeline = user_summary_pipeline(user_id, buckets)
+            result = next(db.screenings.aggregate(pipeline), {'stats': [], 'trend': []})
+            return format_user_summary(result)
         
-        # Format results
-        results = []
-        for screening in screenings:
-            results.append({
-                'id': str(screening['_id']),
-                'age': screening.get('age'),
-                'gender': screening.get('gender'),
-                'hemoglobin': screening.get('hemoglobin'),
-                'diet': screening.get('diet'),
-                'symptoms': screening.get('symptoms', []),
-                'risk_level': screening.get('risk_level'),
-                'risk_score': round(screening.get('probability', 0) * 100, 2),
-                'probability': screening.get('probability', 0),
-                'timestamp': screening.get('timestamp')
-            })
+        return conditional_json(('summary', buckets) + user_screenings_validator(user_id), build)
         
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/model/explanations', methods=['GET'])
+@jwt_required()
+def get_explanations():
+    """Permutation importance and partial-dependence tables computed at training time"""
+    if explanations is None:
+        return jsonify({'error': 'No explanations saved with the model - retrain to enable'}), 404
+    return jsonify({'model_version': model_metadata.get('version'), **explanations}), 200
+
+@app.route('/admin/replication', methods=['GET'])
+@admin_required
+def get_replication():
+    """Outbox backlog, replication lag and checkpoint of the MongoDB replica"""
+    try:
+        return jsonify(screening_replicator.status()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/shadow', methods=['GET'])
+@admin_required
+def get_shadow_report():
+    """Agreement, risk-level confusion and latency of the candidate vs the serving model"""
+    report = shadow_evaluator.report()
+    report['serving_version'] = model_metadata.get('version')
+    return jsonify(report), 200
+
+@app.route('/admin/shadow/reload', methods=['POST'])
+@admin_required
+def reload_shadow():
+    """Load the candidate currently in SHADOW_MODEL_DIR and start a new comparison window"""
+    try:
+        if not shadow_evaluator.load():
+            return jsonify({'error': f'No candidate model in {Config.SHADOW_MODEL_DIR}'}), 404
+        return jsonify({
+            'message': 'Shadow candidate loaded',
+            'candidate_version': shadow_evaluator.metadata.get('version')
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/model/reload', methods=['POST'])
+@admin_required
+def reload_model():
+    """Swap in the currently published model artifacts without a restart"""
+    try:
+        load_model()
         return jsonify({
-            'predictions': results,
-            'total': len(results)
+            'message': 'Model reloaded',
+            'model_version': model_metadata.get('version'),
+            'model_type': model_metadata.get('model_type')
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/metrics', methods=['GET'])
+@admin_required
+def get_metrics():
+    """Process counters and gauges (admission, load shedding, batching); admin only, as they include error text"""
+    return jsonify(metrics.snapshot())
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'model_loaded': model is not None})
+    return jsonify({
+        'status': 'healthy',
+        'model_loaded': model is not None,
+        'model_version': model_metadata.get('version'),
+        'model_type': model_metadata.get('model_type'),
+        'runtime': Config.INFERENCE_RUNTIME,
+        'inference': inference_scheduler.stats() if inference_scheduler else None
+    })
+
+def run_scheduled_maintenance():
+    """Retention pass over SQLite, MongoDB (when reachable) and the analytics archive"""
+    try:
+        mongo_db = Database.get_db()
+    except Exception as e:
+        print(f"Warning: MongoDB unavailable for maintenance: {e}")
+        mongo_db = None
+    return run_maintenance(mongo_db=mongo_db, screening_archive=screening_archive)
+
+maintenance_scheduler = MaintenanceScheduler(run_scheduled_maintenance, Config.MAINTENANCE_INTERVAL_HOURS)
+
+@app.route('/admin/maintenance', methods=['GET'])
+@admin_required
+def get_maintenance():
+    """Report of the last retention/maintenance pass"""
+    return jsonify({
+        'retention_days': Config.RETENTION_DAYS,
+        'interval_hours': Config.MAINTENANCE_INTERVAL_HOURS,
+        'running': maintenance_scheduler.running,
+        'last_report': maintenance_scheduler.last_report
+    }), 200
+
+@app.route('/admin/maintenance/run', methods=['POST'])
+@admin_required
+def run_maintenance_now():
+    """Start a maintenance pass in the background"""
+    if maintenance_scheduler.running:
+        return jsonify({'error': 'Maintenance is already running'}), 409
+    threading.Thread(target=maintenance_scheduler.run_once, daemon=True).start()
+    return jsonify({'message': 'Maintenance started'}), 202
+
+@app.before_request
+def ensure_background_threads():
+    """Start the maintenance schedule and the outbox replicator in whichever process serves requests
+    
+    gunicorn, `flask run` and other hosts import this module without running
+    the __main__ block; both starts are no-ops once the threads are running.
+    """
+    maintenance_scheduler.start()
+    screening_replicator.start()
+
+def start_background_workers():
+    """Start worker pools and threads that run alongside the API"""
+    # Screening job pool (resumes jobs interrupted by a restart)
+    resumed = job_manager.start()
+    if resumed:
+        print(f"Resumed {resumed} screening job(s)")
+    
+    # Periodic retention, VACUUM/ANALYZE and archive compaction
+    maintenance_scheduler.start()
+    
+    # Outbox shipping of committed screenings to MongoDB
+    screening_replicator.start()
 
 if __name__ == '__main__':
     # Initialize database
     init_db()
     
     # Load model
-    if os.path.exists(MODEL_PATH):
+    if os.path.exists(RUNTIME_EXPORT_PATH if Config.INFERENCE_RUNTIME == 'numpy' else MODEL_PATH):
         load_model()
     else:
         print("Model not found! Please run train_model.py first.")
         exit(1)
     
+    # The debug reloader runs this block twice; only the serving child starts workers
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_workers()
+    
     # Run app
     app.run(debug=True, port=5000)
 
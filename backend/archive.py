@@ -0,0 +1,348 @@
+"""
+Columnar screening archive for HemoScan AI
+Append-only, day-partitioned .npy column segments with vectorized analytics scans
+"""
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+import numpy as np
+from scoring import RISK_LEVELS, SYMPTOMS, DIET_MAP, encode_gender, encode_diet, symptom_mask
+
+# Column name -> on-disk dtype
+ARCHIVE_COLUMNS = {
+    'timestamp': np.int64,      # UTC epoch seconds
+    'age': np.int16,
+    'gender': np.int8,          # 0 female, 1 male
+    'hemoglobin': np.float32,
+    'diet': np.int8,            # 0 poor, 1 moderate, 2 good
+    'symptom_mask': np.uint8,   # bit i set = SYMPTOMS[i] reported
+    'risk_level': np.int8,      # index into RISK_LEVELS
+    'probability': np.float32
+}
+NUMERIC_COLUMNS = ['age', 'hemoglobin', 'probability', 'symptom_count']
+
+# Decoded labels for categorical group-by keys
+CATEGORY_LABELS = {
+    'gender': ['Female', 'Male'],
+    'diet': sorted(DIET_MAP, key=DIET_MAP.get),
+    'risk_level': RISK_LEVELS
+}
+AGE_GROUP_EDGES = [30, 45, 60]
+AGE_GROUP_LABELS = ['18-30', '31-45', '46-60', '61+']
+GROUP_BY_KEYS = ['gender', 'diet', 'risk_level', 'age_group', 'day'] + SYMPTOMS
+
+
+def _partition_name(day):
+    return f'date={day.isoformat()}'
+
+
+def _to_epoch(timestamp):
+    """ISO timestamp (naive = UTC) or datetime to epoch seconds"""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return int(timestamp.timestamp())
+
+
+class ColumnarArchive:
+    """Append-only screening archive stored as one directory per UTC day
+
+    Rows are buffered in memory and flushed as immutable segments (one .npy
+    file per column) once flush_rows are buffered or by a background timer
+    every flush_seconds. A partition that collects more than max_segments
+    segments (sparse traffic, frequent scans) is merged after the flush.
+    Queries memory-map only the columns they need from the partitions that
+    overlap the requested date range.
+    """
+
+    def __init__(self, root='archive/screenings', flush_rows=512, flush_seconds=30.0, max_segments=32):
+        self.root = root
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.max_segments = max_segments
+        self._buffer = []
+        self._lock = threading.Lock()
+        # Held while listing/opening segments and while compaction swaps them
+        self._files_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._timer = None
+
+    def append(self, screening):
+        """Buffer one screening (dict with the fields stored in SQLite/MongoDB)"""
+        row = (
+            _to_epoch(screening['timestamp']),
+            int(screening['age']),
+            encode_gender(screening['gender']),
+            float(screening['hemoglobin']),
+            encode_diet(screening['diet']),
+            symptom_mask(screening['symptoms']),
+            RISK_LEVELS.index(screening['risk_level']),
+            float(screening['probability'])
+        )
+        with self._lock:
+            self._buffer.append(row)
+            due = len(self._buffer) >= self.flush_rows
+            if self._timer is None:
+                self._timer = threading.Thread(target=self._flush_periodically, name='hemoscan-archive-flush',
+                                               daemon=True)
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Warning: Could not flush screening archive: {e}")
+
+    def flush(self):
+        """Write buffered rows as one new segment per day partition"""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+
+        columns = {
+            name: np.array([row[i] for row in rows], dtype=dtype)
+            for i, (name, dtype) in enumerate(ARCHIVE_COLUMNS.items())
+        }
+        days = columns['timestamp'] // 86400
+        for day in np.unique(days):
+            mask = days == day
+            partition = os.path.join(
+                self.root,
+                _partition_name(datetime.fromtimestamp(int(day) * 86400, timezone.utc).date())
+            )
+            os.makedirs(partition, exist_ok=True)
+            # Write into a hidden directory and rename so readers never see partial segments
+            segment = f'seg-{time.time_ns()}-{uuid.uuid4().hex[:8]}'
+            tmp_path = os.path.join(partition, f'.{segment}')
+            os.makedirs(tmp_path)
+            for name, values in columns.items():
+                np.save(os.path.join(tmp_path, f'{name}.npy'), values[mask])
+            os.rename(tmp_path, os.path.join(partition, segment))
+            if len(self._partition_segments(partition)) > self.max_segments:
+                self._compact_partition(partition)
+        return len(rows)
+
+    @staticmethod
+    def _partition_segments(partition_path):
+        return [
+            os.path.join(partition_path, name)
+            for name in sorted(os.listdir(partition_path)) if name.startswith('seg-')
+        ]
+
+    def _compact_partition(self, partition_path):
+        """Merge a partition's current segments into one; returns the number merged"""
+        with self._compact_lock:
+            segments = self._partition_segments(partition_path)
+            if len(segments) < 2:
+                return 0
+            self._merge_segments(partition_path, segments)
+        return len(segments)
+
+    def _merge_segments(self, partition_path, segments):
+        segment = f'seg-{time.time_ns()}-{uuid.uuid4().hex[:8]}'
+        tmp_path = os.path.join(partition_path, f'.{segment}')
+        os.makedirs(tmp_path)
+        for name in ARCHIVE_COLUMNS:
+            np.save(
+                os.path.join(tmp_path, f'{name}.npy'),
+                np.concatenate([np.load(os.path.join(s, f'{name}.npy')) for s in segments])
+            )
+        # Swap under the files lock so a concurrent scan sees either the old segments or the merged one
+        with self._files_lock:
+            os.rename(tmp_path, os.path.join(partition_path, segment))
+            for old in segments:
+                shutil.rmtree(old)
+
+    def compact(self, before=None):
+        """Merge the segments of each closed partition (days before ``before``) into one"""
+        before = before or datetime.now(timezone.utc).date()
+        merged = 0
+        for partition in sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []:
+            if partition.startswith('date=') and partition[5:] < before.isoformat():
+                merged += self._compact_partition(os.path.join(self.root, partition))
+        return merged
+
+    def _segments(self, start=None, end=None):
+        """Segment directories in partitions overlapping [start, end] (dates, inclusive)"""
+        if not os.path.isdir(self.root):
+            return []
+        segments = []
+        for partition in sorted(os.listdir(self.root)):
+            if not partition.startswith('date='):
+                continue
+            day = datetime.strptime(partition[5:], '%Y-%m-%d').date()
+            if (start and day < start) or (end and day > end):
+                continue  # partition pruning
+            segments.extend(self._partition_segments(os.path.join(self.root, partition)))
+        return segments
+
+    def _open_segments(self, stored, start=None, end=None, attempts=3):
+        """Memory-map the stored columns of every segment in range
+
+        Memory maps stay readable after compaction removes the files, so the
+        lock only covers opening them. Compaction run by another process
+        (maintenance.py) isn't covered by the lock; a segment that vanishes
+        mid-listing means a merged one replaced it, so the listing is retried.
+        """
+        for attempt in range(attempts):
+            parts = {name: [] for name in stored}
+            try:
+                with self._files_lock:
+                    for segment in self._segments(start, end):
+                        for name in stored:
+                            parts[name].append(np.load(os.path.join(segment, f'{name}.npy'), mmap_mode='r'))
+                return parts
+            except FileNotFoundError:
+                if attempt == attempts - 1:
+                    raise
+
+    def scan(self, columns, start=None, end=None, filters=None):
+        """Load the requested (derived) columns for rows matching date range and filters
+
+        start/end are ``date`` objects; filters map a categorical column
+        (gender, diet, risk_level, or a symptom name) to the wanted code.
+        """
+        self.flush()
+        filters = filters or {}
+        needed = {'timestamp'} | set(filters) | set(columns)
+        stored = set()
+        for name in needed:
+            if name in ARCHIVE_COLUMNS:
+                stored.add(name)
+            elif name in SYMPTOMS or name == 'symptom_count':
+                stored.add('symptom_mask')
+            elif name == 'age_group':
+                stored.add('age')
+
+        parts = self._open_segments(stored, start, end)
+        data = {
+            name: (np.concatenate(arrays) if arrays else np.empty(0, dtype=ARCHIVE_COLUMNS[name]))
+            for name, arrays in parts.items()
+        }
+
+        # Row filter: exact date bounds inside boundary partitions, then categorical filters
+        mask = np.ones(len(data['timestamp']), dtype=bool)
+        if start:
+            mask &= data['timestamp'] >= _to_epoch(datetime.combine(start, datetime.min.time()))
+        if end:
+            mask &= data['timestamp'] < _to_epoch(datetime.combine(end + timedelta(days=1), datetime.min.time()))
+
+        derived = self._derive(data)
+        for name, code in filters.items():
+            mask &= derived[name] == code
+        return {name: derived[name][mask] for name in columns}
+
+    @staticmethod
+    def _derive(data):
+        """Stored columns plus lazily computed derived columns"""
+        derived = dict(data)
+        if 'symptom_mask' in data:
+            masks = data['symptom_mask']
+            for bit, symptom in enumerate(SYMPTOMS):
+                derived[symptom] = ((masks >> bit) & 1).astype(np.int8)
+            derived['symptom_count'] = sum(derived[s] for s in SYMPTOMS).astype(np.int8)
+        if 'age' in data:
+            derived['age_group'] = np.digitize(data['age'], AGE_GROUP_EDGES, right=True)
+        if 'timestamp' in data:
+            derived['day'] = data['timestamp'] // 86400
+        return derived
+
+    def group_by(self, by, metric=None, agg='count', start=None, end=None, filters=None):
+        """Aggregate ``metric`` per distinct ``by`` key (count/sum/mean/min/max)"""
+        columns = [by] + ([metric] if metric else [])
+        data = self.scan(columns, start, end, filters)
+        keys, inverse, counts = np.unique(data[by], return_inverse=True, return_counts=True)
+
+        if agg == 'count' or not metric:
+            values = counts.astype(float)
+        else:
+            metric_values = data[metric].astype(np.float64)
+            if agg in ('sum', 'mean'):
+                values = np.bincount(inverse, weights=metric_values, minlength=len(keys))
+                if agg == 'mean':
+                    values = values / counts
+            elif agg in ('min', 'max'):
+                order = np.argsort(inverse, kind='stable')
+                starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.intp)
+                reducer = np.minimum if agg == 'min' else np.maximum
+                values = reducer.reduceat(metric_values[order], starts) if len(keys) else np.empty(0)
+            else:
+                raise ValueError(f'Unsupported aggregation: {agg}')
+
+        return [
+            {'key': self._label(by, key), 'count': int(count), 'value': round(float(value), 4)}
+            for key, count, value in zip(keys, counts, values)
+        ]
+
+    def percentiles(self, column, quantiles, start=None, end=None, filters=None):
+        """Percentiles (0-100) of a numeric column"""
+        values = self.scan([column], start, end, filters)[column]
+        if len(values) == 0:
+            return {'count': 0, 'percentiles': {}}
+        result = np.percentile(values.astype(np.float64), quantiles)
+        return {
+            'count': int(len(values)),
+            'percentiles': {str(q): round(float(v), 4) for q, v in zip(quantiles, result)}
+        }
+
+    def histogram(self, column, bins=10, value_range=None, start=None, end=None, filters=None):
+        """Fixed-width histogram of a numeric column"""
+        values = self.scan([column], start, end, filters)[column]
+        counts, edges = np.histogram(values.astype(np.float64), bins=bins, range=value_range)
+        return {
+            'count': int(len(values)),
+            'edges': [round(float(e), 4) for e in edges],
+            'counts': counts.tolist()
+        }
+
+    @staticmethod
+    def _label(by, key):
+        if by in CATEGORY_LABELS:
+            return CATEGORY_LABELS[by][int(key)]
+        if by == 'age_group':
+            return AGE_GROUP_LABELS[int(key)]
+        if by == 'day':
+            return datetime.fromtimestamp(int(key) * 86400, timezone.utc).date().isoformat()
+        return int(key)
+
+    def backfill_from_sqlite(self, db_path='hemoscan.db', batch_size=10000):
+        """One-off import of existing SQLite screenings into the archive"""
+        import sqlite3
+        conn = sqlite3.connect(db_path)
+        cursor = conn.execute('''
+            SELECT age, gender, hemoglobin, diet, symptoms, risk_level, probability, timestamp
+            FROM screenings ORDER BY id
+        ''')
+        total = 0
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for age, gender, hemoglobin, diet, symptoms, risk_level, probability, timestamp in rows:
+                self.append({
+                    'age': age, 'gender': gender, 'hemoglobin': hemoglobin, 'diet': diet,
+                    'symptoms': symptoms.split(',') if symptoms else [],
+                    'risk_level': risk_level, 'probability': probability,
+                    # SQLite timestamps are local time
+                    'timestamp': datetime.fromisoformat(timestamp).astimezone(timezone.utc)
+                })
+            total += len(rows)
+        conn.close()
+        self.flush()
+        return total
+
+
+if __name__ == '__main__':
+    from config import Config
+    imported = ColumnarArchive(Config.ARCHIVE_DIR).backfill_from_sqlite()
+    print(f"Archived {imported} screenings from hemoscan.db")
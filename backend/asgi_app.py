@@ -0,0 +1,512 @@
+"""
+Asynchronous ASGI server for HemoScan AI
+Serves the same routes and JWT tokens as app.py. Auth, prediction, history, stats, the
+admin live feed and job uploads are native async handlers with non-blocking MongoDB I/O
+(Motor); model inference, bcrypt and SQLite work run on a thread pool so the event loop
+never blocks. The low-traffic admin and job routes (analytics, search, drift, shadow,
+model reload, replication, maintenance, job status/results) are served by the Flask views
+themselves through a WSGI mount, so both servers share one implementation.
+
+Run with: uvicorn asgi_app:app --port 5000
+"""
+
+import asyncio
+import os
+import uuid
+import warnings
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import wraps
+import jwt
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from config import Config
+from database import Database
+from admission import admission, AdmissionRejected
+from auth_routes import bcrypt, validate_email, validate_password
+from metrics import metrics
+from http_cache import make_etag, etag_matches, gzip_body
+from idempotency import IdempotencyKeyReused, IdempotencyInProgress, MAX_KEY_LENGTH, request_fingerprint
+from responses import dumps, encode_prediction
+from screening_store import pending_documents, pending_marker, merge_pending
+import app as flask_app  # model state plus the shared scoring/formatting helpers
+
+with warnings.catch_warnings():
+    # Deprecated in newer Starlette releases; fine for the low-traffic routes it serves here
+    warnings.simplefilter('ignore', DeprecationWarning)
+    from starlette.middleware.wsgi import WSGIMiddleware
+
+executor = ThreadPoolExecutor(max_workers=Config.ASYNC_EXECUTOR_WORKERS, thread_name_prefix='hemoscan-cpu')
+mongo_client = None
+db = None
+
+# Flask app for the routes without a native async handler
+flask_routes = WSGIMiddleware(flask_app.app)
+
+
+async def run_blocking(fn, *args):
+    """Run CPU-bound or blocking work on the executor"""
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+# Admission control shared with app.py (same gates), capped so that an admitted request
+# always finds a free executor thread
+admission.cap_concurrency(Config.ASYNC_EXECUTOR_WORKERS)
+
+
+@asynccontextmanager
+async def admission_slot(route_class):
+    """Hold an admission slot across awaits; queued requests wait on the event loop, holding no thread"""
+    await admission.acquire_async(route_class)
+    try:
+        yield
+    finally:
+        admission.release(route_class)
+
+
+def busy_response():
+    return JSONResponse({'error': 'Server is busy, please retry shortly'}, status_code=503,
+                        headers={'Retry-After': str(admission.retry_after)})
+
+
+def limited(route_class):
+    """Async counterpart of admission.limit()"""
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(request, *args):
+            try:
+                async with admission_slot(route_class):
+                    return await fn(request, *args)
+            except AdmissionRejected:
+                return busy_response()
+        return wrapper
+    return decorator
+
+
+async def json_body(request):
+    try:
+        return await request.json()
+    except Exception:
+        return None
+
+
+async def conditional_json(request, validator, build):
+    """304 when the client's copy is current, otherwise the JSON from await build() with its ETag"""
+    etag = make_etag(*validator)
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache', 'Vary': 'Authorization, Accept-Encoding'}
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+
+    body = dumps(await build())
+    compressed = gzip_body(body, request.headers.get('accept-encoding'))
+    if compressed is None:
+        return Response(body, media_type='application/json', headers=headers)
+    return Response(compressed, media_type='application/json', headers={**headers, 'Content-Encoding': 'gzip'})
+
+
+async def user_screenings_validator(user_id):
+    """Async counterpart of app.user_screenings_validator"""
+    query = {'user_id': ObjectId(user_id)}
+    latest = await db.screenings.find_one(query, {'_id': 1}, sort=[('timestamp', -1)])
+    return (user_id, latest['_id'] if latest else None, await db.screenings.count_documents(query),
+            *await run_blocking(pending_marker, user_id))
+
+
+# JWT handling compatible with flask-jwt-extended (HS256, identity in "sub", no expiry)
+
+def create_access_token(identity):
+    now = datetime.now(timezone.utc)
+    claims = {
+        'fresh': False,
+        'iat': now,
+        'jti': str(uuid.uuid4()),
+        'type': 'access',
+        'sub': identity,
+        'nbf': now
+    }
+    return jwt.encode(claims, Config.JWT_SECRET_KEY, algorithm='HS256')
+
+
+def token_identity(token):
+    """(identity, None) for a valid access token, else (None, the error response)"""
+    try:
+        claims = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=['HS256'])
+    except jwt.PyJWTError as e:
+        return None, JSONResponse({'msg': str(e)}, status_code=422)
+    if claims.get('type') != 'access':
+        return None, JSONResponse({'msg': 'Only non-refresh tokens are allowed'}, status_code=422)
+    return claims['sub'], None
+
+
+def jwt_required(fn):
+    """Verify the Bearer token and pass the identity to the handler"""
+    @wraps(fn)
+    async def wrapper(request):
+        header = request.headers.get('Authorization', '')
+        if not header.startswith('Bearer '):
+            return JSONResponse({'msg': 'Missing Authorization Header'}, status_code=401)
+        user_id, error = token_identity(header[7:])
+        if error:
+            return error
+        return await fn(request, user_id)
+    return wrapper
+
+
+async def admin_check_error(user_id):
+    """Error response unless user_id belongs to an admin, otherwise None"""
+    try:
+        user = await db.users.find_one({'_id': ObjectId(user_id)})
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+    if not user or user.get('role') != 'admin':
+        return JSONResponse({'error': 'Admin access required'}, status_code=403)
+    return None
+
+
+def admin_required(fn):
+    @wraps(fn)
+    @jwt_required
+    @limited('admin')
+    async def wrapper(request, user_id):
+        error = await admin_check_error(user_id)
+        if error:
+            return error
+        return await fn(request, user_id)
+    return wrapper
+
+
+def public_user(user):
+    return {
+        'id': str(user['_id']),
+        'username': user['username'],
+        'email': user['email'],
+        'role': user.get('role', 'user')
+    }
+
+
+# Auth routes
+
+@limited('auth')
+async def signup(request):
+    """User registration endpoint"""
+    try:
+        data = await json_body(request)
+        if not data or not all(k in data for k in ['username', 'email', 'password']):
+            return JSONResponse({'error': 'Missing required fields: username, email, password'}, status_code=400)
+
+        username = data['username'].strip()
+        email = data['email'].strip().lower()
+        password = data['password']
+
+        if not username or len(username) < 3:
+            return JSONResponse({'error': 'Username must be at least 3 characters long'}, status_code=400)
+        if not validate_email(email):
+            return JSONResponse({'error': 'Invalid email format'}, status_code=400)
+        is_valid, error_msg = validate_password(password)
+        if not is_valid:
+            return JSONResponse({'error': error_msg}, status_code=400)
+
+        if await db.users.find_one({'email': email}):
+            return JSONResponse({'error': 'Email already registered'}, status_code=400)
+        if await db.users.find_one({'username': username}):
+            return JSONResponse({'error': 'Username already taken'}, status_code=400)
+
+        password_hash = (await run_blocking(bcrypt.generate_password_hash, password)).decode('utf-8')
+        user_doc = {
+            'username': username,
+            'email': email,
+            'password_hash': password_hash,
+            'role': 'user',
+            'created_at': datetime.utcnow().isoformat()
+        }
+        result = await db.users.insert_one(user_doc)
+        user_doc['_id'] = result.inserted_id
+
+        return JSONResponse({
+            'message': 'User created successfully',
+            'access_token': create_access_token(str(result.inserted_id)),
+            'user': public_user(user_doc)
+        }, status_code=201)
+
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@limited('auth')
+async def login(request):
+    """User login endpoint"""
+    try:
+        data = await json_body(request)
+        if not data or not all(k in data for k in ['email', 'password']):
+            return JSONResponse({'error': 'Missing required fields: email, password'}, status_code=400)
+
+        user = await db.users.find_one({'email': data['email'].strip().lower()})
+        if not user:
+            return JSONResponse({'error': 'Invalid email or password'}, status_code=401)
+        if not await run_blocking(bcrypt.check_password_hash, user['password_hash'], data['password']):
+            return JSONResponse({'error': 'Invalid email or password'}, status_code=401)
+
+        return JSONResponse({
+            'access_token': create_access_token(str(user['_id'])),
+            'user': public_user(user)
+        })
+
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@jwt_required
+async def get_current_user(request, user_id):
+    """Get current authenticated user"""
+    try:
+        user = await db.users.find_one({'_id': ObjectId(user_id)})
+        if not user:
+            return JSONResponse({'error': 'User not found'}, status_code=404)
+        return JSONResponse(public_user(user))
+
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+# Prediction and history routes
+
+@jwt_required
+async def predict(request, user_id):
+    """Predict anemia risk from user inputs"""
+    try:
+        data = await json_body(request)
+        missing = flask_app.missing_predict_field(data)
+        if missing:
+            return JSONResponse({'error': f'Missing field: {missing}'}, status_code=400)
+
+        async def score_and_save():
+            # Only the scoring holds an admission slot, as in app.py
+            async with admission_slot('predict'):
+                result, screening = await run_blocking(flask_app.run_prediction, data)
+                # One local commit; the outbox replicator ships the MongoDB copy
+                await run_blocking(flask_app.save_screening, user_id, screening)
+            return result
+
+        # Same Idempotency-Key semantics as app.py, sharing its store
+        key = request.headers.get('idempotency-key')
+        if not key:
+            return Response(encode_prediction(await score_and_save()), media_type='application/json')
+        if len(key) > MAX_KEY_LENGTH:
+            return JSONResponse({'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'},
+                                status_code=400)
+
+        store, store_key = flask_app.idempotency_store, (user_id, key)
+        # claim() only blocks for duplicates of an in-flight request, so run it off the event loop
+        entry, cached = await run_blocking(store.claim, store_key, request_fingerprint(data),
+                                           Config.IDEMPOTENCY_WAIT_SECONDS)
+        if cached is not None:
+            return Response(encode_prediction(cached[0]), status_code=cached[1], media_type='application/json',
+                            headers={'Idempotent-Replayed': 'true'})
+        try:
+            result = await score_and_save()
+        except Exception:
+            store.abandon(store_key, entry)
+            raise
+        store.finish(store_key, entry, result, 200)
+        return Response(encode_prediction(result), media_type='application/json')
+
+    except IdempotencyKeyReused as e:
+        return JSONResponse({'error': str(e)}, status_code=422)
+    except IdempotencyInProgress as e:
+        return JSONResponse({'error': str(e)}, status_code=409)
+    except AdmissionRejected:
+        return busy_response()
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@jwt_required
+@limited('predict')
+async def predict_what_if(request, user_id):
+    """Side-effect-free sensitivity sweep around a base profile"""
+    try:
+        data = await json_body(request)
+        missing = flask_app.missing_predict_field(data)
+        if missing:
+            return JSONResponse({'error': f'Missing field: {missing}'}, status_code=400)
+        return JSONResponse(await run_blocking(flask_app.run_what_if, data))
+    except (ValueError, KeyError, TypeError) as e:
+        return JSONResponse({'error': f'Invalid sweep: {e}'}, status_code=400)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@admin_required
+async def get_stats(request, user_id):
+    """Get statistics for admin dashboard"""
+    try:
+        validator = await run_blocking(flask_app.stats_validator)
+        return await conditional_json(request, validator, lambda: run_blocking(flask_app.compute_stats))
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@jwt_required
+async def get_user_predictions(request, user_id):
+    """Get all predictions for the current user"""
+    try:
+        async def build():
+            cursor = db.screenings.find({'user_id': ObjectId(user_id)}).sort('timestamp', -1)
+            screenings = merge_pending([screening async for screening in cursor],
+                                       await run_blocking(pending_documents, user_id))
+            results = [flask_app.format_screening(screening) for screening in screenings]
+            return {'predictions': results, 'total': len(results)}
+
+        validator = ('predictions',) + await user_screenings_validator(user_id)
+        return await conditional_json(request, validator, build)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@jwt_required
+async def get_user_summary(request, user_id):
+    """Constant-size trend summary of the current user's screenings"""
+    try:
+        buckets = min(max(int(request.query_params.get('buckets', 20)), 1), 100)
+
+        async def build():
+            # The aggregation runs in MongoDB, so ship this user's pending screenings first
+            if (await run_blocking(pending_marker, user_id))[0]:
+                try:
+                    await run_blocking(flask_app.screening_replicator.replicate_once)
+                except Exception:
+                    pass  # summarize what MongoDB has; the replicator keeps retrying
+            cursor = db.screenings.aggregate(flask_app.user_summary_pipeline(user_id, buckets))
+            results = await cursor.to_list(length=1)
+            return flask_app.format_user_summary(results[0] if results else {'stats': [], 'trend': []})
+
+        validator = ('summary', buckets) + await user_screenings_validator(user_id)
+        return await conditional_json(request, validator, build)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@jwt_required
+async def get_explanations(request, user_id):
+    """Permutation importance and partial-dependence tables computed at training time"""
+    if flask_app.explanations is None:
+        return JSONResponse({'error': 'No explanations saved with the model - retrain to enable'}, status_code=404)
+    return JSONResponse({'model_version': flask_app.model_metadata.get('version'), **flask_app.explanations})
+
+
+async def admin_stream(request):
+    """Server-Sent Events feed of new screenings and /stats deltas (EventSource passes the token as ?jwt=)"""
+    header = request.headers.get('Authorization', '')
+    token = header[7:] if header.startswith('Bearer ') else request.query_params.get('jwt')
+    if not token:
+        return JSONResponse({'msg': 'Missing Authorization Header'}, status_code=401)
+    user_id, error = token_identity(token)
+    # Not behind admin admission control: the connection stays open, but costs no queries
+    error = error or await admin_check_error(user_id)
+    if error:
+        return error
+
+    subscriber = flask_app.stat_broadcaster.subscribe()
+    if subscriber is None:
+        return JSONResponse({'error': 'Too many live dashboard connections'}, status_code=503)
+
+    async def events():
+        try:
+            yield 'retry: 5000\n\n'
+            async for message in subscriber.async_events(Config.STREAM_HEARTBEAT_SECONDS):
+                yield message
+        finally:
+            flask_app.stat_broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@jwt_required
+async def upload_job(request, user_id):
+    """Upload a screening CSV as a raw text/csv body, streamed to disk without buffering it"""
+    if request.headers.get('content-type', '').startswith('multipart/form-data'):
+        return flask_routes  # multipart parsing lives in the Flask view
+    try:
+        if not int(request.headers.get('content-length') or 0):
+            return JSONResponse({'error': 'No file uploaded'}, status_code=400)
+
+        job_manager = flask_app.job_manager
+        job_id, input_path = await run_blocking(job_manager.new_upload)
+        with open(input_path, 'wb') as f:
+            async for chunk in request.stream():
+                await run_blocking(f.write, chunk)
+        filename = os.path.basename(request.query_params.get('filename', 'upload.csv'))
+        await run_blocking(job_manager.queue_job, job_id, user_id, filename)
+        return JSONResponse({'job_id': job_id, 'status': 'queued'}, status_code=202)
+
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@admin_required
+async def get_metrics(request, user_id):
+    return JSONResponse(metrics.snapshot())
+
+
+async def health(request):
+    """Health check endpoint"""
+    return JSONResponse({
+        'status': 'healthy',
+        'server': 'asgi',
+        'model_loaded': flask_app.model is not None,
+        'model_version': flask_app.model_metadata.get('version'),
+        'model_type': flask_app.model_metadata.get('model_type')
+    })
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global mongo_client, db
+    if Config.MONGO_URI.startswith('mongomock://'):
+        # Async view of the same in-memory stand-in the Flask side uses (pip install mongomock-motor)
+        from mongomock_motor import AsyncMongoMockClient
+        mongo_client = AsyncMongoMockClient(mock_mongo_client=Database.get_client())
+    else:
+        mongo_client = AsyncIOMotorClient(Config.MONGO_URI)
+    db = mongo_client[Database.database_name(Config.MONGO_URI)]
+    await run_blocking(flask_app.init_db)
+    await run_blocking(flask_app.load_model)
+    # Job pool, maintenance scheduler and outbox replicator, as under app.py
+    await run_blocking(flask_app.start_background_workers)
+    yield
+    flask_app.screening_archive.flush()
+    flask_app.job_manager.shutdown()
+    mongo_client.close()
+    executor.shutdown(wait=False)
+
+
+app = Starlette(
+    routes=[
+        Route('/auth/signup', signup, methods=['POST']),
+        Route('/auth/login', login, methods=['POST']),
+        Route('/auth/me', get_current_user, methods=['GET']),
+        Route('/predict', predict, methods=['POST']),
+        Route('/predict/what-if', predict_what_if, methods=['POST']),
+        Route('/stats', get_stats, methods=['GET']),
+        Route('/user/predictions', get_user_predictions, methods=['GET']),
+        Route('/user/summary', get_user_summary, methods=['GET']),
+        Route('/model/explanations', get_explanations, methods=['GET']),
+        Route('/admin/stream', admin_stream, methods=['GET']),
+        Route('/jobs', upload_job, methods=['POST']),
+        Route('/metrics', get_metrics, methods=['GET']),
+        Route('/health', health, methods=['GET']),
+        # Everything else (admin analytics/drift/shadow/maintenance, job status and results) via Flask
+        Mount('/', app=flask_routes)
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
@@ -7,7 +7,9 @@ from flask import Blueprint, request, jsonify, current_app
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from database import Database
+from admission import admission
 from datetime import datetime
+from functools import wraps
 import re
 from bson import ObjectId
 
@@ -26,7 +28,31 @@ def validate_password(password):
         return False, "Password must be at least 6 characters long"
     return True, None
 
+def admin_required(fn):
+    """Require a valid JWT belonging to a user with the admin role"""
+    @wraps(fn)
+    @jwt_required()
+    @admission.limit('admin')
+    def wrapper(*args, **kwargs):
+        error = admin_check_error(get_jwt_identity())
+        if error:
+            return error
+        return fn(*args, **kwargs)
+    return wrapper
+
+def admin_check_error(user_id):
+    """Error response unless user_id belongs to an admin, otherwise None"""
+    try:
+        user = Database.get_db().users.find_one({'_id': ObjectId(user_id)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    if not user or user.get('role') != 'admin':
+        return jsonify({'error': 'Admin access required'}), 403
+    return None
+
 @auth_bp.route('/auth/signup', methods=['POST'])
+@admission.limit('auth')
 def signup():
     """User registration endpoint"""
     try:
@@ -102,6 +128,7 @@ def signup():
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/auth/login', methods=['POST'])
+@admission.limit('auth')
 def login():
     """User login endpoint"""
     try:
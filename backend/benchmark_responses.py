@@ -0,0 +1,98 @@
+"""
+Benchmark: per-request response assembly and serialization cost
+Compares rebuilding the /predict recommendations and factor labels and encoding with
+Flask's JSON provider against the precomputed, pre-encoded fragments in responses.py,
+and Flask's encoder against responses.dumps() for a /user/predictions history page.
+No server or MongoDB is needed.
+
+Usage: python benchmark_responses.py --iterations 20000 --history-rows 200
+"""
+
+import argparse
+import json
+import os
+import time
+
+# The app module connects to MongoDB at import; don't wait long when none is running
+os.environ.setdefault('MONGO_URI', 'mongodb://127.0.0.1:27017/hemoscan_benchmark?serverSelectionTimeoutMS=200')
+
+import app as flask_app  # noqa: E402
+from responses import FACTOR_LABELS, orjson, recommendation_key, encode_prediction, dumps  # noqa: E402
+from scoring import FEATURE_COLUMNS, build_feature_vector  # noqa: E402
+
+TOP_FACTORS = {'hemoglobin': 61.27, 'gender': 12.4, 'fatigue': 9.81, 'age': 8.02, 'diet': 5.3}
+
+
+def per_request_us(fn, iterations):
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def legacy_predict_body(features):
+    """What /predict did before: rebuild every fragment, then Flask's encoder"""
+    recommendations = flask_app.get_recommendations('High', 0.82, features)
+    factor_labels = dict(FACTOR_LABELS)
+    result = {
+        'risk_level': 'High',
+        'risk_score': 82.0,
+        'probability': 0.82,
+        'top_factors': [{'factor': factor_labels.get(f, f), 'importance': round(v, 2)} for f, v in TOP_FACTORS.items()],
+        'recommendations': recommendations
+    }
+    return flask_app.app.json.response(result).get_data()
+
+
+def assembled_predict_body(features):
+    recommendations = flask_app.recommendation_table[recommendation_key('High', features)]
+    result = {
+        'risk_level': 'High',
+        'risk_score': 82.0,
+        'probability': 0.82,
+        'top_factors': [{'factor': FACTOR_LABELS.get(f, f), 'importance': round(v, 2)} for f, v in TOP_FACTORS.items()],
+        'recommendations': recommendations
+    }
+    return encode_prediction(result)
+
+
+def history_page(rows):
+    return {
+        'predictions': [{
+            'id': f'{i:024x}', 'age': 20 + i % 60, 'gender': 'Female', 'hemoglobin': 10.5 + i % 5,
+            'diet': 'Poor', 'symptoms': ['fatigue', 'dizziness'], 'risk_level': 'High',
+            'risk_score': 71.25, 'probability': 0.7125, 'timestamp': '2024-05-01T12:00:00.000000'
+        } for i in range(rows)],
+        'total': rows
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Per-request response serialization benchmark')
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--history-rows', type=int, default=200)
+    args = parser.parse_args()
+
+    flask_app.load_model()
+    features = dict(zip(FEATURE_COLUMNS, build_feature_vector(34, 0, 10.8, 0, ['fatigue', 'dizziness'])))
+    page = history_page(args.history_rows)
+
+    with flask_app.app.app_context():
+        # Same document either way (key order and escaping aside)
+        assert json.loads(legacy_predict_body(features)) == json.loads(assembled_predict_body(features))
+        assert json.loads(flask_app.app.json.response(page).get_data()) == json.loads(dumps(page))
+
+        results = {
+            'encoder': 'orjson' if orjson is not None else 'json (install orjson for the fast path)',
+            'predict_us': {
+                'rebuild_and_flask_json': round(per_request_us(lambda: legacy_predict_body(features), args.iterations), 2),
+                'precomputed_fragments': round(per_request_us(lambda: assembled_predict_body(features), args.iterations), 2)
+            },
+            f'history_{args.history_rows}_rows_us': {
+                'flask_json': round(per_request_us(lambda: flask_app.app.json.response(page).get_data(),
+                                                   max(args.iterations // 100, 10)), 2),
+                'responses_dumps': round(per_request_us(lambda: dumps(page), max(args.iterations // 100, 10)), 2)
+            }
+        }
+    print(json.dumps(results, indent=2))
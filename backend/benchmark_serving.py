@@ -0,0 +1,168 @@
+"""
+Benchmark: concurrent throughput of the Flask server vs the async ASGI server
+Starts each server on its own port, in its own throwaway working directory (hemoscan.db,
+archive, jobs) and against its own throwaway MongoDB database, with the same background
+workers (job pool, outbox replicator, maintenance). Then fires concurrent /predict and
+/user/predictions requests and reports latency percentiles.
+
+Usage: python benchmark_serving.py --requests 2000 --concurrency 64
+       python benchmark_serving.py --mongo-url mongodb://localhost:27017   (real MongoDB, scratch databases)
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Both start the background workers (the ASGI lifespan calls start_background_workers too)
+SERVERS = {
+    'flask': [sys.executable, '-c',
+              'import app; app.init_db(); app.load_model(); app.start_background_workers(); '
+              'app.app.run(port={port}, threaded=True, debug=False)'],
+    'asgi': [sys.executable, '-m', 'uvicorn', 'asgi_app:app', '--app-dir', BACKEND_DIR,
+             '--port', '{port}', '--log-level', 'warning']
+}
+
+PREDICT_BODY = {
+    'age': 34, 'gender': 'female', 'hemoglobin': 10.8, 'diet': 'poor',
+    'symptoms': ['fatigue', 'dizziness'], 'rural_mode': False
+}
+
+
+def call(base_url, method, path, body=None, token=None):
+    request = urllib.request.Request(
+        base_url + path,
+        data=json.dumps(body).encode() if body is not None else None,
+        method=method,
+        headers={'Content-Type': 'application/json'}
+    )
+    if token:
+        request.add_header('Authorization', f'Bearer {token}')
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            payload = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        payload, status = e.read(), e.code
+    except Exception:
+        payload, status = b'', 0
+    return status, time.perf_counter() - start, payload
+
+
+def wait_until_healthy(base_url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status, _, _ = call(base_url, 'GET', '/health')
+        if status == 200:
+            return True
+        time.sleep(0.5)
+    return False
+
+
+def run_load(base_url, token, path, method, body, total, concurrency):
+    """Fire `total` requests with `concurrency` in flight; returns throughput and latencies"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: call(base_url, method, path, body, token), range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([latency for status, latency, _ in results if status == 200]) * 1000
+    errors = sum(1 for status, _, _ in results if status != 200)
+    return {
+        'throughput_rps': round(total / elapsed, 1),
+        'errors': errors,
+        'p50_ms': round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+        'p95_ms': round(float(np.percentile(latencies, 95)), 2) if len(latencies) else None,
+        'p99_ms': round(float(np.percentile(latencies, 99)), 2) if len(latencies) else None
+    }
+
+
+def scratch_mongo_uri(mongo_url):
+    """A fresh database: on the MongoDB server at mongo_url, or in-memory (mongomock) without one"""
+    name = f'hemoscan_bench_{uuid.uuid4().hex[:8]}'
+    if not mongo_url:
+        return f'mongomock://localhost/{name}'
+    return f"{mongo_url.rstrip('/')}/{name}"
+
+
+def drop_database(mongo_uri):
+    if mongo_uri.startswith('mongomock://'):
+        return  # gone with the server process
+    from pymongo import MongoClient
+    from database import Database
+    with MongoClient(mongo_uri) as client:
+        client.drop_database(Database.database_name(mongo_uri))
+
+
+def benchmark_server(name, port, total, concurrency, mongo_url=None):
+    command = [part.format(port=port) for part in SERVERS[name]]
+    workdir = tempfile.mkdtemp(prefix=f'hemoscan-bench-{name}-')
+    os.symlink(os.path.join(BACKEND_DIR, 'models'), os.path.join(workdir, 'models'))
+    mongo_uri = scratch_mongo_uri(mongo_url)
+    process = subprocess.Popen(command, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               env={**os.environ, 'MONGO_URI': mongo_uri, 'PYTHONPATH': BACKEND_DIR})
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        if not wait_until_healthy(base_url):
+            raise RuntimeError(f'{name} server did not start on port {port}')
+
+        suffix = uuid.uuid4().hex[:8]
+        status, _, payload = call(base_url, 'POST', '/auth/signup', {
+            'username': f'bench_{suffix}', 'email': f'bench_{suffix}@example.com', 'password': 'benchmark'
+        })
+        if status != 201:
+            raise RuntimeError(f'{name} signup failed: {payload[:200]}')
+        token = json.loads(payload)['access_token']
+
+        # Warm up model, connection pools and caches
+        run_load(base_url, token, '/predict', 'POST', PREDICT_BODY, 50, 8)
+
+        return {
+            '/predict': run_load(base_url, token, '/predict', 'POST', PREDICT_BODY, total, concurrency),
+            '/user/predictions': run_load(base_url, token, '/user/predictions', 'GET', None,
+                                          total // 4, concurrency)
+        }
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        drop_database(mongo_uri)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--flask-port', type=int, default=5101)
+    parser.add_argument('--asgi-port', type=int, default=5102)
+    parser.add_argument('--mongo-url', help='MongoDB server, e.g. mongodb://localhost:27017 '
+                                            '(default: in-memory mongomock stand-in)')
+    args = parser.parse_args()
+
+    results = {
+        'flask': benchmark_server('flask', args.flask_port, args.requests, args.concurrency, args.mongo_url),
+        'asgi': benchmark_server('asgi', args.asgi_port, args.requests, args.concurrency, args.mongo_url)
+    }
+
+    print(f"\n{args.requests} requests, concurrency {args.concurrency}\n")
+    print(f"{'server':<8}{'endpoint':<20}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for server, endpoints in results.items():
+        for endpoint, r in endpoints.items():
+            print(f"{server:<8}{endpoint:<20}{r['throughput_rps']:>10}{r['p50_ms']!s:>10}"
+                  f"{r['p95_ms']!s:>10}{r['p99_ms']!s:>10}{r['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
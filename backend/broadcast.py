@@ -0,0 +1,116 @@
+"""
+Server-Sent Events broadcaster for HemoScan AI
+One shared fan-out from the persistence path to every connected admin dashboard,
+with a bounded buffer per client so a slow consumer is dropped instead of
+holding memory or slowing down /predict
+"""
+
+import asyncio
+import json
+import queue
+import threading
+from metrics import metrics
+
+AGE_BINS = [(30, '18-30'), (45, '31-45'), (60, '46-60')]  # same bins as compute_stats()
+
+
+def age_bin(age):
+    for upper, label in AGE_BINS:
+        if age <= upper:
+            return label
+    return '61+'
+
+
+def format_event(event, data):
+    """SSE wire format for one event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class Subscriber:
+    def __init__(self, max_buffer):
+        self.queue = queue.Queue(maxsize=max_buffer)
+        self.dropped = False
+
+    def events(self, heartbeat_seconds):
+        """Yield SSE messages until the subscriber is dropped; comments keep idle connections open"""
+        while not self.dropped:
+            try:
+                yield self.queue.get(timeout=heartbeat_seconds)
+            except queue.Empty:
+                yield ': keepalive\n\n'
+        yield format_event('dropped', {'reason': 'Client too slow - reconnect to resync'})
+
+    async def async_events(self, heartbeat_seconds, poll_seconds=0.2):
+        """events() for the async server: polls the queue instead of blocking a thread per client"""
+        idle = 0.0
+        while not self.dropped:
+            try:
+                message = self.queue.get_nowait()
+            except queue.Empty:
+                if idle >= heartbeat_seconds:
+                    idle = 0.0
+                    yield ': keepalive\n\n'
+                await asyncio.sleep(poll_seconds)
+                idle += poll_seconds
+                continue
+            idle = 0.0
+            yield message
+        yield format_event('dropped', {'reason': 'Client too slow - reconnect to resync'})
+
+
+class Broadcaster:
+    """Publishes each message once; subscribers only ever read from their own queue"""
+
+    def __init__(self, max_buffer=100, max_clients=50):
+        self.max_buffer = max_buffer
+        self.max_clients = max_clients
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        metrics.register_gauge('stream.subscribers', lambda: len(self._subscribers))
+
+    def subscribe(self):
+        """New subscriber, or None when the client limit is reached"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None
+            subscriber = Subscriber(self.max_buffer)
+            self._subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event, data):
+        """Non-blocking fan-out; full buffers drop their subscriber"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+        message = format_event(event, data)  # serialized once for all clients
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(message)
+            except queue.Full:
+                subscriber.dropped = True
+                self.unsubscribe(subscriber)
+                metrics.increment('stream.dropped')
+        metrics.increment('stream.published')
+
+
+def screening_event(screening, timestamp):
+    """New-screening event: the row as shown in recent predictions plus the /stats deltas it causes"""
+    return {
+        'screening': {
+            'age': screening['age'],
+            'gender': screening['gender'],
+            'risk_level': screening['risk_level'],
+            'probability': round(screening['probability'] * 100, 2),
+            'timestamp': timestamp
+        },
+        'delta': {
+            'total_screenings': 1,
+            'risk_distribution': {screening['risk_level']: 1},
+            'age_distribution': {age_bin(screening['age']): 1}
+        }
+    }
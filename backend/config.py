@@ -21,5 +21,99 @@ class Config:
     
     # Flask Configuration
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
-
-
+    
+    # Model selection budgets used by train_model.py (0 = no budget)
+    MODEL_LATENCY_BUDGET_MS = float(os.getenv('MODEL_LATENCY_BUDGET_MS', '0')) or None  # single-row predict_proba
+    MODEL_SIZE_BUDGET_MB = float(os.getenv('MODEL_SIZE_BUDGET_MB', '0')) or None  # serialized model size
+    # Prefer the cheapest model whose selection score is within this margin of the best
+    MODEL_SCORE_TOLERANCE = float(os.getenv('MODEL_SCORE_TOLERANCE', '0.005'))
+    
+    # Post-training compression of tree ensembles: pruning, float32/int16 export and an optional
+    # distilled student; the smallest variant within these tolerances of the original is saved
+    MODEL_COMPRESSION = os.getenv('MODEL_COMPRESSION', 'true').lower() == 'true'
+    COMPRESS_AUC_TOLERANCE = float(os.getenv('COMPRESS_AUC_TOLERANCE', '0.002'))
+    COMPRESS_ACCURACY_TOLERANCE = float(os.getenv('COMPRESS_ACCURACY_TOLERANCE', '0.005'))
+    COMPRESS_PROBABILITY_TOLERANCE = float(os.getenv('COMPRESS_PROBABILITY_TOLERANCE', '0.02'))  # mean |shift|
+    COMPRESS_CALIBRATION_TOLERANCE = float(os.getenv('COMPRESS_CALIBRATION_TOLERANCE', '0.01'))  # Brier, ECE
+    COMPRESS_DISTILL = os.getenv('COMPRESS_DISTILL', 'true').lower() == 'true'
+    DISTILL_TRANSFER_ROWS = int(os.getenv('DISTILL_TRANSFER_ROWS', '20000'))
+    
+    # Training-time explanations (permutation importance, partial dependence); -1 jobs = all cores
+    EXPLAIN_REPEATS = int(os.getenv('EXPLAIN_REPEATS', '10'))
+    EXPLAIN_JOBS = int(os.getenv('EXPLAIN_JOBS', '-1'))
+    EXPLAIN_PD_GRID = int(os.getenv('EXPLAIN_PD_GRID', '20'))
+    
+    # Incremental retraining (incremental_train.py)
+    INCREMENTAL_MIN_ROWS = int(os.getenv('INCREMENTAL_MIN_ROWS', '50'))
+    INCREMENTAL_TREES_PER_1000 = int(os.getenv('INCREMENTAL_TREES_PER_1000', '10'))  # trees/stages added per 1000 new rows
+    INCREMENTAL_MAX_TREES = int(os.getenv('INCREMENTAL_MAX_TREES', '400'))  # forest size cap
+    
+    # Outbox replication of committed screenings from SQLite to MongoDB
+    REPLICATION_BATCH_SIZE = int(os.getenv('REPLICATION_BATCH_SIZE', '500'))
+    REPLICATION_INTERVAL_MS = int(os.getenv('REPLICATION_INTERVAL_MS', '200'))
+    REPLICATION_MAX_BACKOFF_SECONDS = int(os.getenv('REPLICATION_MAX_BACKOFF_SECONDS', '60'))
+    
+    # Shadow evaluation of a candidate model on a sample of live /predict traffic
+    SHADOW_MODEL_DIR = os.getenv('SHADOW_MODEL_DIR', 'models/candidate')
+    SHADOW_SAMPLE_RATE = float(os.getenv('SHADOW_SAMPLE_RATE', '0.1'))
+    SHADOW_QUEUE_SIZE = int(os.getenv('SHADOW_QUEUE_SIZE', '1000'))
+    SHADOW_BATCH_SIZE = int(os.getenv('SHADOW_BATCH_SIZE', '64'))
+    
+    # Model runtime for the API: 'sklearn' (models/model.pkl) or 'numpy' (models/model.npz,
+    # no scikit-learn import or unpickling - see hemoscan_runtime.py)
+    INFERENCE_RUNTIME = os.getenv('INFERENCE_RUNTIME', 'sklearn').lower()
+    
+    # Micro-batching of concurrent /predict model calls
+    INFERENCE_BATCHING = os.getenv('INFERENCE_BATCHING', 'true').lower() == 'true'
+    INFERENCE_BATCH_WINDOW_MS = float(os.getenv('INFERENCE_BATCH_WINDOW_MS', '2'))
+    INFERENCE_MAX_BATCH = int(os.getenv('INFERENCE_MAX_BATCH', '64'))
+    
+    # Conditional GET: gzip JSON responses above this size when the client accepts it
+    RESPONSE_GZIP = os.getenv('RESPONSE_GZIP', 'true').lower() == 'true'
+    RESPONSE_GZIP_MIN_BYTES = int(os.getenv('RESPONSE_GZIP_MIN_BYTES', '1024'))
+    RESPONSE_GZIP_LEVEL = int(os.getenv('RESPONSE_GZIP_LEVEL', '6'))
+    
+    # Idempotency-Key support on /predict: cached responses and how long duplicates wait for the original
+    IDEMPOTENCY_MAX_ENTRIES = int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', '10000'))
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', '3600'))
+    IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', '30'))
+    
+    # Admin live feed (Server-Sent Events): per-client buffer, client limit and keepalive interval
+    STREAM_CLIENT_BUFFER = int(os.getenv('STREAM_CLIENT_BUFFER', '100'))
+    STREAM_MAX_CLIENTS = int(os.getenv('STREAM_MAX_CLIENTS', '50'))
+    STREAM_HEARTBEAT_SECONDS = float(os.getenv('STREAM_HEARTBEAT_SECONDS', '15'))
+    
+    # What-if sweeps: largest grid scored in one request
+    WHATIF_MAX_POINTS = int(os.getenv('WHATIF_MAX_POINTS', '2500'))
+    
+    # Background screening-file jobs
+    JOB_DIR = os.getenv('JOB_DIR', 'jobs')
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+    JOB_CHUNK_SIZE = int(os.getenv('JOB_CHUNK_SIZE', '5000'))
+    
+    # Admission control: concurrent requests and queue length per route class
+    ADMISSION_PREDICT_CONCURRENCY = int(os.getenv('ADMISSION_PREDICT_CONCURRENCY', '16'))
+    ADMISSION_PREDICT_QUEUE = int(os.getenv('ADMISSION_PREDICT_QUEUE', '64'))
+    ADMISSION_AUTH_CONCURRENCY = int(os.getenv('ADMISSION_AUTH_CONCURRENCY', '4'))  # bcrypt is CPU-bound
+    ADMISSION_AUTH_QUEUE = int(os.getenv('ADMISSION_AUTH_QUEUE', '32'))
+    ADMISSION_ADMIN_CONCURRENCY = int(os.getenv('ADMISSION_ADMIN_CONCURRENCY', '2'))
+    ADMISSION_ADMIN_QUEUE = int(os.getenv('ADMISSION_ADMIN_QUEUE', '4'))
+    ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv('ADMISSION_QUEUE_TIMEOUT_MS', '500'))
+    ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', '1'))  # seconds
+    
+    # Thread pool for model inference, bcrypt and SQLite in the async server (asgi_app.py);
+    # the ADMISSION_*_CONCURRENCY limits are capped at this size there
+    ASYNC_EXECUTOR_WORKERS = int(os.getenv('ASYNC_EXECUTOR_WORKERS', '8'))
+    
+    # Columnar screening archive for admin analytics
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive/screenings')
+    
+    # Retention: screenings older than RETENTION_DAYS move to gzip JSONL archives (0 keeps everything)
+    RETENTION_DAYS = int(os.getenv('RETENTION_DAYS', '0'))
+    RETENTION_ARCHIVE_DIR = os.getenv('RETENTION_ARCHIVE_DIR', 'archive/expired')
+    MAINTENANCE_INTERVAL_HOURS = float(os.getenv('MAINTENANCE_INTERVAL_HOURS', '24'))  # 0 disables
+    MAINTENANCE_BATCH_SIZE = int(os.getenv('MAINTENANCE_BATCH_SIZE', '1000'))
+    MAINTENANCE_BATCH_PAUSE_MS = float(os.getenv('MAINTENANCE_BATCH_PAUSE_MS', '50'))
+    
+    # Anonymized request capture for loadgen.py replay (empty = off)
+    TRAFFIC_CAPTURE_PATH = os.getenv('TRAFFIC_CAPTURE_PATH', '')
@@ -0,0 +1,79 @@
+"""
+pytest setup for the HemoScan AI backend
+The app runs in a throwaway working directory (SQLite, archives, jobs, models) against
+an in-memory MongoDB (mongomock://), with a small model trained for the session, so the
+tests need neither a MongoDB server nor trained artifacts in backend/models.
+"""
+
+import os
+import sys
+import tempfile
+import pytest
+
+# Standalone scripts (python test_mongodb.py), not pytest modules
+collect_ignore = ['test_mongodb.py', 'test_feature_importance.py']
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+# Set before config.py is first imported
+os.environ['MONGO_URI'] = 'mongomock://localhost/hemoscan_test'
+os.environ['JWT_SECRET_KEY'] = 'test-secret'
+os.environ['INFERENCE_RUNTIME'] = 'sklearn'
+os.environ['MAINTENANCE_INTERVAL_HOURS'] = '0'
+os.environ.pop('WERKZEUG_RUN_MAIN', None)
+
+# The app uses paths relative to the working directory (hemoscan.db, archive/, models/)
+WORK_DIR = tempfile.mkdtemp(prefix='hemoscan-tests-')
+
+
+def build_test_model(models_dir):
+    """Logistic regression on a small synthetic sample, saved like train_model.py saves its model"""
+    import joblib
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+    from scoring import FEATURE_COLUMNS
+    from train_model import generate_synthetic_data
+
+    data = generate_synthetic_data(2000, seed=3)
+    scaler = StandardScaler().fit(data[FEATURE_COLUMNS])
+    model = LogisticRegression(max_iter=1000).fit(scaler.transform(data[FEATURE_COLUMNS]), data['target'])
+    os.makedirs(models_dir, exist_ok=True)
+    joblib.dump(model, os.path.join(models_dir, 'model.pkl'))
+    joblib.dump(scaler, os.path.join(models_dir, 'scaler.pkl'))
+    joblib.dump(FEATURE_COLUMNS, os.path.join(models_dir, 'feature_names.pkl'))
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    """The Flask app module, initialized in a temporary working directory"""
+    os.chdir(WORK_DIR)
+    build_test_model('models')
+    import app
+    app.init_db()
+    app.load_model()
+    return app
+
+
+def pytest_sessionfinish(session):
+    # pytest switches back to the start directory first; the app's daemon threads and
+    # atexit archive flush keep running until exit and must not write into backend/
+    os.chdir(WORK_DIR)
+
+
+@pytest.fixture(scope='session')
+def mongo_db(app_module):
+    from database import Database
+    return Database.get_db()
+
+
+@pytest.fixture
+def auth_headers(app_module, mongo_db):
+    """Authorization header for a new admin user"""
+    from flask_jwt_extended import create_access_token
+    user_id = mongo_db.users.insert_one({
+        'username': 'admin', 'email': 'admin@example.com', 'password_hash': 'x', 'role': 'admin'
+    }).inserted_id
+    with app_module.app.app_context():
+        token = create_access_token(identity=str(user_id))
+    return {'Authorization': f'Bearer {token}'}
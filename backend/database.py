@@ -17,13 +17,13 @@ class Database:
     def initialize(cls):
         """Initialize MongoDB connection"""
         try:
-            cls._client = MongoClient(Config.MONGO_URI)
-            # Extract database name from URI or use default
-            uri_parts = Config.MONGO_URI.split('/')
-            if len(uri_parts) > 3:
-                db_name = uri_parts[-1].split('?')[0]
+            if Config.MONGO_URI.startswith('mongomock://'):
+                # In-memory stand-in for load tests (pip install mongomock); never for production
+                import mongomock
+                cls._client = mongomock.MongoClient()
             else:
-                db_name = 'hemoscan_ai'
+                cls._client = MongoClient(Config.MONGO_URI)
+            db_name = cls.database_name(Config.MONGO_URI)
             cls._db = cls._client[db_name]
             
             # Create indexes for better performance (collections will be created automatically on first insert)
@@ -35,6 +35,7 @@ class Database:
                 if "screenings" in cls._db.list_collection_names():
                     cls._db.screenings.create_index("user_id")
                     cls._db.screenings.create_index("timestamp")
+                    cls._db.screenings.create_index([("user_id", 1), ("timestamp", -1)])
             except Exception as e:
                 # Indexes will be created when collections are first created
                 pass
@@ -46,6 +47,14 @@ class Database:
             print(f"Error connecting to MongoDB: {e}")
             raise
     
+    @staticmethod
+    def database_name(uri):
+        """Extract database name from URI or use default"""
+        uri_parts = uri.split('/')
+        if len(uri_parts) > 3 and uri_parts[-1].split('?')[0]:
+            return uri_parts[-1].split('?')[0]
+        return 'hemoscan_ai'
+    
     @classmethod
     def get_db(cls):
         """Get database instance"""
@@ -53,6 +62,13 @@ class Database:
             cls.initialize()
         return cls._db
     
+    @classmethod
+    def get_client(cls):
+        """Get the client behind get_db()"""
+        if cls._client is None:
+            cls.initialize()
+        return cls._client
+    
     @classmethod
     def close(cls):
         """Close MongoDB connection"""
@@ -0,0 +1,133 @@
+"""
+Input drift monitoring for HemoScan AI
+Fixed-size streaming histograms of live features compared against training references
+"""
+
+import threading
+import numpy as np
+
+# Binary/categorical features get one bin per value; continuous ones get quantile bins
+CATEGORICAL_FEATURES = {
+    'gender': [0, 1],
+    'diet': [0, 1, 2],
+    'fatigue': [0, 1],
+    'dizziness': [0, 1],
+    'pale_skin': [0, 1],
+    'weakness': [0, 1],
+    'shortness_breath': [0, 1],
+    'symptom_count': [0, 1, 2, 3, 4, 5]
+}
+CONTINUOUS_BINS = 10
+
+# Conventional PSI reading: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 major shift
+PSI_MODERATE = 0.1
+PSI_MAJOR = 0.25
+
+
+def build_reference(feature_frame, feature_names):
+    """Reference histograms of the training features, saved with the model artifacts
+
+    Continuous features use interior quantile edges so each reference bin
+    holds roughly the same share of training rows.
+    """
+    reference = {}
+    for name in feature_names:
+        values = np.asarray(feature_frame[name], dtype=float)
+        if name in CATEGORICAL_FEATURES:
+            categories = CATEGORICAL_FEATURES[name]
+            edges = [c + 0.5 for c in categories[:-1]]
+        else:
+            quantiles = np.linspace(0, 1, CONTINUOUS_BINS + 1)[1:-1]
+            edges = np.unique(np.quantile(values, quantiles)).tolist()
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        reference[name] = {'edges': [float(e) for e in edges], 'counts': counts.tolist()}
+    return reference
+
+
+def update_reference(reference, feature_frame, feature_names):
+    """Reference with new training rows added to its counts (incremental retraining)
+
+    Existing features keep their bin edges, so live histograms stay
+    comparable; features the reference lacks get new histograms.
+    """
+    updated = build_reference(feature_frame, [name for name in feature_names if name not in reference])
+    for name in feature_names:
+        if name in reference:
+            edges = reference[name]['edges']
+            values = np.asarray(feature_frame[name], dtype=float)
+            added = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+            updated[name] = {'edges': edges, 'counts': (np.asarray(reference[name]['counts']) + added).tolist()}
+    return updated
+
+
+def population_stability_index(expected_counts, actual_counts, epsilon=1e-4):
+    """PSI between two histograms over the same bins"""
+    expected = np.asarray(expected_counts, dtype=float)
+    actual = np.asarray(actual_counts, dtype=float)
+    expected = np.clip(expected / max(expected.sum(), 1), epsilon, None)
+    actual = np.clip(actual / max(actual.sum(), 1), epsilon, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks_statistic(expected_counts, actual_counts):
+    """Largest gap between the two binned CDFs (KS statistic at bin resolution)"""
+    expected = np.cumsum(expected_counts) / max(np.sum(expected_counts), 1)
+    actual = np.cumsum(actual_counts) / max(np.sum(actual_counts), 1)
+    return float(np.max(np.abs(expected - actual)))
+
+
+class DriftMonitor:
+    """Streaming per-feature histograms over the same bins as the training reference
+
+    Memory is fixed by the number of bins; each update is one searchsorted per
+    feature, so cost per request does not grow with traffic or history.
+    """
+
+    def __init__(self, reference, feature_names):
+        self.feature_names = [name for name in feature_names if name in reference]
+        self.reference = reference
+        # Position of each monitored feature in the model's feature vector
+        self._positions = [list(feature_names).index(name) for name in self.feature_names]
+        self._edges = [np.asarray(reference[name]['edges']) for name in self.feature_names]
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = [np.zeros(len(edges) + 1, dtype=np.int64) for edges in self._edges]
+            self._observations = 0
+
+    def update(self, feature_vector):
+        """Record one live feature vector (raw, in model feature order)"""
+        with self._lock:
+            for i, (edges, position) in enumerate(zip(self._edges, self._positions)):
+                self._counts[i][np.searchsorted(edges, feature_vector[position], side='right')] += 1
+            self._observations += 1
+
+    def report(self, min_observations=30):
+        """PSI and KS drift scores per feature"""
+        with self._lock:
+            counts = [c.copy() for c in self._counts]
+            observations = self._observations
+
+        features = {}
+        for name, live in zip(self.feature_names, counts):
+            expected = self.reference[name]['counts']
+            psi = population_stability_index(expected, live)
+            if observations < min_observations:
+                status = 'insufficient_data'
+            elif psi >= PSI_MAJOR:
+                status = 'major'
+            elif psi >= PSI_MODERATE:
+                status = 'moderate'
+            else:
+                status = 'stable'
+            features[name] = {
+                'psi': round(psi, 4),
+                'ks': round(ks_statistic(expected, live), 4),
+                'status': status,
+                'edges': self.reference[name]['edges'],
+                'reference_counts': expected,
+                'live_counts': live.tolist()
+            }
+        return {'observations': observations, 'features': features}
@@ -0,0 +1,207 @@
+"""
+NumPy-only inference runtime for HemoScan AI
+Scores the model exported by train_model.py (models/model.npz) without importing
+scikit-learn or unpickling anything, for fast API cold starts and offline scoring on
+low-resource clinic devices. This file depends only on NumPy and the standard library,
+so it can be copied to a device together with model.npz.
+
+Usage: python hemoscan_runtime.py --model models/model.npz < screenings.jsonl > scored.jsonl
+       (one JSON object per line with age, gender, hemoglobin, diet and symptoms)
+"""
+
+import argparse
+import json
+import sys
+import numpy as np
+
+FORMAT_VERSION = 2
+SUPPORTED_FORMATS = (1, 2)  # 2: float32 thresholds, per-tree int16/int32 child indices
+
+
+class Scaler:
+    """StandardScaler.transform() from the exported mean and scale"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=float) - self.mean_) / self.scale_
+
+
+class TreeEnsemble:
+    """Random forest (mean of leaf probabilities) or binary gradient boosting (sum of leaf values)
+
+    All trees share flat node arrays; leaves point at themselves, so every row
+    walks max_depth steps with no per-row branching. With local_children the
+    child indices are relative to each tree's root, which lets them be stored
+    as int16.
+    """
+
+    def __init__(self, kind, roots, feature, threshold, left, right, value, max_depth,
+                 feature_importances, init_raw=0.0, learning_rate=1.0, local_children=False):
+        self.kind = kind
+        self.roots = roots
+        self.child_base = roots if local_children else 0
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.max_depth = int(max_depth)
+        self.feature_importances_ = feature_importances
+        self.init_raw = float(init_raw)
+        self.learning_rate = float(learning_rate)
+
+    def leaf_values(self, X):
+        """(n_rows, n_trees) leaf values"""
+        # scikit-learn compares float32 inputs against the split thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = self.child_base + np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes]
+
+    def predict_proba(self, X):
+        values = self.leaf_values(X)
+        if self.kind == 'forest':
+            positive = values.mean(axis=1)
+        else:
+            raw = self.init_raw + self.learning_rate * values.sum(axis=1)
+            positive = 1.0 / (1.0 + np.exp(-raw))
+        return np.column_stack([1.0 - positive, positive])
+
+
+class LinearModel:
+    """Logistic regression from the exported coefficients"""
+
+    def __init__(self, coef, intercept):
+        self.coef_ = coef.reshape(1, -1)
+        self.intercept = float(intercept)
+
+    def predict_proba(self, X):
+        positive = 1.0 / (1.0 + np.exp(-(np.asarray(X, dtype=float) @ self.coef_[0] + self.intercept)))
+        return np.column_stack([1.0 - positive, positive])
+
+
+class Runtime:
+    """Exported model plus the feature encoding and clinical adjustment rules it was trained with"""
+
+    def __init__(self, manifest, scaler, model):
+        self.manifest = manifest
+        self.scaler = scaler
+        self.model = model
+        self.feature_names = manifest['feature_names']
+        self.rules = manifest['adjustment_rules']
+        self.risk_levels = manifest['risk_levels']
+        self.risk_thresholds = manifest['risk_thresholds']
+        self._column = {name: i for i, name in enumerate(self.feature_names)}
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        manifest = json.loads(str(arrays.pop('manifest')))
+        if manifest.get('format_version') not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported export format {manifest.get('format_version')}")
+
+        scaler = Scaler(arrays['scaler_mean'], arrays['scaler_scale'])
+        if manifest['model_kind'] == 'linear':
+            model = LinearModel(arrays['coef'], arrays['intercept'])
+        else:
+            model = TreeEnsemble(
+                manifest['model_kind'], arrays['roots'], arrays['feature'], arrays['threshold'],
+                arrays['left'], arrays['right'], arrays['value'], manifest['max_depth'],
+                arrays['feature_importances'], manifest.get('init_raw', 0.0), manifest.get('learning_rate', 1.0),
+                local_children=manifest['format_version'] >= 2
+            )
+        return cls(manifest, scaler, model)
+
+    def predict_raw(self, feature_matrix):
+        """Model probabilities for raw (unscaled) feature rows, before the adjustment rules"""
+        return self.model.predict_proba(self.scaler.transform(feature_matrix))[:, 1]
+
+    def adjust(self, probabilities, feature_matrix):
+        """Same hemoglobin and symptom rules as scoring.adjust_probabilities()"""
+        rules = self.rules
+        X = np.asarray(feature_matrix, dtype=float)
+        hemoglobin = X[:, self._column['hemoglobin']]
+        symptom_count = X[:, self._column['symptom_count']]
+        hb_threshold = np.where(X[:, self._column['gender']] == 0,
+                                rules['hb_threshold_female'], rules['hb_threshold_male'])
+
+        anemic = hemoglobin < hb_threshold
+        normal_or_high = hemoglobin >= hb_threshold + rules['normal_margin']
+        probabilities = np.where(
+            anemic,
+            np.minimum(1.0, probabilities + (hb_threshold - hemoglobin) / hb_threshold * rules['anemia_weight']),
+            np.where(
+                normal_or_high,
+                np.maximum(0.0, probabilities - (hemoglobin - hb_threshold) / rules['normal_span'] * rules['normal_weight']),
+                probabilities
+            )
+        )
+        return np.where(
+            symptom_count >= rules['many_symptoms'],
+            np.minimum(1.0, probabilities + rules['many_symptoms_boost']),
+            np.where(
+                (symptom_count == 0) & (hemoglobin >= hb_threshold),
+                np.maximum(0.0, probabilities - rules['no_symptoms_reduction']),
+                probabilities
+            )
+        )
+
+    def score(self, feature_matrix):
+        """Adjusted probabilities and risk levels for raw feature rows"""
+        probabilities = self.adjust(self.predict_raw(feature_matrix), feature_matrix)
+        codes = np.digitize(probabilities, self.risk_thresholds)
+        return probabilities, [self.risk_levels[c] for c in codes]
+
+    def encode(self, screening):
+        """Raw feature row for a /predict-style screening dict"""
+        symptoms = screening.get('symptoms') or []
+        hemoglobin = screening.get('hemoglobin')
+        row = {
+            'age': float(screening['age']),
+            'gender': 0.0 if str(screening['gender']).lower() in ['female', 'f'] else 1.0,
+            'hemoglobin': float(hemoglobin) if hemoglobin not in (None, '') else self.manifest['rural_hemoglobin_estimate'],
+            'diet': float(self.manifest['diet_map'].get(str(screening['diet']).lower(), 1))
+        }
+        for symptom in self.manifest['symptoms']:
+            row[symptom] = 1.0 if symptom in symptoms else 0.0
+        row['symptom_count'] = sum(row[symptom] for symptom in self.manifest['symptoms'])
+        return [row[name] for name in self.feature_names]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='models/model.npz')
+    parser.add_argument('--input', help='JSONL file (default: stdin)')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    runtime = Runtime.load(args.model)
+    source = open(args.input) if args.input else sys.stdin
+
+    def flush(batch):
+        probabilities, levels = runtime.score(np.array([runtime.encode(s) for s in batch]))
+        for screening, probability, level in zip(batch, probabilities, levels):
+            sys.stdout.write(json.dumps({**screening, 'probability': round(float(probability), 4),
+                                         'risk_level': level}) + '\n')
+
+    batch = []
+    with source:
+        for line in source:
+            if line.strip():
+                batch.append(json.loads(line))
+            if len(batch) >= args.batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+
+if __name__ == '__main__':
+    main()
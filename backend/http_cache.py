@@ -0,0 +1,56 @@
+"""
+Conditional GET support for HemoScan AI
+ETags from cheap validators (latest id/count plus model version), 304 responses
+and optional gzip for large JSON bodies
+"""
+
+import gzip
+import hashlib
+import json
+from flask import request, make_response
+from config import Config
+from responses import json_response
+
+
+def make_etag(*parts):
+    """Strong ETag from the validator parts"""
+    digest = hashlib.sha1(json.dumps(parts, default=str).encode('utf-8')).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match, etag):
+    """True when an If-None-Match header value covers the ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return '*' in candidates or etag in [tag[2:] if tag.startswith('W/') else tag for tag in candidates]
+
+
+def gzip_body(body, accept_encoding):
+    """Compressed body when the client accepts gzip and the body is large enough, else None"""
+    if (not Config.RESPONSE_GZIP or len(body) < Config.RESPONSE_GZIP_MIN_BYTES
+            or 'gzip' not in (accept_encoding or '').lower()):
+        return None
+    return gzip.compress(body, compresslevel=Config.RESPONSE_GZIP_LEVEL)
+
+
+def conditional_json(validator, build):
+    """304 when the client's copy is current, otherwise the JSON from build() with its ETag
+
+    validator is a tuple of cheap values that change whenever build() would;
+    build is only called on a miss.
+    """
+    etag = make_etag(*validator)
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        response = make_response('', 304)
+    else:
+        response = json_response(build())
+        compressed = gzip_body(response.get_data(), request.headers.get('Accept-Encoding'))
+        if compressed is not None:
+            response.set_data(compressed)
+            response.headers['Content-Encoding'] = 'gzip'
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['Vary'] = 'Authorization, Accept-Encoding'
+    return response
@@ -0,0 +1,126 @@
+"""
+Idempotency keys for HemoScan AI
+Bounded TTL store of completed responses keyed by (user_id, Idempotency-Key), so client
+retries replay the first response instead of scoring and saving the screening again
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from metrics import metrics
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a request with a different body"""
+
+
+class IdempotencyInProgress(Exception):
+    """The original request for the key has not finished within the wait timeout"""
+
+
+def request_fingerprint(body):
+    """Stable hash of a JSON request body"""
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class _Entry:
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.created = time.monotonic()
+        self.response = None  # (body, status) once completed
+        self.done = threading.Event()
+
+
+class IdempotencyStore:
+    """LRU of in-flight and completed requests, bounded by entry count and age
+
+    The first request for a key owns the computation; duplicates that arrive
+    while it runs wait on it instead of repeating it.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        metrics.register_gauge('idempotency.entries', lambda: len(self._entries))
+
+    def _evict(self, now):
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and now - entry.created < self.ttl:
+                break
+            del self._entries[key]
+
+    def begin(self, key, fingerprint):
+        """(entry, True) when the caller must compute the response, else (existing entry, False)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.created < self.ttl:
+                self._entries.move_to_end(key)
+                return entry, False
+            entry = _Entry(fingerprint)
+            self._entries[key] = entry
+            self._evict(now)
+            return entry, True
+
+    def claim(self, key, fingerprint, wait_timeout):
+        """(entry, None) when the caller must compute the response, or (None, (body, status)) to replay it
+
+        Duplicates of an in-flight request block until the original finishes.
+        Raises IdempotencyKeyReused when the key is reused with a different
+        body, and IdempotencyInProgress if the original does not finish in time.
+        """
+        for _ in range(2):
+            entry, owner = self.begin(key, fingerprint)
+            if owner:
+                return entry, None
+
+            if entry.fingerprint != fingerprint:
+                raise IdempotencyKeyReused('Idempotency-Key was already used with a different request body')
+            if not entry.done.is_set():
+                metrics.increment('idempotency.waited')
+                if not entry.done.wait(wait_timeout):
+                    raise IdempotencyInProgress('The original request with this Idempotency-Key is still running')
+            if entry.response is not None:
+                metrics.increment('idempotency.replayed')
+                return None, entry.response
+            # The original failed and was abandoned: take over once
+        raise IdempotencyInProgress('The original request with this Idempotency-Key did not complete')
+
+    def finish(self, key, entry, body, status):
+        """Cache a 2xx response for replay; anything else is forgotten so a retry is processed"""
+        if 200 <= status < 300:
+            entry.response = (body, status)
+            entry.done.set()
+        else:
+            self.abandon(key, entry)
+
+    def abandon(self, key, entry):
+        """Owner failed: forget the key so a retry computes again, and wake waiters"""
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        entry.done.set()
+
+    def run(self, key, fingerprint, compute, wait_timeout):
+        """Response for an idempotent request: (body, status, replayed)
+
+        compute() returns (body, status) and does the side effects; it runs at
+        most once per key while the entry is cached.
+        """
+        entry, cached = self.claim(key, fingerprint, wait_timeout)
+        if cached is not None:
+            return cached[0], cached[1], True
+        try:
+            body, status = compute()
+        except Exception:
+            self.abandon(key, entry)
+            raise
+        self.finish(key, entry, body, status)
+        return body, status, False
@@ -0,0 +1,265 @@
+"""
+Incremental retraining for HemoScan AI
+Updates the serving model from screenings added since the last checkpoint instead of
+retraining from scratch, then publishes a new versioned artifact.
+
+Usage: python incremental_train.py [--min-rows 50]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from config import Config
+from drift import build_reference, update_reference
+from scoring import SYMPTOMS, encode_gender, encode_diet, build_feature_matrix
+from train_model import clinical_risk, compute_explanations, export_runtime, generate_synthetic_data
+
+DB_PATH = 'hemoscan.db'
+MODEL_DIR = 'models'
+CHECKPOINT_FILE = 'training_checkpoint.json'
+ARTIFACTS = ['model.pkl', 'scaler.pkl', 'feature_names.pkl', 'model_metadata.json', 'model.npz',
+             'explanations.json', 'drift_reference.json']
+EXPLAIN_SYNTHETIC_ROWS = 1000
+
+
+def load_checkpoint(model_dir=MODEL_DIR):
+    path = os.path.join(model_dir, CHECKPOINT_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {'last_screening_id': 0, 'rows_trained': 0}
+
+
+def read_new_screenings(last_id, db_path=DB_PATH):
+    """Screenings with id above the checkpoint (primary-key range scan, so cost tracks new rows only)"""
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute('''
+        SELECT id, age, gender, hemoglobin, diet, symptoms
+        FROM screenings
+        WHERE id > ?
+        ORDER BY id
+    ''', (last_id,)).fetchall()
+    conn.close()
+    return rows
+
+
+def encode_screenings(rows):
+    """Raw feature matrix and clinical labels for stored screenings"""
+    age = np.array([row[1] for row in rows], dtype=float)
+    gender = np.array([encode_gender(row[2]) for row in rows])
+    hemoglobin = np.array([row[3] for row in rows], dtype=float)
+    diet = np.array([encode_diet(row[4]) for row in rows])
+    flags = np.array([
+        [1 if symptom in (row[5] or '').split(',') else 0 for symptom in SYMPTOMS]
+        for row in rows
+    ])
+    X = build_feature_matrix(age, gender, hemoglobin, diet, flags)
+
+    # Real screenings carry no diagnosis, so label them with the same clinical
+    # rule the synthetic training target is built from (without the noise)
+    y = (clinical_risk(age, gender, hemoglobin, diet, flags.sum(axis=1)) > 0.5).astype(int)
+    return X, y
+
+
+def update_scaler(scaler, X_new):
+    """Merge new rows into the scaler's running mean/variance; returns the old statistics"""
+    old_mean, old_scale = scaler.mean_.copy(), scaler.scale_.copy()
+    scaler.partial_fit(X_new)
+    return old_mean, old_scale
+
+
+def rescale_model(model, old_mean, old_scale, new_mean, new_scale):
+    """Re-express a fitted model in the updated scaler's coordinates
+
+    Keeps existing trees and coefficients valid after the scaler statistics move:
+    z_old = (z_new * new_scale + new_mean - old_mean) / old_scale.
+    """
+    if hasattr(model, 'coef_'):
+        coef = model.coef_[0]
+        model.intercept_ = model.intercept_ + np.sum(coef * (new_mean - old_mean) / old_scale)
+        model.coef_ = model.coef_ * (new_scale / old_scale)
+        return
+
+    estimators = np.asarray(model.estimators_, dtype=object).ravel()
+    for tree in estimators:
+        tree_ = tree.tree_
+        split = tree_.feature >= 0  # leaves have feature == -2
+        features = tree_.feature[split]
+        thresholds = tree_.threshold
+        thresholds[split] = (
+            thresholds[split] * old_scale[features] + old_mean[features] - new_mean[features]
+        ) / new_scale[features]
+
+
+def sgd_update_logistic(model, X, y, rows_trained, epochs=5, learning_rate=0.05, batch_size=64):
+    """partial_fit-style gradient steps on new rows, starting from the current coefficients"""
+    rng = np.random.default_rng(0)
+    coef = model.coef_[0].copy()
+    intercept = float(model.intercept_[0])
+    # Same L2 strength as the original fit, spread over all rows seen so far
+    alpha = 1.0 / (model.C * max(rows_trained + len(y), 1))
+    for _ in range(epochs):
+        order = rng.permutation(len(y))
+        for start in range(0, len(y), batch_size):
+            batch = order[start:start + batch_size]
+            p = 1 / (1 + np.exp(-(X[batch] @ coef + intercept)))
+            error = p - y[batch]
+            coef -= learning_rate * (X[batch].T @ error / len(batch) + alpha * coef)
+            intercept -= learning_rate * error.mean()
+    model.coef_ = coef.reshape(1, -1)
+    model.intercept_ = np.array([intercept])
+
+
+def update_model(model, X_scaled, y, rows_trained, trees_per_1000=Config.INCREMENTAL_TREES_PER_1000,
+                 max_trees=Config.INCREMENTAL_MAX_TREES):
+    """Grow/adjust the model with the new rows only; returns a short description"""
+    if hasattr(model, 'coef_'):
+        sgd_update_logistic(model, X_scaled, y, rows_trained)
+        return f'{len(y)} rows of SGD updates'
+
+    added = max(1, int(round(len(y) / 1000 * trees_per_1000)))
+    model.set_params(warm_start=True, n_estimators=model.n_estimators + added)
+    model.fit(X_scaled, y)
+
+    if isinstance(model, RandomForestClassifier) and len(model.estimators_) > max_trees:
+        # Forest: drop the oldest trees so size and latency stay bounded
+        model.estimators_ = model.estimators_[-max_trees:]
+        model.n_estimators = max_trees
+    return f'{added} new trees/stages'
+
+
+def refresh_reference(X_new, feature_names, model_dir=MODEL_DIR):
+    """Drift reference of the parent model with the new training rows added"""
+    frame = {name: X_new[:, i] for i, name in enumerate(feature_names)}
+    path = os.path.join(model_dir, 'drift_reference.json')
+    if not os.path.exists(path):
+        return build_reference(frame, feature_names)
+    with open(path) as f:
+        return update_reference(json.load(f), frame, feature_names)
+
+
+def refresh_explanations(model, scaler, X_new, y_new, feature_names):
+    """Explanations of the updated model, on the new screenings plus a fresh synthetic sample
+
+    The synthetic rows stand in for the held-out split train_model.py used,
+    so a small batch of new screenings doesn't make the tables noisy.
+    """
+    synthetic = generate_synthetic_data(EXPLAIN_SYNTHETIC_ROWS, seed=7)
+    X = np.vstack([X_new, synthetic[feature_names].to_numpy(dtype=float)])
+    y = np.concatenate([y_new, synthetic['target'].to_numpy()])
+    return compute_explanations(model, scaler, scaler.transform(X), y, feature_names)
+
+
+def publish(model, scaler, feature_names, metadata, explanations, drift_reference, model_dir=MODEL_DIR,
+            live_dir=None):
+    """Write a versioned artifact directory, then swap the live files (or live_dir's) atomically"""
+    version_dir = os.path.join(model_dir, 'versions', metadata['version'])
+    os.makedirs(version_dir, exist_ok=True)
+    joblib.dump(model, os.path.join(version_dir, 'model.pkl'))
+    joblib.dump(scaler, os.path.join(version_dir, 'scaler.pkl'))
+    joblib.dump(feature_names, os.path.join(version_dir, 'feature_names.pkl'))
+    with open(os.path.join(version_dir, 'model_metadata.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+    # Explanations and the drift reference describe this version, not its parent
+    with open(os.path.join(version_dir, 'explanations.json'), 'w') as f:
+        json.dump(explanations, f, indent=2)
+    with open(os.path.join(version_dir, 'drift_reference.json'), 'w') as f:
+        json.dump(drift_reference, f, indent=2)
+    export_runtime(model, scaler, feature_names, metadata, os.path.join(version_dir, 'model.npz'))
+
+    live_dir = live_dir or model_dir
+    os.makedirs(live_dir, exist_ok=True)
+    for name in ARTIFACTS:
+        tmp_path = os.path.join(live_dir, f'.{name}.tmp')
+        shutil.copyfile(os.path.join(version_dir, name), tmp_path)
+        os.replace(tmp_path, os.path.join(live_dir, name))
+    return version_dir
+
+
+def incremental_train(min_rows=Config.INCREMENTAL_MIN_ROWS, model_dir=MODEL_DIR, db_path=DB_PATH,
+                      candidate_dir=None):
+    """Update the live model from screenings added since the last checkpoint
+
+    With candidate_dir the update is published there for shadow evaluation
+    instead; the live files and the checkpoint are left untouched.
+    """
+    checkpoint = load_checkpoint(model_dir)
+    rows = read_new_screenings(checkpoint['last_screening_id'], db_path)
+    print(f"{len(rows)} new screening(s) since id {checkpoint['last_screening_id']}")
+    if len(rows) < min_rows:
+        print(f"Waiting for at least {min_rows} new screenings - nothing published")
+        return None
+
+    X_new, y_new = encode_screenings(rows)
+    if len(np.unique(y_new)) < 2:
+        print("New screenings contain a single risk class - nothing published")
+        return None
+
+    model = joblib.load(os.path.join(model_dir, 'model.pkl'))
+    scaler = joblib.load(os.path.join(model_dir, 'scaler.pkl'))
+    feature_names = joblib.load(os.path.join(model_dir, 'feature_names.pkl'))
+    metadata_path = os.path.join(model_dir, 'model_metadata.json')
+    metadata = {}
+    if os.path.exists(metadata_path):
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+
+    # Scaler first, then move the existing model into the new scaled space
+    old_mean, old_scale = update_scaler(scaler, X_new)
+    rescale_model(model, old_mean, old_scale, scaler.mean_, scaler.scale_)
+
+    rows_trained = checkpoint['rows_trained'] or int(scaler.n_samples_seen_) - len(rows)
+    description = update_model(model, scaler.transform(X_new), y_new, rows_trained)
+    accuracy = float(model.score(scaler.transform(X_new), y_new))
+
+    last_id = rows[-1][0]
+    metadata.update({
+        'version': datetime.utcnow().strftime('%Y%m%d%H%M%S'),
+        'parent_version': metadata.get('version'),
+        'trained_at': datetime.utcnow().isoformat(),
+        'feature_names': feature_names
+    })
+    metadata.setdefault('incremental_updates', []).append({
+        'version': metadata['version'],
+        'new_rows': len(rows),
+        'last_screening_id': last_id,
+        'update': description,
+        'accuracy_on_new_rows': accuracy
+    })
+    print("Recomputing explanations and the drift reference...")
+    explanations = refresh_explanations(model, scaler, X_new, y_new, feature_names)
+    drift_reference = refresh_reference(X_new, feature_names, model_dir)
+    version_dir = publish(model, scaler, feature_names, metadata, explanations, drift_reference, model_dir,
+                          live_dir=candidate_dir)
+    if candidate_dir:
+        print(f"[OK] Published candidate {metadata['version']} ({description}) to {candidate_dir} - "
+              f"POST /admin/shadow/reload to start shadow evaluation")
+        return metadata['version']
+
+    # Checkpoint last, so a failed publish is retried with the same rows
+    with open(os.path.join(model_dir, CHECKPOINT_FILE), 'w') as f:
+        json.dump({
+            'last_screening_id': last_id,
+            'rows_trained': rows_trained + len(rows),
+            'version': metadata['version']
+        }, f, indent=2)
+
+    print(f"[OK] Published version {metadata['version']} ({description}, "
+          f"accuracy on new rows {accuracy:.4f}) to {version_dir}")
+    return metadata['version']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Incrementally update the model from new screenings')
+    parser.add_argument('--min-rows', type=int, default=Config.INCREMENTAL_MIN_ROWS)
+    parser.add_argument('--candidate', action='store_true',
+                        help=f'publish to {Config.SHADOW_MODEL_DIR} for shadow evaluation instead of going live')
+    args = parser.parse_args()
+    incremental_train(min_rows=args.min_rows,
+                      candidate_dir=Config.SHADOW_MODEL_DIR if args.candidate else None)
@@ -0,0 +1,109 @@
+"""
+Micro-batching inference scheduler for HemoScan AI
+Coalesces concurrent single-row predictions into one batched model call
+"""
+
+import threading
+import queue
+import time
+import numpy as np
+
+
+class _PendingPrediction:
+    """A single row waiting for its batch to be scored"""
+
+    __slots__ = ('row', 'done', 'result', 'error')
+
+    def __init__(self, row):
+        self.row = row
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class BatchScheduler:
+    """Collects rows arriving within a short window into one predict call
+
+    Under low load (no other prediction in flight) the row is scored directly
+    on the caller's thread so single-request latency is unchanged. Only when
+    requests overlap are they queued and scored together by a worker thread,
+    up to ``max_batch`` rows or ``window_ms`` after the first queued row.
+    """
+
+    def __init__(self, predict_fn, window_ms=2.0, max_batch=64):
+        # predict_fn takes an (n, n_features) array and returns n probabilities
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {'direct_calls': 0, 'batches': 0, 'batched_rows': 0, 'max_batch_seen': 0}
+
+        self._worker = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+        self._worker.start()
+
+    def predict(self, row):
+        """Return the probability for one feature row, batching when busy"""
+        row = np.asarray(row, dtype=float)
+        with self._lock:
+            self._in_flight += 1
+            busy = self._in_flight > 1
+            if not busy:
+                self._stats['direct_calls'] += 1
+        try:
+            if not busy:
+                return float(self.predict_fn(row.reshape(1, -1))[0])
+
+            pending = _PendingPrediction(row)
+            self._queue.put(pending)
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def stats(self):
+        """Counters describing how much work was coalesced"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = self._in_flight
+        stats['avg_batch_size'] = (
+            round(stats['batched_rows'] / stats['batches'], 2) if stats['batches'] else 0
+        )
+        return stats
+
+    def _collect(self):
+        """Block for the first row, then gather more until the window closes"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                probabilities = self.predict_fn(np.vstack([p.row for p in batch]))
+                for pending, probability in zip(batch, probabilities):
+                    pending.result = float(probability)
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            finally:
+                with self._lock:
+                    self._stats['batches'] += 1
+                    self._stats['batched_rows'] += len(batch)
+                    self._stats['max_batch_seen'] = max(self._stats['max_batch_seen'], len(batch))
+                for pending in batch:
+                    pending.done.set()
@@ -0,0 +1,102 @@
+"""
+Screening job routes for HemoScan AI
+Upload large screening CSVs, poll their progress and download the results
+"""
+
+from flask import Blueprint, request, jsonify, send_file
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from config import Config
+from jobs import JobManager, get_job
+import os
+
+jobs_bp = Blueprint('jobs', __name__)
+
+job_manager = JobManager(
+    job_dir=Config.JOB_DIR,
+    workers=Config.JOB_WORKERS,
+    chunk_size=Config.JOB_CHUNK_SIZE
+)
+
+
+def _job_response(job):
+    progress = 0.0
+    if job['status'] == 'completed':
+        progress = 100.0
+    elif job['rows_total']:
+        progress = round(job['rows_processed'] / job['rows_total'] * 100, 2)
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'filename': job['filename'],
+        'rows_total': job['rows_total'],
+        'rows_processed': job['rows_processed'],
+        'progress': progress,
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at']
+    }
+
+
+def _get_own_job(job_id):
+    job = get_job(job_id)
+    if not job or job['user_id'] != get_jwt_identity():
+        return None
+    return job
+
+
+@jobs_bp.route('/jobs', methods=['POST'])
+@jwt_required()
+def upload_job():
+    """Upload a screening CSV (multipart field "file" or raw text/csv body)"""
+    try:
+        user_id = get_jwt_identity()
+        if 'file' in request.files:
+            upload = request.files['file']
+            filename = upload.filename or 'upload.csv'
+            stream = upload.stream
+        else:
+            if not request.content_length:
+                return jsonify({'error': 'No file uploaded'}), 400
+            filename = request.args.get('filename', 'upload.csv')
+            stream = request.stream
+
+        job_id = job_manager.create_job(user_id, os.path.basename(filename), stream)
+        return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def job_status(job_id):
+    """Status and progress of a screening job"""
+    try:
+        job = _get_own_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(_job_response(job)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@jobs_bp.route('/jobs/<job_id>/result', methods=['GET'])
+@jwt_required()
+def job_result(job_id):
+    """Download the scored CSV of a completed job"""
+    try:
+        job = _get_own_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        if job['status'] != 'completed':
+            return jsonify({'error': f"Job is {job['status']}", **_job_response(job)}), 409
+        return send_file(
+            os.path.abspath(job['result_path']),
+            mimetype='text/csv',
+            as_attachment=True,
+            download_name=f"{os.path.splitext(job['filename'])[0]}_results.csv"
+        )
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
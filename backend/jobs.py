@@ -0,0 +1,278 @@
+"""
+Background screening jobs for HemoScan AI
+Large CSV uploads are scored in chunks on a process pool, with job state in SQLite
+"""
+
+import os
+import sqlite3
+import threading
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import joblib
+import numpy as np
+import pandas as pd
+from config import Config
+from hemoscan_runtime import Runtime
+from scoring import (
+    SYMPTOMS, RURAL_HEMOGLOBIN_ESTIMATE, DIET_MAP,
+    build_feature_matrix, score_matrix
+)
+
+DB_PATH = 'hemoscan.db'
+MODEL_PATH = 'models/model.pkl'
+SCALER_PATH = 'models/scaler.pkl'
+RUNTIME_EXPORT_PATH = 'models/model.npz'
+
+JOB_COLUMNS = [
+    'id', 'user_id', 'status', 'filename', 'input_path', 'result_path',
+    'rows_total', 'rows_processed', 'result_bytes', 'error', 'created_at', 'updated_at'
+]
+
+# Per-process model cache so each pool worker unpickles the model only once per model version
+_worker_bundle = None
+_worker_bundle_key = None
+
+
+def init_jobs_table(db_path=DB_PATH):
+    """Create the jobs table"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            user_id TEXT,
+            status TEXT,
+            filename TEXT,
+            input_path TEXT,
+            result_path TEXT,
+            rows_total INTEGER,
+            rows_processed INTEGER DEFAULT 0,
+            result_bytes INTEGER DEFAULT 0,
+            error TEXT,
+            created_at TEXT,
+            updated_at TEXT
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def _update_job(db_path, job_id, **fields):
+    fields['updated_at'] = datetime.utcnow().isoformat()
+    assignments = ', '.join(f'{name} = ?' for name in fields)
+    conn = sqlite3.connect(db_path)
+    conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+    conn.commit()
+    conn.close()
+
+
+def get_job(job_id, db_path=DB_PATH):
+    """Job row as a dict, or None"""
+    conn = sqlite3.connect(db_path)
+    row = conn.execute(f'SELECT {", ".join(JOB_COLUMNS)} FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    conn.close()
+    return dict(zip(JOB_COLUMNS, row)) if row else None
+
+
+def count_data_rows(path):
+    """Number of data rows in a CSV (newlines minus the header), read in 1 MB blocks"""
+    newlines = 0
+    last_byte = b'\n'
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(1024 * 1024)
+            if not block:
+                break
+            newlines += block.count(b'\n')
+            last_byte = block[-1:]
+    if last_byte != b'\n':
+        newlines += 1  # final line without trailing newline
+    return max(newlines - 1, 0)
+
+
+def encode_chunk(chunk):
+    """Raw feature matrix and validity mask for a chunk of uploaded screenings
+
+    Symptoms come either as one 0/1 column per symptom or as a ``symptoms``
+    column of names separated by ``;`` or ``|``.
+    """
+    age = pd.to_numeric(chunk['age'], errors='coerce')
+    gender = chunk['gender'].astype(str).str.strip().str.lower().isin(['female', 'f'])
+    gender = np.where(gender, 0, 1)
+    diet = chunk['diet'].astype(str).str.strip().str.lower().map(DIET_MAP).fillna(1)
+
+    if 'hemoglobin' in chunk:
+        hemoglobin = pd.to_numeric(chunk['hemoglobin'], errors='coerce').fillna(RURAL_HEMOGLOBIN_ESTIMATE)
+    else:
+        hemoglobin = np.full(len(chunk), RURAL_HEMOGLOBIN_ESTIMATE)
+
+    if all(symptom in chunk for symptom in SYMPTOMS):
+        flags = np.column_stack([
+            pd.to_numeric(chunk[symptom], errors='coerce').fillna(0).clip(0, 1)
+            for symptom in SYMPTOMS
+        ])
+    else:
+        names = chunk.get('symptoms', pd.Series('', index=chunk.index)).fillna('').astype(str).str.lower()
+        flags = np.column_stack([
+            names.str.contains(rf'(?:^|[;|\s]){symptom}(?:$|[;|\s])', regex=True).astype(int)
+            for symptom in SYMPTOMS
+        ])
+
+    valid = age.notna().to_numpy()
+    matrix = build_feature_matrix(age.fillna(0), gender, hemoglobin, diet, flags)
+    return matrix, valid
+
+
+def _load_worker_bundle(model_path, scaler_path):
+    global _worker_bundle, _worker_bundle_key
+    paths = [RUNTIME_EXPORT_PATH] if Config.INFERENCE_RUNTIME == 'numpy' else [model_path, scaler_path]
+    # Published models replace the files, so a new mtime means a new model version
+    key = tuple((path, os.stat(path).st_mtime_ns) for path in paths)
+    if _worker_bundle is None or key != _worker_bundle_key:
+        if Config.INFERENCE_RUNTIME == 'numpy':
+            runtime = Runtime.load(RUNTIME_EXPORT_PATH)
+            _worker_bundle = (runtime.model, runtime.scaler)
+        else:
+            _worker_bundle = (joblib.load(model_path), joblib.load(scaler_path))
+        _worker_bundle_key = key
+    return _worker_bundle
+
+
+def process_job(job_id, input_path, result_path, db_path=DB_PATH, chunk_size=5000,
+                model_path=MODEL_PATH, scaler_path=SCALER_PATH):
+    """Score an uploaded CSV chunk by chunk, appending results and checkpointing progress
+
+    Runs in a pool worker. A job resumed after a restart truncates the result
+    file back to the last committed chunk and skips rows already scored.
+    """
+    try:
+        job = get_job(job_id, db_path)
+        model, scaler = _load_worker_bundle(model_path, scaler_path)
+
+        rows_total = count_data_rows(input_path)
+        rows_done = job['rows_processed'] or 0
+        result_bytes = job['result_bytes'] or 0
+        _update_job(db_path, job_id, status='running', rows_total=rows_total)
+
+        with open(result_path, 'ab') as result_file:
+            result_file.truncate(result_bytes)
+
+        reader = pd.read_csv(
+            input_path,
+            chunksize=chunk_size,
+            skiprows=range(1, rows_done + 1) if rows_done else None,
+            skipinitialspace=True
+        )
+        for chunk in reader:
+            chunk.columns = [str(c).strip().lower() for c in chunk.columns]
+            missing = [c for c in ['age', 'gender', 'diet'] if c not in chunk]
+            if missing:
+                raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+            matrix, valid = encode_chunk(chunk)
+            probabilities = np.full(len(chunk), np.nan)
+            levels = np.full(len(chunk), '', dtype=object)
+            if valid.any():
+                probabilities[valid], levels[valid] = score_matrix(model, scaler, matrix[valid])
+
+            chunk['risk_level'] = levels
+            chunk['risk_score'] = np.round(probabilities * 100, 2)
+            chunk['probability'] = np.round(probabilities, 4)
+            chunk['error'] = np.where(valid, '', 'invalid age')
+
+            with open(result_path, 'a', newline='') as result_file:
+                chunk.to_csv(result_file, header=(result_bytes == 0), index=False)
+                result_bytes = result_file.tell()
+            rows_done += len(chunk)
+            _update_job(db_path, job_id, rows_processed=rows_done, result_bytes=result_bytes)
+
+        _update_job(db_path, job_id, status='completed', rows_total=rows_done)
+    except Exception as e:
+        _update_job(db_path, job_id, status='failed', error=str(e))
+
+
+class JobManager:
+    """Accepts uploaded screening files and schedules them on a process pool"""
+
+    def __init__(self, job_dir='jobs', workers=2, chunk_size=5000, db_path=DB_PATH):
+        self.job_dir = job_dir
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.db_path = db_path
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _ensure_pool(self):
+        """Create the pool on first use, so uploads work however the server was started"""
+        with self._pool_lock:
+            if self._pool is None:
+                os.makedirs(self.job_dir, exist_ok=True)
+                init_jobs_table(self.db_path)
+                # spawn: forking a threaded server process is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+        return self._pool
+
+    def start(self):
+        """Create the pool and resume jobs left queued or running by a previous process"""
+        self._ensure_pool()
+        conn = sqlite3.connect(self.db_path)
+        pending = conn.execute(
+            "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+        ).fetchall()
+        conn.close()
+        for (job_id,) in pending:
+            self._submit(get_job(job_id, self.db_path))
+        return len(pending)
+
+    def new_upload(self):
+        """(job id, input path) for an upload about to be written"""
+        self._ensure_pool()
+        job_id = uuid.uuid4().hex
+        return job_id, os.path.join(self.job_dir, f'{job_id}.csv')
+
+    def create_job(self, user_id, filename, stream, block_size=1024 * 1024):
+        """Stream an upload to disk, record the job and queue it; returns the job id"""
+        job_id, input_path = self.new_upload()
+        with open(input_path, 'wb') as f:
+            while True:
+                block = stream.read(block_size)
+                if not block:
+                    break
+                f.write(block)
+        self.queue_job(job_id, user_id, filename)
+        return job_id
+
+    def queue_job(self, job_id, user_id, filename):
+        """Record an upload written to new_upload()'s path and schedule it"""
+        input_path = os.path.join(self.job_dir, f'{job_id}.csv')
+        result_path = os.path.join(self.job_dir, f'{job_id}.result.csv')
+        now = datetime.utcnow().isoformat()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            INSERT INTO jobs (id, user_id, status, filename, input_path, result_path,
+                              rows_processed, result_bytes, created_at, updated_at)
+            VALUES (?, ?, 'queued', ?, ?, ?, 0, 0, ?, ?)
+        ''', (job_id, user_id, filename, input_path, result_path, now, now))
+        conn.commit()
+        conn.close()
+
+        self._submit(get_job(job_id, self.db_path))
+
+    def _submit(self, job):
+        try:
+            self._ensure_pool().submit(
+                process_job, job['id'], job['input_path'], job['result_path'],
+                self.db_path, self.chunk_size
+            )
+        except Exception as e:
+            # Don't leave a 'queued' row that nothing will ever pick up
+            _update_job(self.db_path, job['id'], status='failed', error=f'Could not schedule job: {e}')
+            raise
+
+    def shutdown(self):
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,366 @@
+"""
+Load generator for HemoScan AI capacity planning
+Replays a recorded (TRAFFIC_CAPTURE_PATH) or synthesized stream of /predict, /auth/login,
+/user/predictions and /stats requests against a server at a fixed rate, at the recorded
+pace or as fast as the concurrency allows, and reports throughput, error rate and
+latency percentiles per endpoint.
+
+Usage: python loadgen.py synthesize --events 5000 --users 50 --output traffic.jsonl
+       python loadgen.py replay traffic.jsonl --spawn --rate 100 --concurrency 16
+       python loadgen.py replay captured.jsonl --base-url http://127.0.0.1:5000 --speed 2 \
+           --admin-email admin@example.com --admin-password ...
+       python loadgen.py serve --port 5200   (Flask app on an in-memory MongoDB stand-in)
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+DEFAULT_MIX = {'predict': 0.6, 'user_predictions': 0.25, 'login': 0.1, 'stats': 0.05}
+ENDPOINT_REQUESTS = {
+    'predict': ('POST', '/predict'),
+    'login': ('POST', '/auth/login'),
+    'user_predictions': ('GET', '/user/predictions'),
+    'stats': ('GET', '/stats')
+}
+STAND_IN_ADMIN = ('loadgen-admin@example.com', 'loadgen-admin')
+PASSWORD = 'loadgen-password'
+
+
+# Stream synthesis
+
+def predict_bodies(n, seed, rural_share=0.1):
+    """/predict bodies drawn from the training data generator"""
+    from train_model import generate_synthetic_data  # imports scikit-learn; only needed here
+
+    df = generate_synthetic_data(n, seed=seed)
+    symptoms = ['fatigue', 'dizziness', 'pale_skin', 'weakness', 'shortness_breath']
+    rural = np.random.default_rng(seed).random(n) < rural_share
+    bodies = []
+    for row, is_rural in zip(df.itertuples(index=False), rural):
+        bodies.append({
+            'age': int(row.age),
+            'gender': 'Female' if row.gender == 0 else 'Male',
+            'hemoglobin': None if is_rural else round(float(row.hemoglobin), 1),
+            'diet': ['Poor', 'Moderate', 'Good'][int(row.diet)],
+            'symptoms': [s for s in symptoms if getattr(row, s)],
+            'rural_mode': bool(is_rural)
+        })
+    return bodies
+
+
+def synthesize(events, users, rate, mix=None, seed=42):
+    """Event stream with Poisson arrivals at `rate` req/s and the given endpoint mix"""
+    mix = mix or DEFAULT_MIX
+    rng = np.random.default_rng(seed)
+    names = list(mix)
+    endpoints = rng.choice(names, size=events, p=np.array([mix[n] for n in names]) / sum(mix.values()))
+    times = np.cumsum(rng.exponential(1 / rate, size=events))
+    user_ids = rng.integers(0, users, size=events)
+    bodies = iter(predict_bodies(int((endpoints == 'predict').sum()), seed))
+    stream = []
+    for t, endpoint, user in zip(times, endpoints, user_ids):
+        event = {'t': round(float(t), 4), 'endpoint': str(endpoint), 'user': f'u{user}'}
+        if endpoint == 'predict':
+            event['body'] = next(bodies)
+        stream.append(event)
+    return stream
+
+
+def load_stream(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# Replay
+
+def call(base_url, method, path, body=None, token=None, timeout=30):
+    request = urllib.request.Request(
+        base_url + path,
+        data=json.dumps(body).encode() if body is not None else None,
+        method=method,
+        headers={'Content-Type': 'application/json'}
+    )
+    if token:
+        request.add_header('Authorization', f'Bearer {token}')
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload, status = response.read(), response.status
+    except urllib.error.HTTPError as e:
+        payload, status = e.read(), e.code
+    except Exception:
+        payload, status = b'', 0
+    return status, (time.perf_counter() - start) * 1000, payload
+
+
+class Accounts:
+    """One synthetic account per pseudonymous user in the stream, created on first use"""
+
+    def __init__(self, base_url, admin_credentials=None):
+        self.base_url = base_url
+        self.run_id = uuid.uuid4().hex[:8]
+        self.admin_credentials = admin_credentials
+        self._tokens = {}
+        self._admin_token = None
+        self._lock = threading.Lock()
+
+    def email(self, user):
+        return f'load_{self.run_id}_{user}@example.com'
+
+    def token(self, user):
+        with self._lock:
+            if user not in self._tokens:
+                status, _, payload = call(self.base_url, 'POST', '/auth/signup', {
+                    'username': f'load_{self.run_id}_{user}', 'email': self.email(user), 'password': PASSWORD
+                })
+                if status != 201:
+                    raise RuntimeError(f'signup failed ({status}): {payload[:200]}')
+                self._tokens[user] = json.loads(payload)['access_token']
+            return self._tokens[user]
+
+    def admin_token(self):
+        with self._lock:
+            if self._admin_token is None and self.admin_credentials:
+                email, password = self.admin_credentials
+                status, _, payload = call(self.base_url, 'POST', '/auth/login', {'email': email, 'password': password})
+                if status != 200:
+                    raise RuntimeError(f'admin login failed ({status}): {payload[:200]}')
+                self._admin_token = json.loads(payload)['access_token']
+            return self._admin_token
+
+
+def percentiles(latencies):
+    if not latencies:
+        return {'p50_ms': None, 'p90_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    values = np.array(latencies)
+    return {
+        **{f'p{p}_ms': round(float(np.percentile(values, p)), 2) for p in (50, 90, 95, 99)},
+        'max_ms': round(float(values.max()), 2)
+    }
+
+
+def replay(base_url, stream, concurrency=16, rate=None, speed=None, admin_credentials=None, limit=None):
+    """Send the stream and return per-endpoint results
+
+    rate: fixed open-loop arrival rate in req/s; speed: recorded timestamps
+    divided by this factor; neither: back to back, bounded by concurrency only.
+    """
+    stream = stream[:limit] if limit else stream
+    accounts = Accounts(base_url, admin_credentials)
+    if any(e['endpoint'] == 'stats' for e in stream) and not admin_credentials:
+        print('No admin credentials: /stats events are skipped')
+
+    # Accounts are created before the clock starts, so signups don't count as load
+    for user in {e['user'] for e in stream if e['endpoint'] != 'stats' and e.get('user')}:
+        accounts.token(user)
+    if admin_credentials:
+        accounts.admin_token()
+
+    results = {name: [] for name in ENDPOINT_REQUESTS}
+    skipped = {name: 0 for name in ENDPOINT_REQUESTS}
+    in_flight = threading.Semaphore(concurrency)
+    late = []
+
+    def send(event):
+        try:
+            endpoint = event['endpoint']
+            method, path = ENDPOINT_REQUESTS[endpoint]
+            if endpoint == 'login':
+                body, token = {'email': accounts.email(event['user']), 'password': PASSWORD}, None
+            elif endpoint == 'stats':
+                body, token = None, accounts.admin_token()
+            else:
+                body, token = event.get('body'), accounts.token(event['user'])
+            status, latency, _ = call(base_url, method, path, body, token)
+            results[endpoint].append((status, latency))
+        finally:
+            in_flight.release()
+
+    start = time.perf_counter()
+    first_t = stream[0].get('t', 0) if stream else 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i, event in enumerate(stream):
+            if event['endpoint'] not in ENDPOINT_REQUESTS or (event['endpoint'] == 'stats' and not admin_credentials):
+                skipped[event.get('endpoint')] = skipped.get(event.get('endpoint'), 0) + 1
+                continue
+            if rate:
+                due = i / rate
+            elif speed:
+                due = (event.get('t', 0) - first_t) / speed
+            else:
+                due = None
+            if due is not None:
+                delay = due - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            in_flight.acquire()
+            if due is not None:
+                # How far behind schedule the generator fell because every slot was busy
+                late.append(max(0.0, time.perf_counter() - start - due) * 1000)
+            pool.submit(send, event)
+    elapsed = time.perf_counter() - start
+
+    report = {}
+    for endpoint, calls in results.items():
+        if not calls and not skipped.get(endpoint):
+            continue
+        statuses = {}
+        for status, _ in calls:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        errors = sum(1 for status, _ in calls if status == 0 or status >= 400)
+        report[endpoint] = {
+            'requests': len(calls),
+            'throughput_rps': round(len(calls) / elapsed, 1),
+            'error_rate': round(errors / len(calls), 4) if calls else None,
+            'statuses': statuses,
+            'skipped': skipped.get(endpoint, 0),
+            **percentiles([latency for status, latency in calls if 0 < status < 400])
+        }
+    total = sum(len(calls) for calls in results.values())
+    return {
+        'base_url': base_url,
+        'concurrency': concurrency,
+        'rate': rate,
+        'speed': speed,
+        'seconds': round(elapsed, 2),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 1) if elapsed else None,
+        'schedule_lag_p95_ms': round(float(np.percentile(late, 95)), 2) if late else None,
+        'endpoints': report
+    }
+
+
+# Local server on a MongoDB stand-in
+
+def serve(port):
+    """Run the Flask app against mongomock with a seeded admin account (blocks)"""
+    os.environ.setdefault('MONGO_URI', 'mongomock://localhost/hemoscan_load')
+    import app as flask_app
+    from database import Database
+    from auth_routes import bcrypt
+    from datetime import datetime
+
+    flask_app.init_db()
+    flask_app.load_model()
+    flask_app.start_background_workers()
+    email, password = STAND_IN_ADMIN
+    Database.get_db().users.insert_one({
+        'username': 'loadgen_admin',
+        'email': email,
+        'password_hash': bcrypt.generate_password_hash(password).decode('utf-8'),
+        'role': 'admin',
+        'created_at': datetime.utcnow().isoformat()
+    })
+    flask_app.app.run(port=port, threaded=True, debug=False)
+
+
+def spawn_server(port):
+    """Start `serve` in a throwaway working directory (its own hemoscan.db, archive and jobs)"""
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    workdir = tempfile.mkdtemp(prefix='hemoscan-load-')
+    os.symlink(os.path.join(backend_dir, 'models'), os.path.join(workdir, 'models'))
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(backend_dir, 'loadgen.py'), 'serve', '--port', str(port)],
+        cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env={**os.environ, 'MONGO_URI': 'mongomock://localhost/hemoscan_load'}
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('stand-in server exited during startup')
+        if call(base_url, 'GET', '/health', timeout=2)[0] == 200:
+            return process, base_url, workdir
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f'stand-in server did not start on port {port}')
+
+
+def print_report(report):
+    print(f"\n{report['requests']} requests in {report['seconds']}s "
+          f"({report['throughput_rps']} req/s, concurrency {report['concurrency']})\n")
+    print(f"{'endpoint':<18}{'req':>7}{'req/s':>9}{'err %':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for endpoint, r in report['endpoints'].items():
+        error_pct = f"{r['error_rate'] * 100:.1f}" if r['error_rate'] is not None else '-'
+        print(f"{endpoint:<18}{r['requests']:>7}{r['throughput_rps']:>9}{error_pct:>8}"
+              f"{r['p50_ms']!s:>9}{r['p95_ms']!s:>9}{r['p99_ms']!s:>9}")
+
+
+def _mix(value):
+    pairs = [part.split('=') for part in value.split(',')]
+    return {name: float(weight) for name, weight in pairs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    synth = commands.add_parser('synthesize', help='write a synthetic request stream')
+    synth.add_argument('--events', type=int, default=5000)
+    synth.add_argument('--users', type=int, default=50)
+    synth.add_argument('--rate', type=float, default=50, help='mean arrival rate of the recorded timestamps')
+    synth.add_argument('--mix', type=_mix, default=DEFAULT_MIX, help='e.g. predict=0.6,user_predictions=0.3,stats=0.1')
+    synth.add_argument('--seed', type=int, default=42)
+    synth.add_argument('--output', required=True)
+
+    run = commands.add_parser('replay', help='replay a captured or synthesized stream')
+    run.add_argument('stream')
+    target = run.add_mutually_exclusive_group()
+    target.add_argument('--base-url', default='http://127.0.0.1:5000')
+    target.add_argument('--spawn', action='store_true', help='start a local server on a MongoDB stand-in')
+    pace = run.add_mutually_exclusive_group()
+    pace.add_argument('--rate', type=float, help='fixed arrival rate in req/s')
+    pace.add_argument('--speed', type=float, help='replay recorded timing this many times faster')
+    run.add_argument('--concurrency', type=int, default=16)
+    run.add_argument('--limit', type=int, help='replay only the first N events')
+    run.add_argument('--port', type=int, default=5200, help='port for --spawn')
+    run.add_argument('--admin-email')
+    run.add_argument('--admin-password')
+    run.add_argument('--output', help='also write the report to this JSON file')
+
+    stand_in = commands.add_parser('serve', help='run the app on a MongoDB stand-in')
+    stand_in.add_argument('--port', type=int, default=5200)
+
+    args = parser.parse_args()
+    if args.command == 'synthesize':
+        stream = synthesize(args.events, args.users, args.rate, args.mix, args.seed)
+        with open(args.output, 'w') as f:
+            for event in stream:
+                f.write(json.dumps(event) + '\n')
+        print(f"Wrote {len(stream)} events to {args.output}")
+    elif args.command == 'serve':
+        serve(args.port)
+    else:
+        stream = load_stream(args.stream)
+        process = None
+        admin = (args.admin_email, args.admin_password) if args.admin_email else None
+        base_url = args.base_url
+        if args.spawn:
+            process, base_url, workdir = spawn_server(args.port)
+            admin = admin or STAND_IN_ADMIN
+            print(f"Stand-in server on {base_url} (working directory {workdir})")
+        try:
+            report = replay(base_url, stream, args.concurrency, args.rate, args.speed, admin, args.limit)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+        print_report(report)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
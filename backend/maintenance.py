@@ -0,0 +1,236 @@
+"""
+Retention and storage maintenance for HemoScan AI
+Moves screenings older than the retention window from hemoscan.db and the MongoDB
+screenings collection to gzip JSONL archives in batches, then reclaims SQLite space
+(incremental_vacuum, once the database has been converted), refreshes planner statistics
+and compacts the analytics archive.
+
+Usage: python maintenance.py [--retention-days 365]
+       python maintenance.py --convert-auto-vacuum   (one-time, during a quiet period)
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from config import Config
+from metrics import metrics
+
+DB_PATH = 'hemoscan.db'
+SCREENING_COLUMNS = ['id', 'age', 'gender', 'hemoglobin', 'diet', 'symptoms', 'risk_level',
+                     'probability', 'timestamp']
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def append_archive(path, records):
+    """Append records as JSON lines to a gzip file (each batch becomes one gzip member)"""
+    with gzip.open(path, 'at', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, default=str) + '\n')
+
+
+def database_bytes(conn):
+    page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    return page_count * page_size
+
+
+def expire_sqlite(conn, cutoff, archive_path, batch_size, pause):
+    """Archive, then delete, expired SQLite screenings one short transaction per batch"""
+    moved = 0
+    while True:
+        # ts is indexed in the compact screening index, so each batch is an index range scan
+        ids = [row[0] for row in conn.execute(
+            'SELECT id FROM screening_index WHERE ts < ? ORDER BY ts LIMIT ?',
+            (int(cutoff.timestamp()), batch_size)
+        )]
+        if not ids:
+            return moved
+
+        placeholders = ', '.join('?' * len(ids))
+        rows = conn.execute(
+            f"SELECT {', '.join(SCREENING_COLUMNS)} FROM screenings WHERE id IN ({placeholders})", ids
+        ).fetchall()
+        # Archive before deleting: a crash in between can only duplicate archived rows, never lose them
+        append_archive(archive_path, [dict(zip(SCREENING_COLUMNS, row)) for row in rows])
+        with conn:
+            conn.execute(f'DELETE FROM screenings WHERE id IN ({placeholders})', ids)
+            conn.execute(f'DELETE FROM screening_index WHERE id IN ({placeholders})', ids)
+        moved += len(ids)
+        time.sleep(pause)  # let /predict writers in between batches
+
+
+def expire_mongo(db, cutoff, archive_path, batch_size, pause):
+    """Archive, then delete, expired MongoDB screenings in batches (uses the timestamp index)"""
+    moved = 0
+    query = {'timestamp': {'$lt': cutoff.replace(tzinfo=None).isoformat()}}
+    while True:
+        batch = list(db.screenings.find(query).sort('timestamp', 1).limit(batch_size))
+        if not batch:
+            return moved
+        append_archive(archive_path, batch)
+        db.screenings.delete_many({'_id': {'$in': [doc['_id'] for doc in batch]}})
+        moved += len(batch)
+        time.sleep(pause)
+
+
+def auto_vacuum_incremental(conn):
+    return conn.execute('PRAGMA auto_vacuum').fetchone()[0] == AUTO_VACUUM_INCREMENTAL
+
+
+def reclaim_space(conn, pages_per_step=1000):
+    """Return free pages to the filesystem in small steps, then refresh planner statistics
+
+    Only databases already converted with convert_auto_vacuum() give pages back;
+    the scheduled pass never runs a full VACUUM.
+    """
+    if auto_vacuum_incremental(conn):
+        while conn.execute('PRAGMA freelist_count').fetchone()[0] > 0:
+            # executescript steps the pragma to completion; execute() frees a single page
+            conn.executescript(f'PRAGMA incremental_vacuum({pages_per_step});')
+    conn.execute('ANALYZE')
+
+
+def convert_auto_vacuum(db_path=DB_PATH):
+    """One-time switch to incremental auto-vacuum; the full VACUUM rewrites and locks the whole file"""
+    conn = sqlite3.connect(db_path)
+    try:
+        bytes_before = database_bytes(conn)
+        if not auto_vacuum_incremental(conn):
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+        return {'auto_vacuum': 'incremental', 'sqlite_bytes_before': bytes_before,
+                'sqlite_bytes_after': database_bytes(conn)}
+    finally:
+        conn.close()
+
+
+def run_maintenance(retention_days=Config.RETENTION_DAYS, db_path=DB_PATH,
+                    archive_dir=Config.RETENTION_ARCHIVE_DIR, batch_size=Config.MAINTENANCE_BATCH_SIZE,
+                    pause=Config.MAINTENANCE_BATCH_PAUSE_MS / 1000.0, mongo_db=None, screening_archive=None):
+    """One maintenance pass; returns a report of rows moved and space reclaimed
+
+    retention_days of 0 keeps every screening and only runs the storage upkeep.
+    """
+    started = datetime.now(timezone.utc)
+    run_id = started.strftime('%Y%m%d%H%M%S')
+    report = {
+        'started_at': started.replace(tzinfo=None).isoformat(),
+        'retention_days': retention_days,
+        'cutoff': None,
+        'sqlite_rows_archived': 0,
+        'mongo_rows_archived': 0,
+        'archive_files': [],
+        'errors': []
+    }
+
+    conn = sqlite3.connect(db_path)
+    report['sqlite_bytes_before'] = database_bytes(conn)
+
+    if retention_days:
+        cutoff = started - timedelta(days=retention_days)
+        report['cutoff'] = cutoff.replace(tzinfo=None).isoformat()
+        os.makedirs(archive_dir, exist_ok=True)
+
+        sqlite_archive = os.path.join(archive_dir, f'screenings-sqlite-{run_id}.jsonl.gz')
+        report['sqlite_rows_archived'] = expire_sqlite(conn, cutoff, sqlite_archive, batch_size, pause)
+        if report['sqlite_rows_archived']:
+            report['archive_files'].append(sqlite_archive)
+
+        if mongo_db is not None:
+            mongo_archive = os.path.join(archive_dir, f'screenings-mongo-{run_id}.jsonl.gz')
+            try:
+                report['mongo_rows_archived'] = expire_mongo(mongo_db, cutoff, mongo_archive, batch_size, pause)
+                if report['mongo_rows_archived']:
+                    report['archive_files'].append(mongo_archive)
+            except Exception as e:
+                report['errors'].append(f'MongoDB: {e}')
+
+    report['auto_vacuum_incremental'] = auto_vacuum_incremental(conn)
+    reclaim_space(conn)
+    report['sqlite_bytes_after'] = database_bytes(conn)
+    report['bytes_reclaimed'] = report['sqlite_bytes_before'] - report['sqlite_bytes_after']
+    conn.close()
+
+    if screening_archive is not None:
+        try:
+            report['archive_segments_compacted'] = screening_archive.compact()
+        except Exception as e:
+            report['errors'].append(f'Analytics archive: {e}')
+
+    report['duration_seconds'] = round((datetime.now(timezone.utc) - started).total_seconds(), 2)
+    metrics.increment('maintenance.runs')
+    metrics.increment('maintenance.rows_archived', report['sqlite_rows_archived'] + report['mongo_rows_archived'])
+    return report
+
+
+class MaintenanceScheduler:
+    """Runs a maintenance function every ``interval_hours`` on a daemon thread"""
+
+    def __init__(self, run_fn, interval_hours):
+        self.run_fn = run_fn
+        self.interval = interval_hours * 3600
+        self.last_report = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        """Start the schedule once per process; False when disabled or already running"""
+        if self.interval <= 0 or self._pid == os.getpid():
+            return False
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return False
+            self._thread = threading.Thread(target=self._loop, name='hemoscan-maintenance', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+        return True
+
+    @property
+    def running(self):
+        return self._lock.locked()
+
+    def run_once(self):
+        """One pass, skipped (returns None) if another pass is already running"""
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            self.last_report = self.run_fn()
+        except Exception as e:
+            self.last_report = {'errors': [str(e)], 'started_at': datetime.utcnow().isoformat()}
+        finally:
+            self._lock.release()
+        print(f"Maintenance: {self.last_report}")
+        return self.last_report
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            self.run_once()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Archive expired screenings and reclaim storage')
+    parser.add_argument('--retention-days', type=int, default=Config.RETENTION_DAYS)
+    parser.add_argument('--skip-mongo', action='store_true')
+    parser.add_argument('--convert-auto-vacuum', action='store_true',
+                        help='one-time full VACUUM to enable incremental space reclaim, then exit')
+    args = parser.parse_args()
+
+    if args.convert_auto_vacuum:
+        print(json.dumps(convert_auto_vacuum(), indent=2))
+    else:
+        from archive import ColumnarArchive
+        mongo_db = None
+        if not args.skip_mongo:
+            from database import Database
+            mongo_db = Database.get_db()
+        report = run_maintenance(args.retention_days, mongo_db=mongo_db,
+                                 screening_archive=ColumnarArchive(Config.ARCHIVE_DIR))
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,45 @@
+"""
+In-process metrics for HemoScan AI
+Thread-safe counters and gauges, exposed as JSON on /metrics
+"""
+
+import threading
+import time
+
+
+class Metrics:
+    """Named counters plus gauges computed on read"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._started = time.time()
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def register_gauge(self, name, fn):
+        """fn() is called on every snapshot and must be cheap"""
+        with self._lock:
+            self._gauges[name] = fn
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        values = {}
+        for name, fn in gauges.items():
+            try:
+                values[name] = fn()
+            except Exception as e:
+                values[name] = f'error: {e}'
+        return {
+            'uptime_seconds': round(time.time() - self._started, 1),
+            'counters': dict(sorted(counters.items())),
+            'gauges': dict(sorted(values.items()))
+        }
+
+
+metrics = Metrics()
@@ -0,0 +1,126 @@
+"""
+Response assembly for HemoScan AI
+The /predict recommendation lists and factor labels depend on a handful of inputs, so
+they are built and JSON-encoded once when the model loads. Responses are assembled
+from those pre-encoded fragments, and the JSON endpoints are encoded with orjson.
+"""
+
+import json
+from datetime import date
+import numpy as np
+from flask import Response
+from werkzeug.http import http_date
+from scoring import FEATURE_COLUMNS, RISK_LEVELS, SYMPTOMS
+
+try:
+    import orjson
+except ImportError:  # in requirements.txt; fall back to the standard library encoder if missing
+    orjson = None
+
+FACTOR_LABELS = {
+    'age': 'Age',
+    'gender': 'Gender',
+    'hemoglobin': 'Hemoglobin Level',
+    'diet': 'Diet Quality',
+    'fatigue': 'Fatigue',
+    'dizziness': 'Dizziness',
+    'pale_skin': 'Pale Skin',
+    'weakness': 'Weakness',
+    'shortness_breath': 'Shortness of Breath'
+}
+
+
+def _default(value):
+    # Same representations as Flask's JSON provider, so switching encoders changes no payload
+    if isinstance(value, date):
+        return http_date(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(obj):
+    """Compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default,
+                            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(body, status=200):
+    """Flask response for an object or already-encoded JSON bytes"""
+    if not isinstance(body, bytes):
+        body = dumps(body)
+    return Response(body, status=status, mimetype='application/json')
+
+
+class EncodedList(list):
+    """List whose JSON encoding is computed once and reused by every response"""
+
+    def __init__(self, items):
+        super().__init__(items)
+        self.encoded = dumps(list(items))
+
+
+def recommendation_key(risk_level, features):
+    """The only inputs get_recommendations() looks at"""
+    return (
+        risk_level,
+        features.get('hemoglobin', 0) < 12,
+        features.get('diet', 1) == 0,
+        sum(features.get(symptom, 0) for symptom in SYMPTOMS) >= 3
+    )
+
+
+def build_recommendation_table(recommend):
+    """Pre-encoded recommendations for every key (3 risk levels x 8 flag combinations)
+
+    recommend(risk_level, probability, features) is called once per key with a
+    representative feature dict, so the lists stay defined in one place.
+    """
+    table = {}
+    for risk_level in RISK_LEVELS:
+        for low_hemoglobin in (False, True):
+            for poor_diet in (False, True):
+                for many_symptoms in (False, True):
+                    features = {
+                        'hemoglobin': 11.0 if low_hemoglobin else 12.0,
+                        'diet': 0 if poor_diet else 1,
+                        **{symptom: int(many_symptoms and i < 3) for i, symptom in enumerate(SYMPTOMS)}
+                    }
+                    key = (risk_level, low_hemoglobin, poor_diet, many_symptoms)
+                    table[key] = EncodedList(recommend(risk_level, None, features))
+    return table
+
+
+# '{"factor":"<label>","importance":' for every feature, keyed by label
+_FACTOR_PREFIXES = {
+    FACTOR_LABELS.get(feature, feature): dumps({'factor': FACTOR_LABELS.get(feature, feature)})[:-1] + b',"importance":'
+    for feature in FEATURE_COLUMNS
+}
+_RISK_LEVEL_FRAGMENTS = {level: dumps(level) for level in RISK_LEVELS}
+
+
+def _number(value):
+    return float.__repr__(float(value)).encode('ascii')
+
+
+def encode_prediction(result):
+    """JSON bytes for a run_prediction() result, joined from pre-encoded fragments"""
+    factors = b','.join(
+        _FACTOR_PREFIXES[f['factor']] + _number(f['importance']) + b'}'
+        if f['factor'] in _FACTOR_PREFIXES else dumps(f)
+        for f in result['top_factors']
+    )
+    recommendations = result['recommendations']
+    return b''.join([
+        b'{"risk_level":', _RISK_LEVEL_FRAGMENTS.get(result['risk_level']) or dumps(result['risk_level']),
+        b',"risk_score":', _number(result['risk_score']),
+        b',"probability":', _number(result['probability']),
+        b',"top_factors":[', factors,
+        b'],"recommendations":',
+        recommendations.encoded if isinstance(recommendations, EncodedList) else dumps(recommendations),
+        b'}'
+    ])
@@ -0,0 +1,132 @@
+"""
+Shared scoring helpers for HemoScan AI
+Feature encoding and the clinical adjustment rules, vectorized over many rows
+"""
+
+import numpy as np
+
+SYMPTOMS = ['fatigue', 'dizziness', 'pale_skin', 'weakness', 'shortness_breath']
+FEATURE_COLUMNS = ['age', 'gender', 'hemoglobin', 'diet'] + SYMPTOMS + ['symptom_count']
+DIET_MAP = {'poor': 0, 'moderate': 1, 'good': 2}
+RISK_LEVELS = ['Low', 'Moderate', 'High']
+RISK_THRESHOLDS = [0.25, 0.65]  # probability cut points between the risk levels
+
+# Hemoglobin assumed in rural mode when no test result is available
+RURAL_HEMOGLOBIN_ESTIMATE = 12.0
+
+# Parameters of adjust_probabilities(), exported with the model for the NumPy runtime
+ADJUSTMENT_RULES = {
+    'hb_threshold_female': 12.0,  # WHO thresholds in g/dL
+    'hb_threshold_male': 13.0,
+    'anemia_weight': 0.3,
+    'normal_margin': 1.0,
+    'normal_span': 5.0,
+    'normal_weight': 0.2,
+    'many_symptoms': 4,
+    'many_symptoms_boost': 0.15,
+    'no_symptoms_reduction': 0.1
+}
+
+# Column positions in the model's feature vector (see train_model.py)
+AGE, GENDER, HEMOGLOBIN, DIET = 0, 1, 2, 3
+SYMPTOM_COUNT = 9
+
+
+def encode_gender(value):
+    """0 for female, 1 for everything else"""
+    return 0 if str(value).lower() in ['female', 'f'] else 1
+
+
+def encode_diet(value):
+    """Map diet quality to 0/1/2 (unknown values count as moderate)"""
+    return DIET_MAP.get(str(value).lower(), 1)
+
+
+def symptom_mask(symptoms_list):
+    """Bitmask of reported symptoms (bit i = SYMPTOMS[i])"""
+    return sum(1 << bit for bit, symptom in enumerate(SYMPTOMS) if symptom in symptoms_list)
+
+
+def build_feature_vector(age, gender, hemoglobin, diet, symptoms_list):
+    """Raw (unscaled) feature row in model order for one screening"""
+    flags = [1 if symptom in symptoms_list else 0 for symptom in SYMPTOMS]
+    return [age, gender, hemoglobin, diet] + flags + [sum(flags)]
+
+
+def build_feature_matrix(age, gender, hemoglobin, diet, symptom_flags):
+    """Raw feature matrix from encoded column arrays
+
+    symptom_flags is an (n, 5) array of 0/1 values in SYMPTOMS order.
+    """
+    symptom_flags = np.asarray(symptom_flags, dtype=float)
+    return np.column_stack([
+        np.asarray(age, dtype=float),
+        np.asarray(gender, dtype=float),
+        np.asarray(hemoglobin, dtype=float),
+        np.asarray(diet, dtype=float),
+        symptom_flags,
+        symptom_flags.sum(axis=1)
+    ])
+
+
+def sweep_matrix(base_row, sweeps):
+    """Raw feature grid varying one or more columns of a base row
+
+    sweeps is a list of (column_index, values); the result has one row per
+    combination (first sweep varies slowest), with symptom_count recomputed.
+    """
+    grids = np.meshgrid(*[np.asarray(values, dtype=float) for _, values in sweeps], indexing='ij')
+    matrix = np.tile(np.asarray(base_row, dtype=float), (grids[0].size, 1))
+    for (column, _), grid in zip(sweeps, grids):
+        matrix[:, column] = grid.ravel()
+    matrix[:, SYMPTOM_COUNT] = matrix[:, DIET + 1:SYMPTOM_COUNT].sum(axis=1)
+    return matrix
+
+
+def adjust_probabilities(probabilities, feature_matrix, rules=ADJUSTMENT_RULES):
+    """Apply the hemoglobin and symptom adjustment rules to model probabilities"""
+    probabilities = np.asarray(probabilities, dtype=float)
+    feature_matrix = np.asarray(feature_matrix, dtype=float)
+    gender = feature_matrix[:, GENDER]
+    hemoglobin = feature_matrix[:, HEMOGLOBIN]
+    symptom_count = feature_matrix[:, SYMPTOM_COUNT]
+
+    # WHO thresholds: 12 g/dL for women, 13 g/dL for men
+    hb_threshold = np.where(gender == 0, rules['hb_threshold_female'], rules['hb_threshold_male'])
+
+    # Adjust probability based on hemoglobin (most important factor)
+    anemic = hemoglobin < hb_threshold
+    normal_or_high = hemoglobin >= hb_threshold + rules['normal_margin']
+    probabilities = np.where(
+        anemic,
+        np.minimum(1.0, probabilities + (hb_threshold - hemoglobin) / hb_threshold * rules['anemia_weight']),
+        np.where(
+            normal_or_high,
+            np.maximum(0.0, probabilities - (hemoglobin - hb_threshold) / rules['normal_span'] * rules['normal_weight']),
+            probabilities
+        )
+    )
+
+    # Adjust based on symptom count
+    return np.where(
+        symptom_count >= rules['many_symptoms'],
+        np.minimum(1.0, probabilities + rules['many_symptoms_boost']),
+        np.where(
+            (symptom_count == 0) & (hemoglobin >= hb_threshold),
+            np.maximum(0.0, probabilities - rules['no_symptoms_reduction']),
+            probabilities
+        )
+    )
+
+
+def risk_levels(probabilities):
+    """Low below 0.25, Moderate below 0.65, High otherwise"""
+    codes = np.digitize(np.asarray(probabilities, dtype=float), RISK_THRESHOLDS)
+    return np.asarray(RISK_LEVELS, dtype=object)[codes]
+
+
+def score_matrix(model, scaler, feature_matrix):
+    """Model probabilities with adjustments applied, plus risk levels, for a raw feature matrix"""
+    raw = model.predict_proba(scaler.transform(feature_matrix))[:, 1]
+    probabilities = adjust_probabilities(raw, feature_matrix)
+    return probabilities, risk_levels(probabilities)
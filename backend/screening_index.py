@@ -0,0 +1,170 @@
+"""
+Compact screening index for HemoScan AI
+SQLite table with integer-coded gender/diet/risk, symptoms as a bitmask and covering
+indexes, so admin filter searches never scan or string-match the legacy TEXT columns.
+"""
+
+from datetime import datetime, timezone
+from scoring import SYMPTOMS, DIET_MAP, RISK_LEVELS, encode_gender, encode_diet, symptom_mask
+
+GENDER_LABELS = ['Female', 'Male']
+DIET_LABELS = sorted(DIET_MAP, key=DIET_MAP.get)
+SCHEMA_VERSION = 1  # PRAGMA user_version once existing rows have been migrated
+
+SEARCH_COLUMNS = ['id', 'ts', 'age', 'gender_code', 'hemoglobin', 'diet_code',
+                  'symptom_mask', 'risk_code', 'probability']
+
+
+def init_screening_index(conn):
+    """Create the compact table and indexes, migrating legacy rows once"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS screening_index (
+            id INTEGER PRIMARY KEY,          -- same id as screenings.id
+            ts INTEGER NOT NULL,             -- UTC epoch seconds
+            age INTEGER,
+            gender_code INTEGER,             -- 0 female, 1 male
+            hemoglobin REAL,
+            diet_code INTEGER,               -- 0 poor, 1 moderate, 2 good
+            symptom_mask INTEGER,            -- bit i = SYMPTOMS[i]
+            risk_code INTEGER,               -- 0 Low, 1 Moderate, 2 High
+            probability REAL
+        )
+    ''')
+    # Covering indexes: the filter columns plus symptom_mask, so filtering runs on the index alone
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_screening_index_risk_ts
+        ON screening_index (risk_code, ts, gender_code, age, symptom_mask)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_screening_index_gender_age
+        ON screening_index (gender_code, age, risk_code, ts, symptom_mask)
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_screening_index_ts ON screening_index (ts)')
+
+    if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+        migrated = migrate_legacy_rows(conn)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        print(f"Migrated {migrated} screening(s) to the compact index")
+    conn.commit()
+
+
+def migrate_legacy_rows(conn):
+    """One-time copy of legacy TEXT rows, encoded in SQL so it runs in a single statement"""
+    mask_sql = ' + '.join(
+        f"((instr(',' || IFNULL(symptoms, '') || ',', ',{symptom},') > 0) << {bit})"
+        for bit, symptom in enumerate(SYMPTOMS)
+    )
+    diet_sql = ' '.join(f"WHEN '{name}' THEN {code}" for name, code in DIET_MAP.items())
+    risk_sql = ' '.join(f"WHEN '{name}' THEN {code}" for code, name in enumerate(RISK_LEVELS))
+    cursor = conn.execute(f'''
+        INSERT OR IGNORE INTO screening_index
+            (id, ts, age, gender_code, hemoglobin, diet_code, symptom_mask, risk_code, probability)
+        SELECT
+            id,
+            CAST(strftime('%s', timestamp, 'utc') AS INTEGER),
+            age,
+            CASE WHEN lower(gender) IN ('female', 'f') THEN 0 ELSE 1 END,
+            hemoglobin,
+            CASE lower(diet) {diet_sql} ELSE 1 END,
+            {mask_sql},
+            CASE risk_level {risk_sql} ELSE NULL END,
+            probability
+        FROM screenings
+    ''')
+    return cursor.rowcount
+
+
+def insert_screening_index(cursor, screening_id, screening, timestamp):
+    """Add the compact row for a screening (call in the same transaction as the legacy insert)"""
+    ts = datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp()
+    cursor.execute('''
+        INSERT INTO screening_index
+            (id, ts, age, gender_code, hemoglobin, diet_code, symptom_mask, risk_code, probability)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        screening_id,
+        int(ts),
+        screening['age'],
+        encode_gender(screening['gender']),
+        screening['hemoglobin'],
+        encode_diet(screening['diet']),
+        symptom_mask(screening['symptoms']),
+        RISK_LEVELS.index(screening['risk_level']),
+        screening['probability']
+    ))
+
+
+def _epoch(value):
+    """ISO date or datetime (UTC) to epoch seconds"""
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp())
+
+
+def build_search_query(filters, limit, cursor=None):
+    """SQL and parameters for a filtered, keyset-paginated search (newest first)
+
+    filters: risk_levels, gender, diet, symptoms (all must be present),
+    min_age, max_age, since, until. cursor is the (ts, id) of the last row
+    of the previous page.
+    """
+    conditions, params = [], []
+    if filters.get('risk_levels'):
+        conditions.append(f"risk_code IN ({', '.join('?' * len(filters['risk_levels']))})")
+        params.extend(RISK_LEVELS.index(level) for level in filters['risk_levels'])
+    if filters.get('gender') is not None:
+        conditions.append('gender_code = ?')
+        params.append(encode_gender(filters['gender']))
+    if filters.get('diet') is not None:
+        conditions.append('diet_code = ?')
+        params.append(encode_diet(filters['diet']))
+    if filters.get('symptoms'):
+        mask = symptom_mask(filters['symptoms'])
+        conditions.append('(symptom_mask & ?) = ?')
+        params.extend([mask, mask])
+    if filters.get('min_age') is not None:
+        conditions.append('age >= ?')
+        params.append(int(filters['min_age']))
+    if filters.get('max_age') is not None:
+        conditions.append('age <= ?')
+        params.append(int(filters['max_age']))
+    if filters.get('since'):
+        conditions.append('ts >= ?')
+        params.append(_epoch(filters['since']))
+    if filters.get('until'):
+        conditions.append('ts < ?')
+        params.append(_epoch(filters['until']))
+    if cursor:
+        conditions.append('(ts < ? OR (ts = ? AND id < ?))')
+        params.extend([cursor[0], cursor[0], cursor[1]])
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    sql = f'''
+        SELECT {', '.join(SEARCH_COLUMNS)}
+        FROM screening_index
+        {where}
+        ORDER BY ts DESC, id DESC
+        LIMIT ?
+    '''
+    return sql, params + [limit]
+
+
+def search_screenings(conn, filters, limit=50, cursor=None):
+    """One page of matching screenings plus the cursor for the next page"""
+    sql, params = build_search_query(filters, limit + 1, cursor)
+    rows = conn.execute(sql, params).fetchall()
+    page = rows[:limit]
+
+    results = []
+    for id_, ts, age, gender_code, hemoglobin, diet_code, mask, risk_code, probability in page:
+        results.append({
+            'id': id_,
+            'timestamp': datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None).isoformat(),
+            'age': age,
+            'gender': GENDER_LABELS[gender_code],
+            'hemoglobin': hemoglobin,
+            'diet': DIET_LABELS[diet_code],
+            'symptoms': [s for bit, s in enumerate(SYMPTOMS) if mask & (1 << bit)],
+            'risk_level': RISK_LEVELS[risk_code] if risk_code is not None else None,
+            'risk_score': round(probability * 100, 2) if probability is not None else None
+        })
+    next_cursor = f'{page[-1][1]}:{page[-1][0]}' if len(rows) > limit else None
+    return results, next_cursor
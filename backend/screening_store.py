@@ -0,0 +1,239 @@
+"""
+Screening outbox for HemoScan AI
+A screening is committed once, locally: the SQLite row, its index row and an outbox
+entry share one transaction. A background replicator ships outbox entries to the
+MongoDB screenings collection in bulk, with retries, a checkpoint and a lag metric,
+so the two stores converge instead of silently drifting apart.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from metrics import metrics
+
+DB_PATH = 'hemoscan.db'
+DUPLICATE_KEY = 11000
+CHECKPOINT_TARGET = 'mongo.screenings'
+
+
+def init_outbox(conn):
+    """Create the outbox and the replication checkpoint tables"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS screening_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            doc_id TEXT NOT NULL,            -- MongoDB _id, fixed at commit so retries are idempotent
+            user_id TEXT NOT NULL,
+            document TEXT NOT NULL,          -- screening fields and timestamp as JSON
+            created_at REAL NOT NULL,        -- epoch seconds, for the lag metric
+            attempts INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_screening_outbox_user ON screening_outbox (user_id)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS replication_checkpoint (
+            target TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL,        -- highest outbox id known to be in the target
+            replicated INTEGER NOT NULL,     -- documents shipped so far
+            updated_at REAL NOT NULL
+        )
+    ''')
+    conn.commit()
+
+
+def enqueue_screening(cursor, user_id, screening, timestamp):
+    """Add the outbox entry for a screening (call in the same transaction as the local insert)"""
+    doc_id = str(ObjectId())
+    cursor.execute('''
+        INSERT INTO screening_outbox (doc_id, user_id, document, created_at)
+        VALUES (?, ?, ?, ?)
+    ''', (doc_id, str(user_id), json.dumps({**screening, 'timestamp': timestamp}), time.time()))
+    return doc_id
+
+
+def outbox_document(doc_id, user_id, document):
+    """MongoDB document for an outbox entry"""
+    return {'_id': ObjectId(doc_id), 'user_id': ObjectId(user_id), **json.loads(document)}
+
+
+def pending_documents(user_id, db_path=DB_PATH):
+    """A user's screenings committed locally but not yet replicated (read-your-writes)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            'SELECT doc_id, user_id, document FROM screening_outbox WHERE user_id = ? ORDER BY id',
+            (str(user_id),)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [outbox_document(*row) for row in rows]
+
+
+def pending_marker(user_id, db_path=DB_PATH):
+    """(count, newest outbox id) of a user's unreplicated screenings, for cache validators"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            'SELECT COUNT(*), MAX(id) FROM screening_outbox WHERE user_id = ?', (str(user_id),)
+        ).fetchone()
+    finally:
+        conn.close()
+
+
+def merge_pending(documents, pending):
+    """Replicated documents plus pending ones not yet in MongoDB, newest first"""
+    replicated = {doc['_id'] for doc in documents}
+    merged = documents + [doc for doc in pending if doc['_id'] not in replicated]
+    return sorted(merged, key=lambda doc: doc.get('timestamp') or '', reverse=True)
+
+
+class OutboxReplicator:
+    """Background thread shipping outbox entries to MongoDB
+
+    Each pass inserts up to batch_size documents with one unordered
+    insert_many, then advances the checkpoint and deletes the shipped entries
+    in one SQLite transaction. Documents carry their _id from the outbox, so a
+    pass retried after a crash skips the duplicates instead of doubling them.
+    Failures back off exponentially up to max_backoff seconds.
+    """
+
+    def __init__(self, get_db, db_path=DB_PATH, batch_size=500, interval_ms=200, max_backoff=60):
+        self.get_db = get_db
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.interval = interval_ms / 1000
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.last_error = None
+        self.last_success_at = None
+        self._wake = threading.Event()
+        self._pass_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._indexes_ready = False
+        metrics.register_gauge('replication', self.status)
+
+    def start(self):
+        """Start the thread once per process (a forked worker does not inherit the parent's thread)"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, name='hemoscan-replicator', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def notify(self):
+        """Wake the replicator after a commit, starting it on first use however the server was launched"""
+        self.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            delay = self.interval
+            try:
+                # Keep going while full batches come back, so a backlog drains quickly
+                while self.replicate_once() == self.batch_size:
+                    pass
+            except Exception:
+                delay = min(self.max_backoff, self.interval * 2 ** min(self.failures, 16))
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def _ensure_indexes(self, collection):
+        if not self._indexes_ready:
+            collection.create_index('user_id')
+            collection.create_index('timestamp')
+            collection.create_index([('user_id', 1), ('timestamp', -1)])
+            self._indexes_ready = True
+
+    def replicate_once(self):
+        """Ship one batch; returns the number of entries replicated"""
+        with self._pass_lock:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                rows = conn.execute(
+                    'SELECT id, doc_id, user_id, document FROM screening_outbox ORDER BY id LIMIT ?',
+                    (self.batch_size,)
+                ).fetchall()
+                if not rows:
+                    return 0
+
+                try:
+                    collection = self.get_db().screenings
+                    self._ensure_indexes(collection)
+                    collection.insert_many([outbox_document(*row[1:]) for row in rows], ordered=False)
+                except BulkWriteError as e:
+                    # Documents already shipped by an interrupted pass are fine; anything else is retried
+                    errors = [err for err in e.details.get('writeErrors', []) if err.get('code') != DUPLICATE_KEY]
+                    if errors:
+                        self._failed(conn, rows, errors[0].get('errmsg'))
+                        raise
+                except Exception as e:
+                    self._failed(conn, rows, str(e))
+                    raise
+
+                ids = [row[0] for row in rows]
+                placeholders = ', '.join('?' * len(ids))
+                with conn:
+                    conn.execute('''
+                        INSERT INTO replication_checkpoint (target, last_id, replicated, updated_at)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT(target) DO UPDATE SET
+                            last_id = excluded.last_id,
+                            replicated = replicated + excluded.replicated,
+                            updated_at = excluded.updated_at
+                    ''', (CHECKPOINT_TARGET, ids[-1], len(ids), time.time()))
+                    conn.execute(f'DELETE FROM screening_outbox WHERE id IN ({placeholders})', ids)
+                self.failures = 0
+                self.last_error = None
+                self.last_success_at = time.time()
+                metrics.increment('replication.shipped', len(ids))
+                return len(ids)
+            finally:
+                conn.close()
+
+    def _failed(self, conn, rows, error):
+        self.failures += 1
+        self.last_error = error
+        metrics.increment('replication.failures')
+        ids = [row[0] for row in rows]
+        with conn:
+            conn.execute(
+                f"UPDATE screening_outbox SET attempts = attempts + 1 WHERE id IN ({', '.join('?' * len(ids))})", ids
+            )
+        print(f"Warning: Could not replicate screenings to MongoDB (attempt {self.failures}): {error}")
+
+    def status(self):
+        """Backlog size, replication lag and checkpoint"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            pending, oldest, max_attempts = conn.execute(
+                'SELECT COUNT(*), MIN(created_at), MAX(attempts) FROM screening_outbox'
+            ).fetchone()
+            checkpoint = conn.execute(
+                'SELECT last_id, replicated, updated_at FROM replication_checkpoint WHERE target = ?',
+                (CHECKPOINT_TARGET,)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return {'running': self._thread is not None, 'pending': None}
+        finally:
+            conn.close()
+        return {
+            'running': self._thread is not None,
+            'pending': pending,
+            'lag_seconds': round(time.time() - oldest, 3) if oldest else 0.0,
+            'max_attempts': max_attempts or 0,
+            'consecutive_failures': self.failures,
+            'last_error': self.last_error,
+            'last_success_at': self.last_success_at,
+            'checkpoint': {
+                'last_id': checkpoint[0],
+                'replicated': checkpoint[1],
+                'updated_at': checkpoint[2]
+            } if checkpoint else None
+        }
@@ -0,0 +1,159 @@
+"""
+Shadow evaluation for HemoScan AI
+Copies a sample of live /predict feature vectors into a bounded queue and scores them
+with a candidate model on a background thread, off the response path, comparing risk
+levels and latency with the serving model (whose latency is measured on the request path)
+"""
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+import joblib
+import numpy as np
+from scoring import FEATURE_COLUMNS, RISK_LEVELS, RISK_THRESHOLDS, adjust_probabilities
+from metrics import metrics
+
+
+class ShadowEvaluator:
+    """Candidate bundle plus running comparison statistics
+
+    offer() is the only call on the request path: a random draw and a
+    non-blocking put. A full queue drops the sample rather than waiting.
+    """
+
+    def __init__(self, candidate_dir, sample_rate=0.1, queue_size=1000, batch_size=64):
+        self.candidate_dir = candidate_dir
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.bundle = None
+        self.metadata = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.reset()
+        metrics.register_gauge('shadow.queue', self.queue.qsize)
+
+    def reset(self):
+        with self._lock:
+            self.compared = 0
+            self.dropped = 0
+            self.agree = 0
+            self.abs_diff_sum = 0.0
+            self.confusion = np.zeros((len(RISK_LEVELS), len(RISK_LEVELS)), dtype=int)
+            # Bounded histories for the percentiles; the two measure different things (see report())
+            self.primary_request_ms = deque(maxlen=1000)
+            self.candidate_row_ms = deque(maxlen=1000)
+            self.started_at = time.time()
+
+    def load(self):
+        """Load (or replace) the candidate bundle; False when no candidate is published"""
+        model_path = os.path.join(self.candidate_dir, 'model.pkl')
+        if not os.path.exists(model_path):
+            self.bundle = None
+            return False
+
+        names_path = os.path.join(self.candidate_dir, 'feature_names.pkl')
+        if os.path.exists(names_path) and list(joblib.load(names_path)) != FEATURE_COLUMNS:
+            raise ValueError('Candidate model was trained on different features')
+        bundle = (joblib.load(model_path), joblib.load(os.path.join(self.candidate_dir, 'scaler.pkl')))
+        metadata = {}
+        metadata_path = os.path.join(self.candidate_dir, 'model_metadata.json')
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+
+        self.bundle, self.metadata = bundle, metadata
+        self.reset()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, name='hemoscan-shadow', daemon=True)
+            self._thread.start()
+        return True
+
+    def offer(self, feature_vector, primary_probability, primary_ms):
+        """Sample a live prediction and its serving model latency for shadow scoring (never blocks)"""
+        if self.bundle is None or random.random() >= self.sample_rate:
+            return
+        try:
+            self.queue.put_nowait((feature_vector, primary_probability, primary_ms))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _worker(self):
+        while True:
+            items = [self.queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._compare(items)
+            except Exception as e:
+                print(f"Warning: Shadow scoring failed: {e}")
+
+    def _compare(self, items):
+        bundle = self.bundle
+        if bundle is None:
+            return
+        candidate_model, candidate_scaler = bundle
+        X = np.array([vector for vector, _, _ in items], dtype=float)
+        primary = np.array([probability for _, probability, _ in items])
+
+        # Only the candidate is timed here; the serving model was timed when it answered the request
+        start = time.perf_counter()
+        candidate_raw = candidate_model.predict_proba(candidate_scaler.transform(X))[:, 1]
+        candidate_ms = (time.perf_counter() - start) * 1000 / len(items)
+
+        candidate = adjust_probabilities(candidate_raw, X)
+        primary_codes = np.digitize(primary, RISK_THRESHOLDS)
+        candidate_codes = np.digitize(candidate, RISK_THRESHOLDS)
+        with self._lock:
+            self.compared += len(items)
+            self.agree += int((primary_codes == candidate_codes).sum())
+            self.abs_diff_sum += float(np.abs(primary - candidate).sum())
+            np.add.at(self.confusion, (primary_codes, candidate_codes), 1)
+            self.primary_request_ms.extend(ms for _, _, ms in items)
+            self.candidate_row_ms.append(candidate_ms)
+        metrics.increment('shadow.compared', len(items))
+
+    def report(self):
+        with self._lock:
+            compared = self.compared
+
+            def latency(samples):
+                if not samples:
+                    return None
+                return {
+                    'mean': round(float(np.mean(samples)), 4),
+                    'p95': round(float(np.percentile(samples, 95)), 4)
+                }
+
+            return {
+                'enabled': self.bundle is not None,
+                'candidate_version': self.metadata.get('version'),
+                'candidate_type': self.metadata.get('model_type'),
+                'sample_rate': self.sample_rate,
+                'window_seconds': round(time.time() - self.started_at, 1),
+                'compared': compared,
+                'dropped': self.dropped,
+                'queued': self.queue.qsize(),
+                'agreement_rate': round(self.agree / compared, 4) if compared else None,
+                'mean_abs_probability_diff': round(self.abs_diff_sum / compared, 4) if compared else None,
+                'confusion': {
+                    'rows': 'serving model risk level',
+                    'columns': 'candidate risk level',
+                    'labels': RISK_LEVELS,
+                    'matrix': self.confusion.tolist()
+                },
+                'latency': {
+                    # Serving model call on the request path, including batching window and queueing
+                    'primary_request_ms': latency(self.primary_request_ms),
+                    # Candidate's background batch time divided by the rows in the batch
+                    'candidate_row_ms': latency(self.candidate_row_ms)
+                }
+            }
@@ -0,0 +1,158 @@
+"""
+Population-scale risk simulation for HemoScan AI
+Generates a synthetic population with a district's demographic mix in chunks, scores
+each chunk with the serving model (INFERENCE_RUNTIME) plus the adjustment rules on a
+process pool, and streams the per-chunk risk counts and histograms into one running total.
+
+Usage: python simulate_population.py --population 5000000 --female-share 0.51 \
+           --anemia-prevalence 0.35 --diet-mix 0.4,0.4,0.2
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import joblib
+import numpy as np
+from config import Config
+from hemoscan_runtime import Runtime
+from scoring import FEATURE_COLUMNS, RISK_LEVELS, RISK_THRESHOLDS, GENDER, AGE, HEMOGLOBIN, score_matrix
+from train_model import generate_synthetic_data
+
+MODEL_PATH = 'models/model.pkl'
+SCALER_PATH = 'models/scaler.pkl'
+RUNTIME_EXPORT_PATH = 'models/model.npz'
+
+AGE_GROUPS = ['18-30', '31-45', '46-60', '61+']
+AGE_GROUP_EDGES = [30, 45, 60]  # same bins as the admin dashboard
+HEMOGLOBIN_EDGES = np.arange(5, 18.5, 0.5)
+
+# Per-process model cache so each pool worker unpickles the model only once
+_worker_bundle = None
+
+
+def _load_worker_bundle(model_path, scaler_path):
+    global _worker_bundle
+    if _worker_bundle is None:
+        # Same INFERENCE_RUNTIME selection as /predict and the batch jobs
+        if Config.INFERENCE_RUNTIME == 'numpy':
+            runtime = Runtime.load(RUNTIME_EXPORT_PATH)
+            _worker_bundle = (runtime.model, runtime.scaler)
+        else:
+            _worker_bundle = (joblib.load(model_path), joblib.load(scaler_path))
+    return _worker_bundle
+
+
+def simulate_chunk(chunk_index, size, params, probability_bins, model_path=MODEL_PATH, scaler_path=SCALER_PATH):
+    """Generate and score one chunk; returns only fixed-size count arrays"""
+    model, scaler = _load_worker_bundle(model_path, scaler_path)
+    # Distinct seed per chunk so the result is reproducible for a given --seed and --chunk-size
+    df = generate_synthetic_data(size, seed=params['seed'] + chunk_index, **{
+        k: v for k, v in params.items() if k != 'seed'
+    })
+    features = df[FEATURE_COLUMNS].astype(float)  # keeps column names for the fitted scaler
+    probabilities, _ = score_matrix(model, scaler, features)
+    X = features.to_numpy()
+    codes = np.digitize(probabilities, RISK_THRESHOLDS)
+    age_groups = np.digitize(X[:, AGE], AGE_GROUP_EDGES, right=True)
+    gender = X[:, GENDER].astype(int)
+
+    return {
+        'rows': size,
+        'risk_counts': np.bincount(codes, minlength=len(RISK_LEVELS)),
+        'probability_sum': float(probabilities.sum()),
+        'probability_histogram': np.histogram(probabilities, bins=probability_bins, range=(0, 1))[0],
+        'hemoglobin_histogram': np.histogram(np.clip(X[:, HEMOGLOBIN], 5, 18), bins=HEMOGLOBIN_EDGES)[0],
+        'by_gender': np.bincount(gender * len(RISK_LEVELS) + codes, minlength=2 * len(RISK_LEVELS)),
+        'by_age_group': np.bincount(age_groups * len(RISK_LEVELS) + codes,
+                                    minlength=len(AGE_GROUPS) * len(RISK_LEVELS))
+    }
+
+
+def simulate_population(population, params, chunk_size=200000, workers=None, probability_bins=20):
+    """Run the simulation and return the combined report"""
+    workers = workers or os.cpu_count() or 1
+    chunks = [min(chunk_size, population - start) for start in range(0, population, chunk_size)]
+    totals = None
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        # At most two chunks per worker in flight: memory stays flat however large the population
+        pending, next_chunk = set(), 0
+        while next_chunk < len(chunks) or pending:
+            while next_chunk < len(chunks) and len(pending) < 2 * workers:
+                pending.add(pool.submit(simulate_chunk, next_chunk, chunks[next_chunk], params, probability_bins))
+                next_chunk += 1
+            done = next(as_completed(pending))
+            pending.remove(done)
+            result = done.result()
+            totals = result if totals is None else {k: totals[k] + result[k] for k in totals}
+
+    elapsed = time.perf_counter() - start
+    risk_counts = totals['risk_counts']
+    n_levels = len(RISK_LEVELS)
+    return {
+        'population': population,
+        'parameters': params,
+        'risk_counts': dict(zip(RISK_LEVELS, risk_counts.tolist())),
+        'risk_shares': dict(zip(RISK_LEVELS, (risk_counts / population).round(4).tolist())),
+        'mean_probability': round(totals['probability_sum'] / population, 4),
+        'by_gender': {
+            label: dict(zip(RISK_LEVELS, totals['by_gender'][g * n_levels:(g + 1) * n_levels].tolist()))
+            for g, label in enumerate(['Female', 'Male'])
+        },
+        'by_age_group': {
+            label: dict(zip(RISK_LEVELS, totals['by_age_group'][a * n_levels:(a + 1) * n_levels].tolist()))
+            for a, label in enumerate(AGE_GROUPS)
+        },
+        'probability_histogram': {
+            'edges': np.linspace(0, 1, probability_bins + 1).round(4).tolist(),
+            'counts': totals['probability_histogram'].tolist()
+        },
+        'hemoglobin_histogram': {
+            'edges': HEMOGLOBIN_EDGES.tolist(),
+            'counts': totals['hemoglobin_histogram'].tolist()
+        },
+        'chunks': len(chunks),
+        'workers': workers,
+        'seconds': round(elapsed, 2),
+        'rows_per_second': round(population / elapsed)
+    }
+
+
+def _fractions(value):
+    return tuple(float(v) for v in value.split(','))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--population', type=int, default=1000000)
+    parser.add_argument('--chunk-size', type=int, default=200000)
+    parser.add_argument('--workers', type=int, default=None, help='default: CPU count')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--min-age', type=int, default=18)
+    parser.add_argument('--max-age', type=int, default=80, help='exclusive')
+    parser.add_argument('--female-share', type=float, default=None)
+    parser.add_argument('--anemia-prevalence', type=float, default=0.3)
+    parser.add_argument('--anemia-severity', type=_fractions, default=(0.4, 0.3, 0.2, 0.1),
+                        help='normal,mild,moderate,severe shares among the anemic')
+    parser.add_argument('--diet-mix', type=_fractions, default=(0.25, 0.45, 0.30), help='poor,moderate,good shares')
+    parser.add_argument('--bins', type=int, default=20, help='probability histogram bins')
+    parser.add_argument('--output', help='also write the report to this JSON file')
+    args = parser.parse_args()
+
+    params = {
+        'seed': args.seed,
+        'age_range': (args.min_age, args.max_age),
+        'female_share': args.female_share,
+        'anemia_prevalence': args.anemia_prevalence,
+        'anemia_severity': args.anemia_severity,
+        'diet_mix': args.diet_mix
+    }
+    report = simulate_population(args.population, params, args.chunk_size, args.workers, args.bins)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
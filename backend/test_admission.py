@@ -0,0 +1,126 @@
+"""
+Admission control: 503 + Retry-After, queue deadlines, priority shedding and the async gate
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from flask import Flask
+from admission import AdmissionController, AdmissionRejected
+
+
+def controller(limit=1, max_queue=0, queue_timeout=1.0, retry_after=7):
+    # Class names differ from the app's so the metrics gauges stay pointed at the real gates
+    return AdmissionController([
+        ('t_high', {'limit': limit, 'max_queue': max_queue, 'queue_timeout': queue_timeout}),
+        ('t_low', {'limit': limit, 'max_queue': max_queue, 'queue_timeout': queue_timeout})
+    ], retry_after=retry_after)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def test_full_queue_returns_503_with_retry_after():
+    admission = controller(limit=1, max_queue=0)
+    app = Flask(__name__)
+
+    @app.route('/work')
+    @admission.limit('t_high')
+    def work():
+        return 'ok'
+
+    admission.acquire('t_high')
+    response = app.test_client().get('/work')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '7'
+    assert admission.gates['t_high'].active == 1
+
+    admission.release('t_high')
+    assert app.test_client().get('/work').status_code == 200
+    assert admission.gates['t_high'].active == 0
+
+
+def test_queued_request_is_shed_at_its_deadline():
+    admission = controller(limit=1, max_queue=1, queue_timeout=0.05)
+    admission.acquire('t_high')
+
+    start = time.monotonic()
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire('t_high')
+    assert rejected.value.reason == 'queue_timeout'
+    assert time.monotonic() - start >= 0.05
+    assert admission.gates['t_high'].waiting == 0
+
+
+def test_queued_request_takes_the_released_slot():
+    admission = controller(limit=1, max_queue=1, queue_timeout=2.0)
+    admission.acquire('t_high')
+    threading.Timer(0.05, admission.release, args=('t_high',)).start()
+
+    admission.acquire('t_high')
+    assert admission.gates['t_high'].active == 1
+
+
+def test_lower_priority_class_is_shed_while_higher_priority_waits():
+    admission = controller(limit=1, max_queue=4, queue_timeout=2.0)
+    admission.acquire('t_high')
+    admission.acquire('t_low')
+    queued = threading.Thread(target=admission.acquire, args=('t_high',))
+    queued.start()
+    assert wait_for(lambda: admission.gates['t_high'].waiting == 1)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire('t_low')
+    assert rejected.value.reason == 'priority'
+
+    admission.release('t_high')
+    queued.join(2)
+    assert not queued.is_alive()
+
+
+def test_async_queue_timeout_frees_its_place():
+    admission = controller(limit=1, max_queue=1, queue_timeout=0.05)
+
+    async def scenario():
+        await admission.acquire_async('t_high')
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire_async('t_high')
+        return rejected.value.reason
+
+    assert asyncio.run(scenario()) == 'queue_timeout'
+    assert admission.gates['t_high'].waiting == 0
+
+
+def test_async_burst_is_not_starved_by_the_executor():
+    # The async server caps every limit at its executor size; queued requests wait on the
+    # event loop, so a burst larger than the pool drains instead of timing out
+    admission = controller(limit=16, max_queue=64, queue_timeout=0.5)
+    admission.cap_concurrency(8)
+    assert admission.gates['t_high'].limit == 8
+    executor = ThreadPoolExecutor(max_workers=8)
+
+    async def handle():
+        await admission.acquire_async('t_high')
+        try:
+            await asyncio.get_running_loop().run_in_executor(executor, time.sleep, 0.02)
+        finally:
+            admission.release('t_high')
+
+    async def burst():
+        return await asyncio.gather(*(handle() for _ in range(60)), return_exceptions=True)
+
+    try:
+        results = asyncio.run(burst())
+    finally:
+        executor.shutdown()
+    assert [r for r in results if r is not None] == []
+    assert admission.gates['t_high'].active == 0
+    assert admission.gates['t_high'].waiting == 0
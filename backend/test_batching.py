@@ -0,0 +1,87 @@
+"""
+Micro-batching: overlapping predictions are coalesced into fewer model calls
+"""
+
+import threading
+import time
+import numpy as np
+import pytest
+from inference import BatchScheduler
+
+
+class RecordingModel:
+    """Sums each row; records the batch sizes it was called with"""
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.batch_sizes = []
+        self._lock = threading.Lock()
+
+    def __call__(self, rows):
+        with self._lock:
+            self.batch_sizes.append(len(rows))
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return rows.sum(axis=1)
+
+
+def predict_concurrently(scheduler, rows):
+    barrier = threading.Barrier(len(rows))
+    results, errors = [None] * len(rows), []
+
+    def call(i):
+        barrier.wait()
+        try:
+            results[i] = scheduler.predict(rows[i])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(rows))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return results, errors
+
+
+def test_single_request_is_scored_directly():
+    model = RecordingModel()
+    scheduler = BatchScheduler(model, window_ms=2, max_batch=8)
+    assert scheduler.predict([1.0, 2.0]) == pytest.approx(3.0)
+    stats = scheduler.stats()
+    assert stats['direct_calls'] == 1
+    assert stats['batches'] == 0
+
+
+def test_overlapping_requests_are_coalesced():
+    model = RecordingModel(delay=0.05)
+    scheduler = BatchScheduler(model, window_ms=20, max_batch=64)
+    rows = [np.array([float(i), 1.0]) for i in range(20)]
+
+    results, errors = predict_concurrently(scheduler, rows)
+
+    assert errors == []
+    assert results == [pytest.approx(i + 1.0) for i in range(20)]
+    assert len(model.batch_sizes) < len(rows)
+    stats = scheduler.stats()
+    assert stats['max_batch_seen'] > 1
+    assert stats['direct_calls'] + stats['batched_rows'] == len(rows)
+    assert stats['in_flight'] == 0
+
+
+def test_batch_respects_max_batch():
+    model = RecordingModel(delay=0.05)
+    scheduler = BatchScheduler(model, window_ms=50, max_batch=4)
+    predict_concurrently(scheduler, [np.ones(2)] * 16)
+    assert max(model.batch_sizes) <= 4
+
+
+def test_model_error_reaches_every_batched_caller():
+    model = RecordingModel(delay=0.05, error=ValueError('bad batch'))
+    scheduler = BatchScheduler(model, window_ms=20, max_batch=64)
+    results, errors = predict_concurrently(scheduler, [np.ones(2)] * 8)
+    assert results == [None] * 8
+    assert len(errors) == 8
+    assert all(isinstance(e, ValueError) for e in errors)
@@ -0,0 +1,65 @@
+"""
+SSE fan-out: every subscriber gets each event once, slow subscribers are dropped
+"""
+
+import asyncio
+import json
+from broadcast import Broadcaster, screening_event
+
+SCREENING = {'age': 52, 'gender': 'Male', 'risk_level': 'Moderate', 'probability': 0.4567}
+
+
+def parse(message):
+    event, data = message.strip().split('\n')
+    return event[len('event: '):], json.loads(data[len('data: '):])
+
+
+def test_event_reaches_every_subscriber():
+    broadcaster = Broadcaster(max_buffer=10, max_clients=5)
+    subscribers = [broadcaster.subscribe() for _ in range(3)]
+
+    broadcaster.publish('screening', screening_event(SCREENING, '2026-01-01T00:00:00'))
+
+    for subscriber in subscribers:
+        event, data = parse(subscriber.queue.get_nowait())
+        assert event == 'screening'
+        assert data['screening']['probability'] == 45.67
+        assert data['delta']['age_distribution'] == {'46-60': 1}
+
+
+def test_slow_subscriber_is_dropped_without_blocking_the_others():
+    broadcaster = Broadcaster(max_buffer=2, max_clients=5)
+    slow, fast = broadcaster.subscribe(), broadcaster.subscribe()
+
+    for i in range(3):
+        broadcaster.publish('tick', {'n': i})
+        fast.queue.get_nowait()
+
+    assert slow.dropped
+    assert not fast.dropped
+    # The slow client is told to reconnect (and resync) instead of reading its stale buffer
+    assert [parse(message)[0] for message in slow.events(heartbeat_seconds=0.01)] == ['dropped']
+
+    broadcaster.publish('tick', {'n': 3})
+    assert parse(fast.queue.get_nowait())[1] == {'n': 3}
+    assert slow.queue.qsize() == 2
+
+
+def test_client_limit():
+    broadcaster = Broadcaster(max_buffer=2, max_clients=1)
+    first = broadcaster.subscribe()
+    assert broadcaster.subscribe() is None
+    broadcaster.unsubscribe(first)
+    assert broadcaster.subscribe() is not None
+
+
+def test_async_events_yield_published_messages():
+    broadcaster = Broadcaster(max_buffer=10, max_clients=5)
+    subscriber = broadcaster.subscribe()
+
+    async def first_event():
+        stream = subscriber.async_events(heartbeat_seconds=5, poll_seconds=0.01)
+        broadcaster.publish('tick', {'n': 1})
+        return await asyncio.wait_for(stream.__anext__(), 1)
+
+    assert parse(asyncio.run(first_event())) == ('tick', {'n': 1})
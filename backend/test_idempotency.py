@@ -0,0 +1,90 @@
+"""
+Idempotency-Key handling: duplicates wait for the original and replay its response
+"""
+
+import threading
+import pytest
+from idempotency import IdempotencyStore, IdempotencyKeyReused, request_fingerprint
+
+BODY = {'age': 29, 'gender': 'Female', 'hemoglobin': 11.2, 'diet': 'Poor',
+        'symptoms': ['fatigue', 'dizziness'], 'rural_mode': False}
+
+
+def test_duplicate_waits_for_the_original():
+    store = IdempotencyStore()
+    started, finish = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        finish.wait(5)
+        return {'probability': 0.5}, 200
+
+    results = []
+    original = threading.Thread(target=lambda: results.append(store.run('k', 'fp', compute, 5)))
+    original.start()
+    started.wait(5)
+    duplicate = threading.Thread(target=lambda: results.append(store.run('k', 'fp', compute, 5)))
+    duplicate.start()
+    finish.set()
+    original.join(5)
+    duplicate.join(5)
+
+    assert len(calls) == 1
+    assert sorted(replayed for _, _, replayed in results) == [False, True]
+    assert results[0][:2] == results[1][:2]
+
+
+def test_failed_original_lets_the_retry_run():
+    store = IdempotencyStore()
+
+    def fail():
+        raise RuntimeError('scoring failed')
+
+    with pytest.raises(RuntimeError):
+        store.run('k', 'fp', fail, 1)
+    assert store.run('k', 'fp', lambda: ({'ok': True}, 200), 1) == ({'ok': True}, 200, False)
+
+
+def test_reused_key_with_a_different_body_is_refused():
+    store = IdempotencyStore()
+    store.run('k', request_fingerprint(BODY), lambda: ({}, 200), 1)
+    with pytest.raises(IdempotencyKeyReused):
+        store.run('k', request_fingerprint(dict(BODY, age=30)), lambda: ({}, 200), 1)
+
+
+def test_predict_retry_replays_without_scoring_again(app_module, auth_headers, monkeypatch):
+    started, finish = threading.Event(), threading.Event()
+    calls = []
+    run_prediction = app_module.run_prediction
+
+    def slow_prediction(data):
+        calls.append(1)
+        started.set()
+        finish.wait(5)
+        return run_prediction(data)
+
+    monkeypatch.setattr(app_module, 'run_prediction', slow_prediction)
+    headers = dict(auth_headers, **{'Idempotency-Key': 'retry-1'})
+    responses = []
+
+    def post():
+        responses.append(app_module.app.test_client().post('/predict', json=BODY, headers=headers))
+
+    original = threading.Thread(target=post)
+    original.start()
+    started.wait(5)
+    duplicate = threading.Thread(target=post)
+    duplicate.start()
+    finish.set()
+    original.join(10)
+    duplicate.join(10)
+
+    assert len(calls) == 1
+    assert [r.status_code for r in responses] == [200, 200]
+    assert sorted(r.headers.get('Idempotent-Replayed', '') for r in responses) == ['', 'true']
+    assert responses[0].get_json() == responses[1].get_json()
+
+    changed = app_module.app.test_client().post('/predict', json=dict(BODY, age=30), headers=headers)
+    assert changed.status_code == 422
@@ -0,0 +1,52 @@
+"""
+Outbox replication and background threads under hosts that don't run app.py's __main__ block
+"""
+
+import os
+import time
+from bson import ObjectId
+from maintenance import MaintenanceScheduler
+from screening_store import OutboxReplicator
+
+SCREENING = {
+    'age': 34, 'gender': 'Female', 'hemoglobin': 10.8, 'diet': 'Poor',
+    'symptoms': ['fatigue'], 'risk_level': 'High', 'probability': 0.81
+}
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+
+def test_saved_screening_reaches_mongo_without_reloader(app_module, mongo_db, monkeypatch):
+    assert 'WERKZEUG_RUN_MAIN' not in os.environ
+    # A replicator that nothing has started, as under gunicorn or `flask run`
+    replicator = OutboxReplicator(lambda: mongo_db, interval_ms=50)
+    monkeypatch.setattr(app_module, 'screening_replicator', replicator)
+
+    user_id = ObjectId()
+    app_module.save_screening(str(user_id), SCREENING)
+
+    assert wait_for(lambda: mongo_db.screenings.count_documents({'user_id': user_id}) == 1)
+    assert wait_for(lambda: app_module.pending_marker(str(user_id))[0] == 0)
+
+
+def test_first_request_starts_background_threads(app_module, monkeypatch):
+    replicator = OutboxReplicator(lambda: None, interval_ms=50)
+    scheduler = MaintenanceScheduler(lambda: {}, interval_hours=24)
+    monkeypatch.setattr(app_module, 'screening_replicator', replicator)
+    monkeypatch.setattr(app_module, 'maintenance_scheduler', scheduler)
+
+    assert app_module.app.test_client().get('/health').status_code == 200
+    assert replicator._thread.is_alive()
+    assert scheduler._thread.is_alive()
+    # Later requests don't start more threads
+    thread = replicator._thread
+    app_module.app.test_client().get('/health')
+    assert replicator._thread is thread
+    assert scheduler.start() is False
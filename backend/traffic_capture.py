@@ -0,0 +1,57 @@
+"""
+Traffic capture for HemoScan AI
+Appends an anonymized record of each /predict, /auth/login, /user/predictions and /stats
+request to a JSONL file for loadgen.py to replay. Users become salted pseudonyms (the
+salt is never written), login credentials are never recorded and /predict bodies keep
+only the model inputs.
+"""
+
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+
+CAPTURED_ENDPOINTS = {
+    ('POST', '/predict'): 'predict',
+    ('POST', '/auth/login'): 'login',
+    ('GET', '/user/predictions'): 'user_predictions',
+    ('GET', '/stats'): 'stats'
+}
+PREDICT_FIELDS = ['age', 'gender', 'hemoglobin', 'diet', 'symptoms', 'rural_mode']
+
+
+class TrafficRecorder:
+    """Thread-safe JSONL writer; timestamps are seconds since the capture started"""
+
+    def __init__(self, path):
+        self.path = path
+        self._salt = secrets.token_bytes(16)  # per capture, so pseudonyms can't be linked across files
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def pseudonym(self, identity):
+        if not identity:
+            return None
+        return 'u' + hashlib.sha256(self._salt + str(identity).encode('utf-8')).hexdigest()[:12]
+
+    def record(self, method, path, body, identity, status, latency_ms):
+        """Append one request if its endpoint is captured"""
+        endpoint = CAPTURED_ENDPOINTS.get((method, path))
+        if endpoint is None:
+            return
+        event = {
+            't': round(time.monotonic() - self._started, 4),
+            'endpoint': endpoint,
+            'user': self.pseudonym(identity),
+            'status': status,
+            'latency_ms': round(latency_ms, 2)
+        }
+        if endpoint == 'predict' and isinstance(body, dict):
+            event['body'] = {field: body[field] for field in PREDICT_FIELDS if field in body}
+        line = json.dumps(event) + '\n'
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(line)
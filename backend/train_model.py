@@ -11,16 +11,68 @@ from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
+from sklearn.inspection import permutation_importance, partial_dependence
+from joblib import Parallel, delayed
+from config import Config
+from drift import build_reference
+from hemoscan_runtime import Runtime
+from scoring import (
+    SYMPTOMS, DIET_MAP, RISK_LEVELS, RISK_THRESHOLDS, RURAL_HEMOGLOBIN_ESTIMATE, ADJUSTMENT_RULES,
+    adjust_probabilities, build_feature_vector
+)
+from datetime import datetime
 import joblib
+import json
+import copy
+import io
 import os
+import time
+import tracemalloc
 
-def generate_synthetic_data(n_samples=5000):
-    """Generate medically accurate synthetic anemia risk dataset"""
-    np.random.seed(42)
+def clinical_risk(age, gender, hemoglobin, diet, symptom_count):
+    """Medically weighted risk score (0-1) used to label screenings"""
+    # Hemoglobin-based risk (primary indicator)
+    hb_risk = np.where(
+        gender == 0,  # Female
+        np.where(hemoglobin < 12, 1, 0),  # Female: <12 is anemic
+        np.where(hemoglobin < 13, 1, 0)   # Male: <13 is anemic
+    )
+    
+    # Symptom-based risk (secondary indicator)
+    symptom_risk = (symptom_count >= 3).astype(int)
+    
+    # Diet-based risk
+    diet_risk = (diet == 0).astype(int)
+    
+    # Age factor (elderly more at risk)
+    age_risk = (age > 65).astype(int)
+    
+    # Combined risk calculation (medically weighted)
+    # Hemoglobin is most important (60%), symptoms (25%), diet (10%), age (5%)
+    return (
+        hb_risk * 0.60 +
+        symptom_risk * 0.25 +
+        diet_risk * 0.10 +
+        age_risk * 0.05
+    )
+
+def generate_synthetic_data(n_samples=5000, seed=42, age_range=(18, 80), female_share=None,
+                            anemia_prevalence=0.3, anemia_severity=(0.4, 0.3, 0.2, 0.1),
+                            diet_mix=(0.25, 0.45, 0.30)):
+    """Generate medically accurate synthetic anemia risk dataset
+    
+    The defaults reproduce the training dataset; the distribution parameters
+    let simulate_population.py model a specific district's demographic mix.
+    female_share=None draws gender uniformly.
+    """
+    np.random.seed(seed)
     
     # Generate features with realistic distributions
-    age = np.random.randint(18, 80, n_samples)
-    gender = np.random.choice([0, 1], n_samples)  # 0: Female, 1: Male
+    age = np.random.randint(age_range[0], age_range[1], n_samples)
+    if female_share is None:
+        gender = np.random.choice([0, 1], n_samples)  # 0: Female, 1: Male
+    else:
+        gender = np.random.choice([0, 1], n_samples, p=[female_share, 1 - female_share])
     
     # Hemoglobin levels based on medical standards:
     # Normal: Male 13-17 g/dL, Female 12-15 g/dL
@@ -36,16 +88,15 @@ def generate_synthetic_data(n_samples=5000):
     )
     
     # Add some anemia cases (lower hemoglobin)
-    anemia_prob = 0.3  # 30% chance of some level of anemia
-    anemia_mask = np.random.random(n_samples) < anemia_prob
-    anemia_severity = np.random.choice([0, 1, 2, 3], n_samples, p=[0.4, 0.3, 0.2, 0.1])
+    anemia_mask = np.random.random(n_samples) < anemia_prevalence  # default 30% chance of some level of anemia
+    severity = np.random.choice([0, 1, 2, 3], n_samples, p=list(anemia_severity))
     # 0: normal, 1: mild, 2: moderate, 3: severe
     
     hemoglobin = np.where(
         anemia_mask,
-        np.where(anemia_severity == 1, np.random.normal(11.0, 0.8, n_samples),  # Mild
-        np.where(anemia_severity == 2, np.random.normal(9.0, 0.8, n_samples),   # Moderate
-        np.where(anemia_severity == 3, np.random.normal(7.0, 0.8, n_samples),   # Severe
+        np.where(severity == 1, np.random.normal(11.0, 0.8, n_samples),  # Mild
+        np.where(severity == 2, np.random.normal(9.0, 0.8, n_samples),   # Moderate
+        np.where(severity == 3, np.random.normal(7.0, 0.8, n_samples),   # Severe
         hemoglobin_base))),
         hemoglobin_base
     )
@@ -54,7 +105,7 @@ def generate_synthetic_data(n_samples=5000):
     
     # Diet: 0=Poor, 1=Moderate, 2=Good
     # Poor diet increases anemia risk
-    diet = np.random.choice([0, 1, 2], n_samples, p=[0.25, 0.45, 0.30])
+    diet = np.random.choice([0, 1, 2], n_samples, p=list(diet_mix))
     
     # Symptoms correlated with hemoglobin levels
     # Lower hemoglobin = higher symptom probability
@@ -71,31 +122,7 @@ def generate_synthetic_data(n_samples=5000):
     
     # Create medically accurate target variable
     # Based on WHO anemia classification and clinical indicators
-    
-    # Hemoglobin-based risk (primary indicator)
-    hb_risk = np.where(
-        gender == 0,  # Female
-        np.where(hemoglobin < 12, 1, 0),  # Female: <12 is anemic
-        np.where(hemoglobin < 13, 1, 0)   # Male: <13 is anemic
-    )
-    
-    # Symptom-based risk (secondary indicator)
-    symptom_risk = (symptom_count >= 3).astype(int)
-    
-    # Diet-based risk
-    diet_risk = (diet == 0).astype(int)
-    
-    # Age factor (elderly more at risk)
-    age_risk = (age > 65).astype(int)
-    
-    # Combined risk calculation (medically weighted)
-    # Hemoglobin is most important (60%), symptoms (25%), diet (10%), age (5%)
-    combined_risk = (
-        hb_risk * 0.60 +
-        symptom_risk * 0.25 +
-        diet_risk * 0.10 +
-        age_risk * 0.05
-    )
+    combined_risk = clinical_risk(age, gender, hemoglobin, diet, symptom_count)
     
     # Create probability score (0-1)
     # Add some noise for realism
@@ -131,8 +158,441 @@ def generate_synthetic_data(n_samples=5000):
     
     return df
 
-def train_model():
+def native_tree_bytes(model):
+    """Bytes held by sklearn tree node arrays (allocated natively, invisible to tracemalloc)"""
+    estimators = getattr(model, 'estimators_', None)
+    if estimators is None:
+        trees = [model] if hasattr(model, 'tree_') else []
+    else:
+        trees = np.asarray(estimators, dtype=object).ravel()
+    total = 0
+    for tree in trees:
+        tree_ = tree.tree_
+        total += tree_.node_count * tree_.__getstate__()['nodes'].itemsize + tree_.value.nbytes
+    return total
+
+def measure_serving_cost(model, X_sample, single_repeats=200, batch_repeats=5):
+    """Measure inference latency, serialized size and resident memory of a fitted model"""
+    X_sample = np.asarray(X_sample)
+    single_row = X_sample[:1]
+    batch = np.resize(X_sample, (1000, X_sample.shape[1]))
+    
+    # Warm up once so lazy initialization doesn't count against the model
+    model.predict_proba(single_row)
+    
+    single_times = []
+    for _ in range(single_repeats):
+        start = time.perf_counter()
+        model.predict_proba(single_row)
+        single_times.append(time.perf_counter() - start)
+    
+    batch_times = []
+    for _ in range(batch_repeats):
+        start = time.perf_counter()
+        model.predict_proba(batch)
+        batch_times.append(time.perf_counter() - start)
+    
+    # Serialized size is what every worker reads from disk at startup
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    serialized = buffer.getvalue()
+    
+    # Resident memory: bytes still allocated after unpickling a fresh copy
+    tracemalloc.start()
+    loaded = joblib.load(io.BytesIO(serialized))
+    resident_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    resident_bytes += native_tree_bytes(loaded)
+    del loaded
+    
+    return {
+        'single_row_latency_ms': float(np.median(single_times) * 1000),
+        'batch_1000_latency_ms': float(np.median(batch_times) * 1000),
+        'serialized_size_bytes': len(serialized),
+        'resident_memory_bytes': int(resident_bytes)
+    }
+
+def pareto_front(candidates):
+    """Candidates not dominated on (score, single-row latency, serialized size)"""
+    def dominates(a, b):
+        no_worse = (a['score'] >= b['score'] and
+                    a['single_row_latency_ms'] <= b['single_row_latency_ms'] and
+                    a['serialized_size_bytes'] <= b['serialized_size_bytes'])
+        better = (a['score'] > b['score'] or
+                  a['single_row_latency_ms'] < b['single_row_latency_ms'] or
+                  a['serialized_size_bytes'] < b['serialized_size_bytes'])
+        return no_worse and better
+    
+    return [c for c in candidates if not any(dominates(o, c) for o in candidates if o is not c)]
+
+def select_model(candidates, latency_budget_ms=None, size_budget_mb=None, score_tolerance=0.0):
+    """Pick the cheapest Pareto-optimal model within budget whose score is close to the best"""
+    eligible = [
+        c for c in candidates
+        if (latency_budget_ms is None or c['single_row_latency_ms'] <= latency_budget_ms) and
+           (size_budget_mb is None or c['serialized_size_bytes'] <= size_budget_mb * 1024 * 1024)
+    ]
+    if not eligible:
+        print("\n[WARNING] No model fits the latency/size budget - choosing from all candidates")
+        eligible = candidates
+    
+    front = pareto_front(eligible)
+    best_score = max(c['score'] for c in front)
+    near_best = [c for c in front if c['score'] >= best_score - score_tolerance]
+    
+    # Among models that are (nearly) as accurate, serving cost decides
+    return min(near_best, key=lambda c: (c['single_row_latency_ms'], c['serialized_size_bytes'], -c['score']))
+
+def _partial_dependence_curve(model, X_scaled, column, grid_resolution):
+    # Brute force so every model type yields predict_proba averages (GB's recursion gives log-odds)
+    result = partial_dependence(model, X_scaled, [column], grid_resolution=grid_resolution,
+                                kind='average', method='brute')
+    return result['grid_values'][0], result['average'][0]
+
+def compute_explanations(model, scaler, X_test_scaled, y_test, feature_cols,
+                         n_repeats=None, n_jobs=None, grid_resolution=None):
+    """Permutation importance and partial-dependence tables on the held-out split
+    
+    Both run in parallel (features across joblib workers), so they can be
+    computed at training time and served by the API as lookups.
+    """
+    n_repeats = n_repeats or Config.EXPLAIN_REPEATS
+    n_jobs = n_jobs or Config.EXPLAIN_JOBS
+    grid_resolution = grid_resolution or Config.EXPLAIN_PD_GRID
+    
+    start = time.perf_counter()
+    importance = permutation_importance(model, X_test_scaled, y_test, scoring='roc_auc',
+                                        n_repeats=n_repeats, n_jobs=n_jobs, random_state=42)
+    curves = Parallel(n_jobs=n_jobs)(
+        delayed(_partial_dependence_curve)(model, X_test_scaled, i, grid_resolution)
+        for i in range(len(feature_cols))
+    )
+    
+    partial = {}
+    for i, (feature, (grid, average)) in enumerate(zip(feature_cols, curves)):
+        # Report the grid in raw units (g/dL, years, 0/1 flags) rather than scaled values
+        raw_grid = grid * scaler.scale_[i] + scaler.mean_[i]
+        partial[feature] = {
+            'values': np.round(raw_grid, 4).tolist(),
+            'probability': np.round(average, 6).tolist()
+        }
+    
+    return {
+        'scoring': 'roc_auc',
+        'n_repeats': n_repeats,
+        'rows': int(len(y_test)),
+        'seconds': round(time.perf_counter() - start, 2),
+        'permutation_importance': {
+            feature: {
+                'mean': float(importance.importances_mean[i]),
+                'std': float(importance.importances_std[i])
+            }
+            for i, feature in enumerate(feature_cols)
+        },
+        'partial_dependence': partial
+    }
+
+def _float32_floor(values):
+    """Largest float32 <= each value, so float32 inputs compare exactly as with the float64 threshold"""
+    values = np.asarray(values, dtype=np.float64)
+    rounded = values.astype(np.float32)
+    over = rounded.astype(np.float64) > values
+    rounded[over] = np.nextafter(rounded[over], np.float32(-np.inf))
+    return rounded
+
+def _flatten_trees(trees, leaf_value):
+    """Concatenate fitted sklearn trees into compact flat node arrays
+    
+    Child indices are local to each tree (int16 unless a tree has more than
+    32767 nodes), split features are int16 and thresholds float32; leaf values
+    stay float64 so predictions match scikit-learn exactly.
+    """
+    roots, feature, threshold, left, right, value = [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        t = tree.tree_
+        ids = np.arange(t.node_count)
+        leaf = t.children_left == -1
+        roots.append(offset)
+        # Leaves point at themselves so the runtime can walk a fixed number of steps
+        feature.append(np.where(leaf, 0, t.feature))
+        threshold.append(np.where(leaf, 0.0, t.threshold))
+        left.append(np.where(leaf, ids, t.children_left))
+        right.append(np.where(leaf, ids, t.children_right))
+        value.append(leaf_value(t.value[:, 0, :]))
+        offset += t.node_count
+    index_dtype = np.int16 if max(tree.tree_.node_count for tree in trees) <= np.iinfo(np.int16).max else np.int32
+    return {
+        'roots': np.array(roots, dtype=np.int32 if offset <= np.iinfo(np.int32).max else np.int64),
+        'feature': np.concatenate(feature).astype(np.int16),
+        'threshold': _float32_floor(np.concatenate(threshold)),
+        'left': np.concatenate(left).astype(index_dtype),
+        'right': np.concatenate(right).astype(index_dtype),
+        'value': np.concatenate(value)
+    }, max(tree.tree_.max_depth for tree in trees)
+
+def export_runtime(model, scaler, feature_cols, metadata, path='models/model.npz'):
+    """Write the model, scaler and adjustment rules for hemoscan_runtime.py (NumPy only, no pickle)"""
+    manifest = {
+        'format_version': 2,
+        'version': metadata.get('version'),
+        'model_type': metadata.get('model_type'),
+        'feature_names': list(feature_cols),
+        'symptoms': SYMPTOMS,
+        'diet_map': DIET_MAP,
+        'rural_hemoglobin_estimate': RURAL_HEMOGLOBIN_ESTIMATE,
+        'adjustment_rules': ADJUSTMENT_RULES,
+        'risk_levels': RISK_LEVELS,
+        'risk_thresholds': RISK_THRESHOLDS
+    }
+    arrays = {'scaler_mean': scaler.mean_, 'scaler_scale': scaler.scale_}
+    
+    if isinstance(model, LogisticRegression):
+        manifest['model_kind'] = 'linear'
+        arrays.update(coef=model.coef_[0], intercept=model.intercept_[0])
+    elif isinstance(model, RandomForestClassifier):
+        manifest['model_kind'] = 'forest'
+        nodes, manifest['max_depth'] = _flatten_trees(
+            model.estimators_, lambda v: v[:, 1] / v.sum(axis=1)
+        )
+        arrays.update(nodes, feature_importances=model.feature_importances_)
+    elif isinstance(model, GradientBoostingClassifier) and model.n_classes_ == 2:
+        manifest['model_kind'] = 'boosting'
+        nodes, manifest['max_depth'] = _flatten_trees(model.estimators_[:, 0], lambda v: v[:, 0])
+        arrays.update(nodes, feature_importances=model.feature_importances_)
+        manifest['learning_rate'] = model.learning_rate
+        # Log-odds of the class prior (sklearn's default init estimator)
+        prior = 0.0 if model.init_ == 'zero' else model.init_.class_prior_[1]
+        manifest['init_raw'] = float(np.log(prior / (1 - prior))) if prior else 0.0
+    else:
+        raise ValueError(f'No runtime export for {type(model).__name__}')
+    
+    np.savez_compressed(path, manifest=np.array(json.dumps(manifest)), **arrays)
+    return path
+
+def prune_ensemble(model, X_val, y_val, auc_tolerance, accuracy_tolerance, probability_tolerance, min_trees=5):
+    """Drop redundant trees while validation AUC, accuracy and probabilities stay close to the full ensemble
+    
+    Random forests keep a greedy forward selection of trees (each step adds
+    the tree that most lowers the Brier score of the running average);
+    gradient boosting keeps its shortest stage prefix. Probabilities are
+    checked too (mean absolute shift) because the API's risk levels are
+    probability thresholds.
+    """
+    y_val = np.asarray(y_val, dtype=float)
+    pruned = copy.copy(model)
+    
+    def close_enough(proba):
+        return (roc_auc_score(y_val, proba) >= full_auc - auc_tolerance and
+                ((proba > 0.5) == y_val).mean() >= full_accuracy - accuracy_tolerance and
+                np.abs(proba - full_proba).mean() <= probability_tolerance)
+    
+    if isinstance(model, RandomForestClassifier):
+        per_tree = np.array([tree.predict_proba(X_val)[:, 1] for tree in model.estimators_])
+        full_proba = per_tree.mean(axis=0)
+        full_auc = roc_auc_score(y_val, full_proba)
+        full_accuracy = ((full_proba > 0.5) == y_val).mean()
+        remaining = list(range(len(per_tree)))
+        selected, total = [], np.zeros(len(y_val))
+        for k in range(1, len(per_tree) + 1):
+            brier = (((total + per_tree[remaining]) / k - y_val) ** 2).mean(axis=1)
+            best = remaining.pop(int(np.argmin(brier)))
+            selected.append(best)
+            total += per_tree[best]
+            if k >= min_trees and close_enough(total / k):
+                break
+        pruned.estimators_ = [model.estimators_[i] for i in sorted(selected)]
+        pruned.n_estimators = len(selected)
+    elif isinstance(model, GradientBoostingClassifier):
+        full_proba = model.predict_proba(X_val)[:, 1]
+        full_auc = roc_auc_score(y_val, full_proba)
+        full_accuracy = ((full_proba > 0.5) == y_val).mean()
+        for k, proba in enumerate(model.staged_predict_proba(X_val), 1):
+            if k >= min_trees and close_enough(proba[:, 1]):
+                break
+        pruned.estimators_ = model.estimators_[:k]
+        pruned.train_score_ = model.train_score_[:k]
+        pruned.n_estimators = pruned.n_estimators_ = k
+    else:
+        raise ValueError(f'Cannot prune {type(model).__name__}')
+    return pruned
+
+def distill(teacher, scaler, feature_cols, n_rows, n_estimators=50, max_depth=3, seed=7):
+    """Small gradient-boosting student fitted to the teacher's probabilities on a fresh synthetic transfer set
+    
+    Soft labels are expressed as sample weights: every transfer row appears
+    once as negative with weight 1 - p and once as positive with weight p.
+    """
+    X_transfer = scaler.transform(generate_synthetic_data(n_rows, seed=seed)[feature_cols])
+    soft = teacher.predict_proba(X_transfer)[:, 1]
+    
+    X = np.vstack([X_transfer, X_transfer])
+    y = np.concatenate([np.zeros(n_rows, dtype=int), np.ones(n_rows, dtype=int)])
+    weight = np.concatenate([1 - soft, soft])
+    keep = weight > 0
+    
+    student = GradientBoostingClassifier(
+        n_estimators=n_estimators, max_depth=max_depth, learning_rate=0.2, random_state=42
+    )
+    student.fit(X[keep], y[keep], sample_weight=weight[keep])
+    return student
+
+def measure_runtime_cost(model, scaler, feature_cols, X_sample, repeats=200):
+    """Compressed model.npz size, loaded array bytes and single-row latency in hemoscan_runtime.py"""
+    buffer = io.BytesIO()
+    export_runtime(model, scaler, feature_cols, {}, buffer)
+    runtime = Runtime.load(io.BytesIO(buffer.getvalue()))
+    arrays = [v for v in vars(runtime.model).values() if isinstance(v, np.ndarray)]
+    
+    single_row = np.asarray(X_sample)[:1]
+    runtime.model.predict_proba(single_row)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        runtime.model.predict_proba(single_row)
+        times.append(time.perf_counter() - start)
+    
+    return {
+        'export_size_bytes': len(buffer.getvalue()),
+        'runtime_array_bytes': int(sum(a.nbytes for a in arrays)),
+        'runtime_latency_ms': float(np.median(times) * 1000)
+    }
+
+# (age, gender, hemoglobin, diet, symptoms) screenings whose API risk level a compressed variant must keep
+SMOKE_PROFILES = [
+    (30, 0, 13.5, 2, []),
+    (45, 1, 15.0, 1, []),
+    (70, 1, 14.0, 0, []),
+    (25, 0, RURAL_HEMOGLOBIN_ESTIMATE, 1, []),
+    (35, 0, 10.5, 1, ['fatigue']),
+    (55, 1, 11.0, 0, ['fatigue', 'weakness']),
+    (30, 0, 8.0, 0, ['fatigue', 'dizziness', 'pale_skin', 'weakness'])
+]
+
+def calibration_error(y_true, proba, bins=10):
+    """Expected calibration error: gap between mean probability and observed rate, weighted over equal-width bins"""
+    y_true = np.asarray(y_true, dtype=float)
+    bin_ids = np.minimum((proba * bins).astype(int), bins - 1)
+    gaps = np.abs(np.bincount(bin_ids, proba, bins) - np.bincount(bin_ids, y_true, bins))
+    return float(gaps.sum() / len(proba))
+
+def smoke_probabilities(model, scaler, feature_cols, profiles=SMOKE_PROFILES):
+    """Adjusted probabilities (risk_score / 100) the API would return for the smoke profiles"""
+    raw = np.array([build_feature_vector(*profile) for profile in profiles], dtype=float)
+    proba = model.predict_proba(scaler.transform(pd.DataFrame(raw, columns=feature_cols)))[:, 1]
+    return adjust_probabilities(proba, raw)
+
+def compress_model(model, scaler, feature_cols, X_test_scaled, y_test, auc_tolerance=None,
+                   accuracy_tolerance=None, probability_tolerance=None, calibration_tolerance=None,
+                   distill_rows=None):
+    """Report pruned and distilled variants of a tree ensemble and pick the smallest that keeps its quality
+    
+    Pruning and the choice use an independent synthetic validation sample:
+    a variant must stay within the tolerances of the original's AUC, accuracy,
+    probabilities, Brier score and calibration error, and give the original's
+    risk levels for SMOKE_PROFILES after the adjustment rules. The held-out
+    test split is only reported. Returns (model, report).
+    """
+    if auc_tolerance is None:
+        auc_tolerance = Config.COMPRESS_AUC_TOLERANCE
+    if accuracy_tolerance is None:
+        accuracy_tolerance = Config.COMPRESS_ACCURACY_TOLERANCE
+    if probability_tolerance is None:
+        probability_tolerance = Config.COMPRESS_PROBABILITY_TOLERANCE
+    if calibration_tolerance is None:
+        calibration_tolerance = Config.COMPRESS_CALIBRATION_TOLERANCE
+    if distill_rows is None:
+        distill_rows = Config.DISTILL_TRANSFER_ROWS if Config.COMPRESS_DISTILL else 0
+    
+    validation = generate_synthetic_data(2000, seed=1234)
+    X_val = scaler.transform(validation[feature_cols])
+    y_val = validation['target'].to_numpy()
+    variants = {
+        'original': model,
+        'pruned': prune_ensemble(
+            model, X_val, validation['target'], auc_tolerance, accuracy_tolerance, probability_tolerance
+        )
+    }
+    if distill_rows:
+        variants['distilled'] = distill(model, scaler, feature_cols, distill_rows)
+    
+    original_proba = model.predict_proba(X_test_scaled)[:, 1]
+    original_val_proba = model.predict_proba(X_val)[:, 1]
+    original_smoke_levels = np.digitize(smoke_probabilities(model, scaler, feature_cols), RISK_THRESHOLDS)
+    rows = []
+    for name, variant in variants.items():
+        trees = list(np.ravel(variant.estimators_))
+        proba = variant.predict_proba(X_test_scaled)[:, 1]
+        val_proba = variant.predict_proba(X_val)[:, 1]
+        smoke = smoke_probabilities(variant, scaler, feature_cols)
+        rows.append({
+            'variant': name,
+            'model': variant,
+            'validation': {
+                'accuracy': float(variant.score(X_val, y_val)),
+                'auc': float(roc_auc_score(y_val, val_proba)),
+                'mean_probability_shift': float(np.abs(val_proba - original_val_proba).mean()),
+                'brier': float(((val_proba - y_val) ** 2).mean()),
+                'calibration_error': calibration_error(y_val, val_proba)
+            },
+            'smoke_risk_scores': np.round(smoke * 100, 2).tolist(),
+            'smoke_levels_match': bool((np.digitize(smoke, RISK_THRESHOLDS) == original_smoke_levels).all()),
+            'test_accuracy': float(variant.score(X_test_scaled, y_test)),
+            'auc': float(roc_auc_score(y_test, proba)),
+            'mean_probability_shift': float(np.abs(proba - original_proba).mean()),
+            'trees': len(trees),
+            'nodes': int(sum(tree.tree_.node_count for tree in trees)),
+            **measure_serving_cost(variant, X_test_scaled),
+            **measure_runtime_cost(variant, scaler, feature_cols, X_test_scaled)
+        })
+    
+    original = rows[0]['validation']
+    for r in rows:
+        val = r['validation']
+        r['eligible'] = (
+            val['auc'] >= original['auc'] - auc_tolerance
+            and val['accuracy'] >= original['accuracy'] - accuracy_tolerance
+            and val['mean_probability_shift'] <= probability_tolerance
+            and val['brier'] <= original['brier'] + calibration_tolerance
+            and val['calibration_error'] <= original['calibration_error'] + calibration_tolerance
+            and r['smoke_levels_match']
+        )
+    chosen = min((r for r in rows if r['eligible']),
+                 key=lambda r: (r['resident_memory_bytes'], r['serialized_size_bytes']))
+    
+    print(f"\n{'Variant':<10} {'Trees':>5} {'Nodes':>7} {'Acc':>7} {'AUC':>7} {'ValECE':>7} {'Pickle KB':>10} "
+          f"{'Memory KB':>10} {'npz KB':>8} {'ms/row':>7} {'runtime':>8}")
+    for r in rows:
+        note = '  <- saved' if r is chosen else '' if r['eligible'] else '  (fails validation)'
+        print(f"{r['variant']:<10} {r['trees']:>5} {r['nodes']:>7} {r['test_accuracy']:>7.4f} {r['auc']:>7.4f} "
+              f"{r['validation']['calibration_error']:>7.4f} "
+              f"{r['serialized_size_bytes'] / 1024:>10.1f} {r['resident_memory_bytes'] / 1024:>10.1f} "
+              f"{r['export_size_bytes'] / 1024:>8.1f} {r['single_row_latency_ms']:>7.3f} "
+              f"{r['runtime_latency_ms']:>8.3f}{note}")
+    
+    report = {
+        'auc_tolerance': auc_tolerance,
+        'accuracy_tolerance': accuracy_tolerance,
+        'probability_tolerance': probability_tolerance,
+        'calibration_tolerance': calibration_tolerance,
+        'smoke_profiles': [list(profile) for profile in SMOKE_PROFILES],
+        'distill_transfer_rows': distill_rows,
+        'chosen': chosen['variant'],
+        'variants': [{k: v for k, v in r.items() if k != 'model'} for r in rows]
+    }
+    return chosen['model'], report
+
+def train_model(latency_budget_ms=None, size_budget_mb=None, score_tolerance=None, compress=None):
     """Train and save improved ML model"""
+    if latency_budget_ms is None:
+        latency_budget_ms = Config.MODEL_LATENCY_BUDGET_MS
+    if size_budget_mb is None:
+        size_budget_mb = Config.MODEL_SIZE_BUDGET_MB
+    if score_tolerance is None:
+        score_tolerance = Config.MODEL_SCORE_TOLERANCE
+    if compress is None:
+        compress = Config.MODEL_COMPRESSION
+    
     print("Generating medically accurate synthetic dataset...")
     df = generate_synthetic_data(5000)  # Increased dataset size
     
@@ -186,9 +646,7 @@ def train_model():
         )
     }
     
-    best_model = None
-    best_score = 0
-    best_name = ''
+    candidates = []
     
     for name, model in models.items():
         model.fit(X_train_scaled, y_train)
@@ -204,14 +662,42 @@ def train_model():
         print(f"  Test Accuracy: {test_score:.4f}")
         print(f"  AUC Score: {auc_score:.4f}")
         
-        # Select model with best test accuracy and AUC
+        # Measure what the model will cost to serve
+        cost = measure_serving_cost(model, X_test_scaled)
+        print(f"  Single-row Latency: {cost['single_row_latency_ms']:.3f} ms")
+        print(f"  Batch-1000 Latency: {cost['batch_1000_latency_ms']:.3f} ms")
+        print(f"  Serialized Size: {cost['serialized_size_bytes'] / 1024:.1f} KB")
+        print(f"  Resident Memory: {cost['resident_memory_bytes'] / 1024:.1f} KB")
+        
+        # Combined test accuracy and AUC
         combined_score = test_score * 0.6 + auc_score * 0.4
-        if combined_score > best_score:
-            best_score = combined_score
-            best_model = model
-            best_name = name
-    
-    print(f"\n[OK] Best Model: {best_name} (Score: {best_score:.4f})")
+        candidates.append({
+            'name': name,
+            'model': model,
+            'train_accuracy': float(train_score),
+            'test_accuracy': float(test_score),
+            'auc': float(auc_score),
+            'score': float(combined_score),
+            **cost
+        })
+    
+    selected = select_model(candidates, latency_budget_ms, size_budget_mb, score_tolerance)
+    best_model = selected['model']
+    best_name = selected['name']
+    best_score = selected['score']
+    
+    print(f"\n[OK] Best Model: {best_name} (Score: {best_score:.4f}, "
+          f"{selected['single_row_latency_ms']:.3f} ms/row)")
+    
+    # Prune / distill tree ensembles to cut per-worker model memory
+    compression = None
+    if compress and isinstance(best_model, (RandomForestClassifier, GradientBoostingClassifier)):
+        print("\nCompressing model (pruning redundant trees, distilling a student)...")
+        best_model, compression = compress_model(best_model, scaler, feature_cols, X_test_scaled, y_test)
+        if compression['chosen'] != 'original':
+            chosen = next(v for v in compression['variants'] if v['variant'] == compression['chosen'])
+            best_name = (f"{best_name} (pruned to {chosen['trees']} trees)" if compression['chosen'] == 'pruned'
+                         else f"Distilled Gradient Boosting (from {best_name})")
     
     # Detailed evaluation of best model
     print("\nDetailed Classification Report:")
@@ -226,6 +712,43 @@ def train_model():
     # Save feature names for later use
     joblib.dump(feature_cols, 'models/feature_names.pkl')
     
+    # Save reference histograms of the training inputs for drift monitoring
+    with open('models/drift_reference.json', 'w') as f:
+        json.dump(build_reference(X_train, feature_cols), f, indent=2)
+    
+    # Save precomputed explanations for the API's top factors
+    print("\nComputing permutation importance and partial dependence...")
+    explanations = compute_explanations(best_model, scaler, X_test_scaled, y_test, feature_cols)
+    with open('models/explanations.json', 'w') as f:
+        json.dump(explanations, f, indent=2)
+    ranked = sorted(explanations['permutation_importance'].items(), key=lambda item: -item[1]['mean'])
+    print(f"  Done in {explanations['seconds']}s; top features: "
+          f"{', '.join(name for name, _ in ranked[:3])}")
+    
+    # Save selection metadata with the serving cost of every candidate
+    metadata = {
+        'version': datetime.utcnow().strftime('%Y%m%d%H%M%S'),
+        'trained_at': datetime.utcnow().isoformat(),
+        'model_type': best_name,
+        'feature_names': feature_cols,
+        'selection': {
+            'latency_budget_ms': latency_budget_ms,
+            'size_budget_mb': size_budget_mb,
+            'score_tolerance': score_tolerance
+        },
+        'candidates': [
+            {**{k: v for k, v in c.items() if k != 'model'}, 'selected': c is selected}
+            for c in candidates
+        ],
+        'compression': compression
+    }
+    with open('models/model_metadata.json', 'w') as f:
+        json.dump(metadata, f, indent=2)
+    
+    # Self-contained export for the NumPy-only runtime (API cold start and offline scoring)
+    export_path = export_runtime(best_model, scaler, feature_cols, metadata)
+    print(f"Runtime export: {export_path} ({os.path.getsize(export_path) / 1024:.1f} KB)")
+    
     print("\nModel saved successfully!")
     print(f"Model files saved in: {os.path.abspath('models')}")
     print(f"Model type: {best_name}")
@@ -21,11 +21,53 @@ const AdminDashboard = () => {
 
   useEffect(() => {
     fetchStats()
-    // Refresh stats every 30 seconds
-    const interval = setInterval(fetchStats, 30000)
-    return () => clearInterval(interval)
+
+    // Live feed: the server pushes each new screening with its stat deltas
+    const token = localStorage.getItem('token')
+    const source = new EventSource(
+      `${api.defaults.baseURL}/admin/stream?jwt=${encodeURIComponent(token)}`
+    )
+    // Refresh every 30 seconds instead while the stream is down
+    let interval = null
+    const stopPolling = () => {
+      clearInterval(interval)
+      interval = null
+    }
+    // (Re)connected: resync once, since events sent while disconnected are lost
+    source.onopen = () => {
+      stopPolling()
+      fetchStats()
+    }
+    // Fires while the browser retries and when it gives up (readyState CLOSED)
+    source.onerror = () => {
+      if (!interval) interval = setInterval(fetchStats, 30000)
+    }
+    source.addEventListener('screening', (e) => {
+      const { screening, delta } = JSON.parse(e.data)
+      setStats((prev) => (prev ? applyDelta(prev, screening, delta) : prev))
+    })
+    return () => {
+      source.close()
+      stopPolling()
+    }
   }, [])
 
+  const addCounts = (counts, delta) => {
+    const merged = { ...counts }
+    Object.entries(delta).forEach(([key, value]) => {
+      merged[key] = (merged[key] || 0) + value
+    })
+    return merged
+  }
+
+  const applyDelta = (prev, screening, delta) => ({
+    ...prev,
+    total_screenings: prev.total_screenings + delta.total_screenings,
+    risk_distribution: addCounts(prev.risk_distribution, delta.risk_distribution),
+    age_distribution: addCounts(prev.age_distribution, delta.age_distribution),
+    recent_predictions: [screening, ...prev.recent_predictions].slice(0, 10),
+  })
+
   const fetchStats = async () => {
     try {
       const response = await api.get('/stats')
@@ -1,4 +1,4 @@
-import { useState } from 'react'
+import { useRef, useState } from 'react'
 import { useNavigate } from 'react-router-dom'
 import { motion } from 'framer-motion'
 import api from '../api'
@@ -7,6 +7,8 @@ const PredictionPage = () => {
   const navigate = useNavigate()
   const [loading, setLoading] = useState(false)
   const [errors, setErrors] = useState({})
+  // One key per screening: retries of the same submission replay the stored result
+  const idempotencyKey = useRef(null)
   const [formData, setFormData] = useState({
     age: '',
     gender: '',
@@ -24,8 +26,29 @@ const PredictionPage = () => {
     { id: 'shortness_breath', label: 'Shortness of Breath' },
   ]
 
+  const newIdempotencyKey = () =>
+    window.crypto?.randomUUID?.() || `${Date.now()}-${Math.random().toString(36).slice(2)}`
+
+  // Retry network failures and 503s with the same key, so the server saves the screening once
+  const postPrediction = async (payload, attempts = 3) => {
+    for (let attempt = 1; ; attempt++) {
+      try {
+        return await api.post('/predict', payload, {
+          headers: { 'Idempotency-Key': idempotencyKey.current },
+        })
+      } catch (error) {
+        const retryable = !error.response || error.response.status === 503
+        if (!retryable || attempt >= attempts) {
+          throw error
+        }
+        await new Promise((resolve) => setTimeout(resolve, 1000 * attempt))
+      }
+    }
+  }
+
   const handleChange = (e) => {
     const { name, value, type, checked } = e.target
+    idempotencyKey.current = null
     setFormData((prev) => ({
       ...prev,
       [name]: type === 'checkbox' ? checked : value,
@@ -37,6 +60,7 @@ const PredictionPage = () => {
   }
 
   const handleSymptomChange = (symptomId) => {
+    idempotencyKey.current = null
     setFormData((prev) => ({
       ...prev,
       symptoms: prev.symptoms.includes(symptomId)
@@ -87,7 +111,11 @@ const PredictionPage = () => {
         rural_mode: formData.rural_mode,
       }
 
-      const response = await api.post('/predict', payload)
+      if (!idempotencyKey.current) {
+        idempotencyKey.current = newIdempotencyKey()
+      }
+      const response = await postPrediction(payload)
+      idempotencyKey.current = null
       
       // Store results in sessionStorage
       sessionStorage.setItem('predictionResults', JSON.stringify(response.data))